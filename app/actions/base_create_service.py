@@ -1,10 +1,16 @@
 import logging
-import shutil
-from typing import Literal
+from typing import Dict, List, Literal, Optional
 from abc import ABC, abstractmethod
 
+from git import Repo
+from github.Repository import Repository
+
 from clients import git, github
 from core.config import settings
+from core.executors import executors
+from core.resources import resource_manager
+from core.warm_pool import warm_pools
+from utils import timed
 
 logger = logging.getLogger(__name__)
 
@@ -12,52 +18,152 @@ logger = logging.getLogger(__name__)
 class BaseCreateService(ABC):
     """
     Base class for creating services from templates.
-    Subclasses implement specific template logic.
+    Subclasses implement a template backend.
+    """
+    
+    # Settings applied to the created GitHub repository, if any
+    repo_settings: Optional[github.RepoSettings] = None
+    
+    def __init__(self):
+        # Seconds spent in each stage of the last create() call
+        self.timings: Dict[str, float] = {}
+        # Repository settings that couldn't be applied in the last create() call
+        self.settings_errors: List[str] = []
+    
+    @abstractmethod
+    async def create(
+        self,
+        github_org: str,
+        github_repo: str,
+        props: dict,
+        remote_url: Optional[str] = None
+    ) -> Literal['FAILURE', 'PARTIAL', 'SUCCESS']:
+        """
+        Create a service from a template.
+        Must be implemented by subclasses.
+        
+        Runs on the event loop; blocking stages run on the stage executors.
+        
+        Args:
+            github_org: GitHub organization or username
+            github_repo: Repository name
+            props: Template-specific properties
+            remote_url: Push to this existing repository instead of creating
+                        one on GitHub, for backends that support it
+            
+        Returns:
+            'SUCCESS', 'FAILURE', or 'PARTIAL' if the repository was created
+            but some of its settings couldn't be applied (see settings_errors)
+        """
+        raise NotImplementedError("Subclasses must implement 'create'")
+    
+    async def _apply_repo_settings(self, repo: Repository, github_org: str, branch: str, edit: bool = False) -> None:
+        """
+        Apply repo_settings to a repository that already has its files. The
+        repository is usable without them and a retry would be refused
+        because it exists, so failures are recorded in settings_errors
+        instead of failing the job.
+        """
+        logger.info(f"{self.__class__.__name__} - Applying repository settings")
+        with timed(self.timings, "repo_settings"):
+            try:
+                await executors.run(
+                    "github",
+                    github.apply_repo_settings,
+                    repo,
+                    github_org,
+                    self.repo_settings,
+                    branch=branch,
+                    edit=edit
+                )
+            except Exception as err:
+                logger.error(f"{self.__class__.__name__} - {err}")
+                self.settings_errors.append(str(err))
+
+
+class BaseCookiecutterService(BaseCreateService):
     """
+    Base class for services generated locally with cookiecutter, then
+    committed and pushed to GitHub. Subclasses choose the template.
+    """
+    
+    # Template type used to look up a warm pool for this action, if any
+    template_type: Optional[str] = None
     
-    def create(
+    async def create(
         self,
         github_org: str,
         github_repo: str,
-        props: dict
-    ) -> Literal['FAILURE', 'SUCCESS']:
+        props: dict,
+        remote_url: Optional[str] = None
+    ) -> Literal['FAILURE', 'PARTIAL', 'SUCCESS']:
         """
-        Main method to create a service from a template.
+        Render the template, create the GitHub repository and push the project.
+        
+        Runs on the event loop; every blocking stage runs on the stage
+        executor for its kind of work (render, git or github).
         
         Args:
             github_org: GitHub organization or username
             github_repo: Repository name
             props: Template-specific properties
+            remote_url: Push to this existing repository instead of creating
+                        one on GitHub (e.g. a file:// URL of a bare repository)
             
         Returns:
-            'SUCCESS' or 'FAILURE'
+            'SUCCESS', 'FAILURE', or 'PARTIAL' if some repository settings couldn't be applied
         """
         project_dir = None
+        repo = None
+        github_repository = None
+        self.timings = {}
+        self.settings_errors = []
         try:
             logger.info(f"{self.__class__.__name__} - Starting service creation")
             
             # Step 1: Generate project from cookiecutter template
             logger.info(f"{self.__class__.__name__} - Generating from cookiecutter template")
-            project_dir = self._create_cookiecutter(props)
+            with timed(self.timings, "render"):
+                project_dir = await executors.run("render", self.render, props)
+            await executors.run("render", resource_manager.track_workspace, project_dir)
             
             # Step 2: Create GitHub repository
-            logger.info(f"{self.__class__.__name__} - Creating GitHub repository")
-            description = props.get('description', '') or props.get('project_short_description', '')
-            github.create_repo(github_org, github_repo, description=description)
+            if remote_url is None:
+                logger.info(f"{self.__class__.__name__} - Creating GitHub repository")
+                description = props.get('description', '') or props.get('project_short_description', '')
+                options = dict(self.repo_settings.options) if self.repo_settings else None
+                with timed(self.timings, "create_repo"):
+                    github_repository = await executors.run(
+                        "github", github.create_repo, github_org, github_repo, description=description, options=options
+                    )
             
             # Step 3: Initialize git repository
             logger.info(f"{self.__class__.__name__} - Initializing git repository")
-            repo = git.init_repo(project_dir)
+            with timed(self.timings, "init"):
+                repo = await executors.run("git", git.init_repo, project_dir)
+            await executors.run("git", resource_manager.checkpoint)
             
             # Step 4: Push all files to GitHub
             logger.info(f"{self.__class__.__name__} - Uploading files to GitHub")
-            git.upload_all_files(
+            await executors.run(
+                "git",
+                git.upload_all_files,
                 repo, 
                 github_org, 
                 github_repo,
-                exclude_workflows=settings.EXCLUDE_GITHUB_WORKFLOWS
+                exclude_workflows=settings.EXCLUDE_GITHUB_WORKFLOWS,
+                remote_url=remote_url,
+                timings=self.timings
             )
+            await executors.run("git", resource_manager.checkpoint)
             
+            # Step 5: Apply topics, branch protection and team access (the branch must exist first)
+            if github_repository is not None and self.repo_settings:
+                await self._apply_repo_settings(github_repository, github_org, branch=git.default_branch)
+                
+            if self.settings_errors:
+                logger.warning(f"{self.__class__.__name__} - Service created without some repository settings")
+                return 'PARTIAL'
             logger.info(f"{self.__class__.__name__} - Service created successfully")
             return 'SUCCESS'
             
@@ -66,13 +172,39 @@ class BaseCreateService(ABC):
             return 'FAILURE'
             
         finally:
-            # Clean up temporary directory
-            if project_dir:
-                try:
-                    logger.info(f"{self.__class__.__name__} - Cleaning up temporary directory")
-                    shutil.rmtree(project_dir)
-                except Exception as e:
-                    logger.warning(f"Failed to clean up directory {project_dir}: {e}")
+            # Release GitPython's cat-file processes and the index, then hand the
+            # directory to the background reaper
+            if repo is not None or project_dir:
+                with timed(self.timings, "cleanup"):
+                    await executors.run("git", self._cleanup, repo, project_dir)
+            logger.info(
+                f"{self.__class__.__name__} - Stage timings: "
+                + ", ".join(f"{stage} {seconds:.3f}s" for stage, seconds in self.timings.items())
+            )
+    
+    def _cleanup(self, repo: Optional[Repo], project_dir: Optional[str]) -> None:
+        if repo is not None:
+            repo.close()
+            git.release_object_cache(repo)
+        if project_dir:
+            logger.info(f"{self.__class__.__name__} - Cleaning up temporary directory")
+            resource_manager.reap(project_dir)
+    
+    def render(self, props: dict) -> str:
+        """
+        Generate the project, from a pre-materialized workspace in the warm pool
+        when one is available.
+        
+        Args:
+            props: Template-specific properties
+            
+        Returns:
+            Path to the generated project directory
+        """
+        project_dir = None
+        if self.template_type:
+            project_dir = warm_pools.claim(self.template_type, props)
+        return project_dir or self._create_cookiecutter(props)
     
     @abstractmethod
     def _create_cookiecutter(self, props: dict) -> str:
@@ -0,0 +1,34 @@
+from actions.base_create_service import BaseCookiecutterService
+from core.registry import TemplateEntry
+from core.render import render_template
+
+
+class CreateCookiecutterService(BaseCookiecutterService):
+    """Create a service from a cookiecutter template in the template registry"""
+    
+    def __init__(self, entry: TemplateEntry):
+        """
+        Initialize with a template registry entry.
+        
+        Args:
+            entry: Registry entry with the template's URL, ref, directory and hooks policy
+        """
+        super().__init__()
+        self.entry = entry
+        self.template_type = entry.name
+        self.repo_settings = entry.repository
+    
+    def _create_cookiecutter(self, props: dict) -> str:
+        """
+        Generate project from the registered cookiecutter template.
+        
+        Args:
+            props: Template-specific properties, already validated against the entry's schema
+        """
+        return render_template(
+            self.entry.url,
+            props,
+            checkout=self.entry.ref,
+            directory=self.entry.directory,
+            accept_hooks=self.entry.hooks
+        )
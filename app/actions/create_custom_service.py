@@ -1,11 +1,8 @@
-from cookiecutter.main import cookiecutter
+from actions.base_create_service import BaseCookiecutterService
+from core.render import render_template
 
-from actions.base_create_service import BaseCreateService
-from utils import get_unique_output_dir
-from core.config import settings
 
-
-class CreateCustomService(BaseCreateService):
+class CreateCustomService(BaseCookiecutterService):
     """Create a service from a custom cookiecutter template URL"""
     
     def __init__(self, cookiecutter_url: str):
@@ -15,6 +12,7 @@ class CreateCustomService(BaseCreateService):
         Args:
             cookiecutter_url: URL to the cookiecutter template repository
         """
+        super().__init__()
         self.cookiecutter_url = cookiecutter_url
     
     def _create_cookiecutter(self, props: dict) -> str:
@@ -24,10 +22,4 @@ class CreateCustomService(BaseCreateService):
         Args:
             props: Template-specific properties (varies by template)
         """
-        return cookiecutter(
-            self.cookiecutter_url,
-            extra_context=props,
-            no_input=True,
-            output_dir=get_unique_output_dir(),
-            accept_hooks=settings.COOKIECUTTER_ACCEPT_HOOKS
-        )
+        return render_template(self.cookiecutter_url, props)
@@ -0,0 +1,205 @@
+import logging
+import re
+from dataclasses import dataclass
+from typing import Dict, List, Literal, Optional
+
+from actions.base_create_service import BaseCreateService
+from clients import github
+from core.config import settings
+from core.executors import executors
+from utils import timed
+
+logger = logging.getLogger(__name__)
+
+# Simple "{{ cookiecutter.name }}" placeholders, the only templating this backend supports
+VARIABLE_PATTERN = re.compile(r"\{\{\s*cookiecutter\.(\w+)\s*\}\}")
+
+# Files larger than this are never inspected for placeholders
+MAX_TEMPLATED_FILE_SIZE = 1024 * 1024
+
+
+@dataclass
+class TemplatedFile:
+    """A file in a template repository whose path or content contains placeholders"""
+    path: str
+    mode: str
+    sha: str
+    content: Optional[str]  # None if the content is binary or has no placeholders
+
+
+@dataclass
+class TemplateScan:
+    """Files of a template revision that need changing after GitHub generates a repository from it"""
+    templated: List[TemplatedFile]
+    workflows: List[str]  # Workflow files, deleted when EXCLUDE_GITHUB_WORKFLOWS is set
+
+
+# Scans per template tree SHA. Repositories generated from a template start with
+# the template's exact tree, so the tree SHA identifies the template revision.
+_template_scans: Dict[str, TemplateScan] = {}
+
+
+def _substitute(text: str, props: dict) -> str:
+    """Replace known placeholders in text, leaving unknown ones untouched"""
+    return VARIABLE_PATTERN.sub(
+        lambda match: str(props[match.group(1)]) if match.group(1) in props else match.group(0),
+        text
+    )
+
+
+class CreateTemplateRepoService(BaseCreateService):
+    """
+    Create a service from a GitHub template repository.
+    
+    GitHub generates the repository server-side, then a single commit made
+    through the Git Data API substitutes the request variables. Nothing is
+    cloned, rendered or pushed locally, so creation time barely depends on
+    template size.
+    """
+    
+    def __init__(self, template_repo: str, repo_settings: Optional[github.RepoSettings] = None):
+        """
+        Initialize with a GitHub template repository.
+        
+        Args:
+            template_repo: Template repository as "owner/repo"
+            repo_settings: Settings to apply to the generated repository
+        """
+        super().__init__()
+        self.template_repo = template_repo
+        self.repo_settings = repo_settings
+    
+    async def create(
+        self,
+        github_org: str,
+        github_repo: str,
+        props: dict,
+        remote_url: Optional[str] = None
+    ) -> Literal['FAILURE', 'PARTIAL', 'SUCCESS']:
+        """
+        Create a service from the template repository. Every GitHub call
+        runs on the github stage executor.
+        
+        Args:
+            github_org: GitHub organization or username
+            github_repo: Repository name
+            props: Template-specific properties
+            remote_url: Not supported, the repository is always generated on GitHub
+            
+        Returns:
+            'SUCCESS', 'FAILURE', or 'PARTIAL' if some repository settings couldn't be applied
+        """
+        self.timings = {}
+        self.settings_errors = []
+        try:
+            if remote_url is not None:
+                raise ValueError("Template repositories are generated on GitHub and can't be pushed elsewhere")
+                
+            logger.info(f"{self.__class__.__name__} - Starting service creation")
+            
+            # Step 1: Generate the repository from the template on GitHub
+            logger.info(f"{self.__class__.__name__} - Generating repository from {self.template_repo}")
+            description = props.get('description', '') or props.get('project_short_description', '')
+            with timed(self.timings, "create_repo"):
+                repo = await executors.run(
+                    "github",
+                    github.create_repo_from_template,
+                    github_org,
+                    github_repo,
+                    self.template_repo,
+                    description=description
+                )
+            
+            # Step 2: Wait for GitHub to populate the default branch
+            with timed(self.timings, "wait_for_branch"):
+                ref, head = await executors.run(
+                    "github",
+                    github.wait_for_branch,
+                    repo,
+                    repo.default_branch,
+                    timeout=settings.GITHUB_TEMPLATE_TIMEOUT_SECONDS
+                )
+            
+            # Step 3: Commit the variable substitutions
+            with timed(self.timings, "render"):
+                files = await executors.run("github", self._render_files, repo, head.tree.sha, props)
+            if files:
+                logger.info(f"{self.__class__.__name__} - Applying template variables to {len(files)} paths")
+                with timed(self.timings, "commit"):
+                    await executors.run(
+                        "github", github.commit_files, repo, ref, head, files, "Apply template variables"
+                    )
+                    
+            # Step 4: Apply the repository settings (generated repositories don't take options on creation)
+            if self.repo_settings:
+                await self._apply_repo_settings(repo, github_org, branch=repo.default_branch, edit=True)
+                
+            if self.settings_errors:
+                logger.warning(f"{self.__class__.__name__} - Service created without some repository settings")
+                return 'PARTIAL'
+            logger.info(f"{self.__class__.__name__} - Service created successfully")
+            return 'SUCCESS'
+            
+        except Exception as err:
+            logger.error(f"{self.__class__.__name__} - Error creating service: {err}", exc_info=True)
+            return 'FAILURE'
+    
+    def _render_files(self, repo, tree_sha: str, props: dict) -> Dict[str, Optional[github.FileChange]]:
+        """
+        Work out the file changes that apply props to a freshly generated repository.
+        
+        Returns:
+            Map of path to the change to write, or None for paths to delete
+        """
+        scan = self._scan_template(repo, tree_sha)
+        files: Dict[str, Optional[github.FileChange]] = {}
+        
+        # GitHub copies the whole template tree, workflows included, so they're removed in the same commit
+        if settings.EXCLUDE_GITHUB_WORKFLOWS:
+            for path in scan.workflows:
+                files[path] = None
+                
+        for templated in scan.templated:
+            path = _substitute(templated.path, props)
+            if templated.content is not None:
+                change = github.FileChange(mode=templated.mode, content=_substitute(templated.content, props))
+            else:
+                change = github.FileChange(mode=templated.mode, sha=templated.sha)
+                
+            if path != templated.path:
+                files[templated.path] = None
+            files[path] = change
+        return files
+    
+    def _scan_template(self, repo, tree_sha: str) -> TemplateScan:
+        """Find the files with placeholders and the workflow files, reading the template's blobs once per revision"""
+        if tree_sha in _template_scans:
+            return _template_scans[tree_sha]
+            
+        logger.info(f"{self.__class__.__name__} - Scanning {self.template_repo} at tree {tree_sha} for placeholders")
+        templated_files = []
+        workflows = []
+        for element in github.list_tree_files(repo, tree_sha):
+            if element.path.startswith(".github/workflows/"):
+                workflows.append(element.path)
+                if settings.EXCLUDE_GITHUB_WORKFLOWS:
+                    continue
+                
+            content = None
+            if element.size is not None and element.size <= MAX_TEMPLATED_FILE_SIZE:
+                try:
+                    content = github.read_blob(repo, element.sha).decode('utf-8')
+                except UnicodeDecodeError:
+                    content = None
+                    
+            content_is_templated = content is not None and VARIABLE_PATTERN.search(content) is not None
+            if content_is_templated or VARIABLE_PATTERN.search(element.path):
+                templated_files.append(TemplatedFile(
+                    path=element.path,
+                    mode=element.mode,
+                    sha=element.sha,
+                    content=content if content_is_templated else None
+                ))
+                
+        _template_scans[tree_sha] = TemplateScan(templated=templated_files, workflows=workflows)
+        return _template_scans[tree_sha]
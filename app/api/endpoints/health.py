@@ -0,0 +1,27 @@
+import logging
+from fastapi import APIRouter, Response
+
+from core.health import health_monitor
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+
+@router.get("/health/live")
+async def liveness():
+    """Liveness probe: the process is up and serving requests"""
+    return health_monitor.liveness()
+
+
+@router.get("/health/ready")
+async def readiness():
+    """
+    Readiness probe: 200 if this worker can take new jobs, 503 otherwise.
+    
+    Returns the state last refreshed in the background (job slots, job
+    queue, template cache, GitHub rate limit and circuits, DX circuits), so
+    it never waits on upstream calls.
+    """
+    status_code, body = health_monitor.readiness()
+    return Response(content=body, status_code=status_code, media_type="application/json")
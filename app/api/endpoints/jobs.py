@@ -0,0 +1,47 @@
+import logging
+import os
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import FileResponse
+
+from api.deps import verify_webhook
+from core.executors import executors
+from core.profiling import job_profiler
+from core.store import store
+from schemas.job import JobResponse
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+
+@router.get("/jobs", response_model=List[JobResponse])
+async def list_jobs(
+    status: Optional[str] = Query(None, description="Only return jobs with this status"),
+    limit: int = Query(50, ge=1, le=500, description="Maximum number of jobs to return"),
+    _verified: bool = Depends(verify_webhook)
+):
+    """List the most recent service creation jobs across all workers"""
+    jobs = await executors.run("requests", store.list_jobs, status=status, limit=limit)
+    return [JobResponse.from_record(job) for job in jobs]
+
+
+@router.get("/jobs/{job_id}", response_model=JobResponse)
+async def get_job(job_id: str, _verified: bool = Depends(verify_webhook)):
+    """Get the state of a service creation job"""
+    job = await executors.run("requests", store.get_job, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job not found: {job_id}")
+    return JobResponse.from_record(job)
+
+
+@router.get("/jobs/{job_id}/profile")
+async def get_job_profile(job_id: str, _verified: bool = Depends(verify_webhook)):
+    """Download the CPU and allocation profile of a job run with profiling enabled"""
+    job = await executors.run("requests", store.get_job, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job not found: {job_id}")
+    path = job_profiler.get_profile_path(job)
+    if path is None:
+        raise HTTPException(status_code=404, detail=f"No profile available for job: {job_id}")
+    return FileResponse(path, media_type="application/zip", filename=f"profile-{os.path.basename(path)}")
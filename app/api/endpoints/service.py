@@ -1,11 +1,24 @@
 import logging
+import os
+import time
 from typing import Optional
-from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks
+from fastapi import APIRouter, Depends, Header, HTTPException, BackgroundTasks
 
-from mappings import TEMPLATE_TYPE_TO_CLASS_MAPPING
+from pydantic import ValidationError
+
+from actions.create_cookiecutter_service import CreateCookiecutterService
 from actions.create_custom_service import CreateCustomService
+from actions.create_template_repo_service import CreateTemplateRepoService
 from api.deps import verify_webhook
 from clients.self_service import dx_client
+from core.admission import admission_controller
+from core.config import settings
+from core.executors import executors
+from core.preflight import PreflightError, run_preflight
+from core.profiling import job_profiler
+from core.registry import template_registry
+from core.resources import resource_manager
+from core.store import store
 from schemas.webhook import DXWorkflowRequest, WorkflowResponse
 
 logging.basicConfig(level=logging.INFO)
@@ -14,7 +27,7 @@ logger = logging.getLogger(__name__)
 router = APIRouter()
 
 
-def process_service_creation(
+async def process_service_creation(
     workflow_run_id: str,
     github_org: str,
     github_repo: str,
@@ -25,12 +38,44 @@ def process_service_creation(
     """
     Background task to process service creation.
     This runs asynchronously and reports status back to DX.
+    
+    The task runs on the event loop once the response is sent, in one of the
+    worker's JOB_CONCURRENCY job slots. Blocking work runs on the stage
+    executors: state store updates, DX messages and the wait for resources on
+    "jobs", and the pipeline's stages on "render", "git" and "github".
     """
+    async with executors.job_slot():
+        token = resource_manager.bind(workflow_run_id)
+        try:
+            await _run_service_creation(
+                workflow_run_id, github_org, github_repo, template_type, properties, cookiecutter_url
+            )
+        finally:
+            await executors.run("jobs", resource_manager.release, workflow_run_id)
+            resource_manager.unbind(token)
+
+
+async def _run_service_creation(
+    workflow_run_id: str,
+    github_org: str,
+    github_repo: str,
+    template_type: str,
+    properties: dict,
+    cookiecutter_url: Optional[str]
+):
     try:
         logger.info(f"Processing service creation for DX workflow run {workflow_run_id}")
         
+        # Wait until the job fits this worker's memory, disk and file handle budgets
+        await executors.run("jobs", resource_manager.acquire, workflow_run_id, template_type)
+        await executors.run(
+            "jobs", store.update_job, workflow_run_id, status="RUNNING", started_at=time.time(), worker_pid=os.getpid()
+        )
+        
         # Post initial message to DX
-        dx_client.post_message(
+        await executors.run(
+            "jobs",
+            dx_client.post_message,
             workflow_run_id=workflow_run_id,
             message=f"🚀 Starting creation of **{template_type}** service in `{github_org}/{github_repo}`"
         )
@@ -39,34 +84,62 @@ def process_service_creation(
         if template_type == "custom":
             if not cookiecutter_url:
                 raise ValueError("Custom template requires cookiecutter_url")
-            dx_client.post_message(
+            await executors.run(
+                "jobs",
+                dx_client.post_message,
                 workflow_run_id=workflow_run_id,
                 message=f"📦 Using custom template: `{cookiecutter_url}`"
             )
             action = CreateCustomService(cookiecutter_url)
         else:
-            action_class = TEMPLATE_TYPE_TO_CLASS_MAPPING.get(template_type.lower())
-            if not action_class:
+            entry = template_registry.get(template_type)
+            if not entry:
                 raise ValueError(f"Unknown template type: {template_type}")
-            action = action_class()
+            if entry.backend == "github_template":
+                await executors.run(
+                    "jobs",
+                    dx_client.post_message,
+                    workflow_run_id=workflow_run_id,
+                    message=f"📦 Generating from GitHub template repository: `{entry.url}`"
+                )
+                action = CreateTemplateRepoService(entry.url, repo_settings=entry.repository)
+            else:
+                action = CreateCookiecutterService(entry)
         
         # Post message about generating from template
-        dx_client.post_message(
+        await executors.run(
+            "jobs",
+            dx_client.post_message,
             workflow_run_id=workflow_run_id,
             message="⚙️ Generating project from cookiecutter template..."
         )
         
         # Execute service creation
         logger.info(f"Creating {template_type} service")
-        action_status = action.create(github_org, github_repo, properties)
+        action_status = await action.create(github_org, github_repo, properties)
         
         repository_url = f"https://github.com/{github_org}/{github_repo}"
         
-        if action_status == 'SUCCESS':
+        if action_status in ('SUCCESS', 'PARTIAL'):
             logger.info(f"Successfully created service at {repository_url}")
+            # A repository missing some settings is still usable, and a retry would be refused because it exists
+            message = "Repository created"
+            if action_status == 'PARTIAL':
+                message += f", but some repository settings couldn't be applied: {'; '.join(action.settings_errors)}"
+            await executors.run(
+                "jobs",
+                store.update_job,
+                workflow_run_id,
+                status="SUCCEEDED" if action_status == 'SUCCESS' else "PARTIAL",
+                message=message,
+                repository_url=repository_url,
+                finished_at=time.time()
+            )
             
             # Add link to the created repository
-            dx_client.add_link(
+            await executors.run(
+                "jobs",
+                dx_client.add_link,
                 workflow_run_id=workflow_run_id,
                 url=repository_url,
                 label=f"Repository: {github_org}/{github_repo}",
@@ -74,27 +147,50 @@ def process_service_creation(
             )
             
             # Post success message
-            dx_client.post_message(
+            await executors.run(
+                "jobs",
+                dx_client.post_message,
                 workflow_run_id=workflow_run_id,
                 message=f"✅ Successfully created repository and pushed initial code!"
             )
+            if action_status == 'PARTIAL':
+                await executors.run(
+                    "jobs",
+                    dx_client.post_message,
+                    workflow_run_id=workflow_run_id,
+                    message=f"⚠️ **Apply these repository settings manually:** {'; '.join(action.settings_errors)}"
+                )
             
             # Mark workflow as succeeded
-            dx_client.change_status(
+            await executors.run(
+                "jobs",
+                dx_client.change_status,
                 workflow_run_id=workflow_run_id,
                 status="SUCCEEDED"
             )
         else:
             logger.error(f"Failed to create {template_type} service")
+            await executors.run(
+                "jobs",
+                store.update_job,
+                workflow_run_id,
+                status="FAILED",
+                message="Failed to create service",
+                finished_at=time.time()
+            )
             
             # Post failure message
-            dx_client.post_message(
+            await executors.run(
+                "jobs",
+                dx_client.post_message,
                 workflow_run_id=workflow_run_id,
                 message=f"❌ Failed to create service"
             )
             
             # Mark workflow as failed
-            dx_client.change_status(
+            await executors.run(
+                "jobs",
+                dx_client.change_status,
                 workflow_run_id=workflow_run_id,
                 status="FAILED"
             )
@@ -102,34 +198,69 @@ def process_service_creation(
     except Exception as e:
         error_message = f"Error creating service: {str(e)}"
         logger.error(error_message, exc_info=True)
+        await executors.run(
+            "jobs", store.update_job, workflow_run_id, status="FAILED", message=error_message, finished_at=time.time()
+        )
         
         # Post error message to DX
-        dx_client.post_message(
+        await executors.run(
+            "jobs",
+            dx_client.post_message,
             workflow_run_id=workflow_run_id,
             message=f"❌ **Error:** {str(e)}"
         )
         
         # Mark workflow as failed
-        dx_client.change_status(
+        await executors.run(
+            "jobs",
+            dx_client.change_status,
             workflow_run_id=workflow_run_id,
             status="FAILED"
         )
 
 
+def _format_validation_error(error: ValidationError) -> str:
+    """Summarize property validation errors as "name: message" pairs"""
+    return "; ".join(
+        f"{'.'.join(str(part) for part in e['loc'])}: {e['msg']}" for e in error.errors()
+    )
+
+
+async def _forget_job(workflow_run_id: str) -> None:
+    """Delete a job that won't be queued; the original error is what the caller sees"""
+    try:
+        await executors.run("requests", store.delete_job, workflow_run_id)
+    except Exception as e:
+        logger.error(f"Failed to forget job {workflow_run_id}: {e}", exc_info=True)
+
+
 @router.post("/service", response_model=WorkflowResponse)
 async def handle_create_service_webhook(
     workflow: DXWorkflowRequest,
     background_tasks: BackgroundTasks,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key"),
+    x_priority: Optional[str] = Header(None, alias="X-Priority"),
     _verified: bool = Depends(verify_webhook)
 ):
     """
     Webhook endpoint to handle service creation requests from DX self-service workflows.
     
     This endpoint:
-    1. Validates the incoming request from DX
-    2. Queues the service creation as a background task
-    3. Returns immediately with 200 OK
-    4. Reports progress back to DX via their API
+    1. Validates the incoming request from DX (template type and properties
+       against the template registry)
+    2. Records the job in the shared state store, ignoring duplicate requests
+       (same Idempotency-Key header, or same DX workflow run ID)
+    3. Sheds the request with 503 and Retry-After if the queue is too long
+       to start it within ADMISSION_WAIT_SLO_SECONDS, unless it has high
+       priority (priority field or X-Priority header)
+    4. Runs the preflight checks (repository name, organization, existing
+       repository) and rejects failing requests with 4xx
+    5. Queues the service creation as a background task
+    6. Returns immediately with 200 OK
+    7. Reports progress back to DX via their API
+    
+    Blocking calls (state store, admission, preflight lookups) run on the
+    "requests" executor, so accepting a webhook never waits behind job stages.
     """
     logger.info(f"Received DX workflow request: {workflow.model_dump()}")
     
@@ -142,25 +273,91 @@ async def handle_create_service_webhook(
         properties = workflow.get_properties_dict()
         cookiecutter_url = workflow.cookiecutter_url
         
-        # Validate template type
-        if template_type != "custom" and template_type.lower() not in TEMPLATE_TYPE_TO_CLASS_MAPPING:
-            raise HTTPException(
-                status_code=400,
-                detail=f"Unknown template type: {template_type}. "
-                       f"Supported types: {', '.join(TEMPLATE_TYPE_TO_CLASS_MAPPING.keys())}, custom"
-            )
+        # Validate template type and properties against the template registry
+        if template_type == "custom":
+            if not cookiecutter_url:
+                raise HTTPException(status_code=422, detail="Custom template requires cookiecutter_url")
+        else:
+            entry = template_registry.get(template_type)
+            if entry is None:
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"Unknown template type: {template_type}. "
+                           f"Supported types: {', '.join(template_registry.names())}, custom"
+                )
+            try:
+                properties = entry.validate_props(properties)
+            except ValidationError as e:
+                raise HTTPException(
+                    status_code=422,
+                    detail=f"Invalid properties for {entry.name}: {_format_validation_error(e)}"
+                )
         
-        # Queue background task for service creation
-        background_tasks.add_task(
-            process_service_creation,
-            workflow_run_id=workflow_run_id,
+        if workflow.profile and not settings.PROFILING_ENABLED:
+            raise HTTPException(status_code=403, detail="Profiling is disabled (set PROFILING_ENABLED)")
+            
+        # Record the job; duplicates return the existing job instead of queuing again
+        job, created = await executors.run(
+            "requests",
+            store.create_job,
+            job_id=workflow_run_id,
+            template_type=template_type,
             github_org=github_org,
             github_repo=github_repo,
-            template_type=template_type,
-            properties=properties,
-            cookiecutter_url=cookiecutter_url
+            idempotency_key=idempotency_key or f"run:{workflow_run_id}"
         )
+        if not created:
+            logger.info(f"Duplicate request for DX workflow run {workflow_run_id}, job is {job['status']}")
+            return WorkflowResponse(
+                status=job["status"],
+                message=f"Service creation already queued for {job['github_org']}/{job['github_repo']}",
+                execution_id=job["job_id"],
+                repository_url=job["repository_url"]
+            )
         
+        # Until the job is queued, every way out forgets it, so a retry is evaluated as a new request
+        # instead of being deduplicated against a job that never runs
+        try:
+            # Shed load when the backlog is too long
+            if settings.ADMISSION_ENABLED:
+                priority = "high" if (x_priority or "").lower() == "high" else workflow.priority
+                decision = await executors.run(
+                    "requests", admission_controller.admit, workflow_run_id, template_type, priority
+                )
+                if not decision.admitted:
+                    raise HTTPException(
+                        status_code=503,
+                        detail=f"Service is overloaded: jobs are expected to wait {decision.estimated_wait:.0f}s "
+                               f"to start (limit {settings.ADMISSION_WAIT_SLO_SECONDS:g}s). Retry later or send "
+                               f"the request with high priority.",
+                        headers={"Retry-After": str(decision.retry_after)}
+                    )
+                    
+            # Reject requests that can't succeed before any work is queued
+            if settings.PREFLIGHT_ENABLED:
+                try:
+                    await run_preflight(github_org, github_repo)
+                except PreflightError as e:
+                    logger.info(f"Rejected DX workflow run {workflow_run_id}: {e.detail}")
+                    raise HTTPException(status_code=e.status_code, detail=e.detail)
+                    
+            # Queue background task for service creation
+            task = process_service_creation
+            if workflow.profile:
+                task = job_profiler.wrap(workflow_run_id, process_service_creation)
+            background_tasks.add_task(
+                task,
+                workflow_run_id=workflow_run_id,
+                github_org=github_org,
+                github_repo=github_repo,
+                template_type=template_type,
+                properties=properties,
+                cookiecutter_url=cookiecutter_url
+            )
+        except Exception:
+            await _forget_job(workflow_run_id)
+            raise
+            
         logger.info(f"Queued service creation for DX workflow run {workflow_run_id}")
         
         return WorkflowResponse(
@@ -0,0 +1,303 @@
+"""
+Run the service creation pipeline in-process, without the HTTP API, DX or GitHub.
+
+The commands use the same BaseCookiecutterService pipeline as the webhook, with
+the repository pushed to a git remote given on the command line instead of
+one created on GitHub, and print how long each stage took:
+
+    render    render a template and keep the generated project
+    publish   render a template and push it to a remote, e.g. a local bare repository
+    bench     create many projects concurrently and report per-stage latency percentiles
+
+Templates come from the template registry (--template) or from a cookiecutter
+URL or local directory (--template-url), so changes to a template can be
+profiled before they are registered. Required string properties that aren't
+given with --prop get a placeholder value.
+
+Like the server, the commands run from the app directory, so relative paths
+in the settings (template cache, output and state directories) resolve the
+same way. Stages run on the same stage executors as in the server, so
+EXECUTOR_*_THREADS bound how many runs are in each stage at once.
+
+Usage (from the repository root, or `python cli.py ...` from app/):
+    python -m app.cli render --template python --prop project_name=demo
+    python -m app.cli publish --template python --target file:///tmp/demo.git
+    python -m app.cli bench --template python -n 200 --concurrency 16
+"""
+import argparse
+import asyncio
+import logging
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+# Settings paths are resolved when the settings load, so move to the app directory first
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+INVOCATION_DIR = os.getcwd()
+os.chdir(APP_DIR)
+if APP_DIR not in sys.path:
+    sys.path.insert(0, APP_DIR)
+# The CLI is the only process rendering, so it gets all of RENDER_PROCESSES rather than a worker's share
+os.environ.setdefault("WEB_CONCURRENCY", "1")
+
+from git import Repo  # noqa: E402
+from pydantic import ValidationError  # noqa: E402
+
+from actions.base_create_service import BaseCookiecutterService  # noqa: E402
+from actions.create_cookiecutter_service import CreateCookiecutterService  # noqa: E402
+from actions.create_custom_service import CreateCustomService  # noqa: E402
+from core.executors import executors  # noqa: E402
+from core.registry import template_registry  # noqa: E402
+from core.resources import resource_manager  # noqa: E402
+from utils import timed  # noqa: E402
+
+logger = logging.getLogger("cli")
+
+# Repository that jobs are named after when --repo isn't given (used in logs and LFS endpoints)
+DEFAULT_ORG = "cli"
+
+
+class CLIError(Exception):
+    """Raised for invalid command line input"""
+
+
+def parse_props(values: List[str]) -> dict:
+    """Parse KEY=VALUE pairs given with --prop"""
+    props = {}
+    for value in values:
+        key, sep, prop = value.partition("=")
+        if not sep or not key:
+            raise CLIError(f"Invalid --prop '{value}', expected KEY=VALUE")
+        props[key] = prop
+    return props
+
+
+def resolve_template(args: argparse.Namespace) -> Tuple[Callable[[], BaseCookiecutterService], dict]:
+    """
+    Look up the selected template and validate its properties.
+    
+    Returns:
+        A factory for the template's action (one action per run, as actions
+        record their stage timings) and the validated properties
+    """
+    props = parse_props(args.prop)
+    if args.template_url:
+        return lambda: CreateCustomService(args.template_url), props
+        
+    entry = template_registry.get(args.template)
+    if not entry:
+        raise CLIError(f"Unknown template type: {args.template} (registered: {', '.join(template_registry.names())})")
+    if entry.backend != "cookiecutter":
+        raise CLIError(f"Template '{entry.name}' uses the {entry.backend} backend, which only runs on GitHub")
+        
+    for name, field in entry.props_model.model_fields.items():
+        if field.is_required() and field.annotation is str and name not in props:
+            props[name] = f"{DEFAULT_ORG}-{entry.name}"
+            logger.warning(f"Using placeholder {name}={props[name]}")
+    try:
+        return lambda: CreateCookiecutterService(entry), entry.validate_props(props)
+    except ValidationError as e:
+        raise CLIError(f"Invalid properties for template '{entry.name}':\n{e}")
+
+
+def resolve_target(target: str) -> str:
+    """
+    Remote URL to push to. Local paths and file:// URLs of missing
+    repositories are created as empty bare repositories.
+    """
+    if "://" in target and not target.startswith("file://"):
+        return target
+    path = os.path.abspath(target[len("file://"):] if target.startswith("file://") else target)
+    if not os.path.exists(path):
+        Repo.init(path, bare=True)
+    return f"file://{path}"
+
+
+def split_repo(value: str) -> Tuple[str, str]:
+    org, sep, repo = value.partition("/")
+    if not sep or not org or not repo:
+        raise CLIError(f"Invalid --repo '{value}', expected ORG/NAME")
+    return org, repo
+
+
+def print_timings(timings: Dict[str, float]) -> None:
+    for stage, seconds in timings.items():
+        print(f"  {stage:<16} {seconds * 1000:10.1f} ms")
+    print(f"  {'total':<16} {sum(timings.values()) * 1000:10.1f} ms")
+
+
+def percentile(values: List[float], p: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p))]
+
+
+def cmd_render(args: argparse.Namespace) -> int:
+    factory, props = resolve_template(args)
+    timings: Dict[str, float] = {}
+    with timed(timings, "render"):
+        project_dir = factory().render(props)
+    print(f"Rendered {os.path.abspath(project_dir)}")
+    print_timings(timings)
+    return 0
+
+
+def cmd_publish(args: argparse.Namespace) -> int:
+    factory, props = resolve_template(args)
+    service = factory()
+    remote_url = resolve_target(args.target)
+    org, repo = split_repo(args.repo or f"{DEFAULT_ORG}/{args.template or 'custom'}")
+    
+    status = asyncio.run(service.create(org, repo, props, remote_url=remote_url))
+    if status != "SUCCESS":
+        print(f"Failed to publish to {remote_url} (run with -v for details)", file=sys.stderr)
+        print_timings(service.timings)
+        return 1
+    print(f"Published to {remote_url}")
+    print_timings(service.timings)
+    return 0
+
+
+async def _bench_once(
+    factory: Callable[[], BaseCookiecutterService],
+    props: dict,
+    index: int,
+    remote_url: Optional[str]
+) -> Tuple[bool, Dict[str, float]]:
+    """One pipeline run; without a remote_url the project is only rendered and removed"""
+    service = factory()
+    if remote_url is None:
+        timings: Dict[str, float] = {}
+        try:
+            with timed(timings, "render"):
+                project_dir = await executors.run("render", service.render, props)
+            with timed(timings, "cleanup"):
+                await executors.run("git", resource_manager.reap, project_dir)
+        except Exception as e:
+            logger.error(f"Render failed: {e}", exc_info=True)
+            return False, timings
+        return True, timings
+    status = await service.create(DEFAULT_ORG, f"bench-{index}", props, remote_url=remote_url)
+    return status == "SUCCESS", service.timings
+
+
+async def _bench_concurrently(
+    factory: Callable[[], BaseCookiecutterService],
+    props: dict,
+    indexes: range,
+    targets: List[Optional[str]],
+    concurrency: int
+) -> List[Tuple[bool, Dict[str, float]]]:
+    """Run the pipeline for each index, at most concurrency runs at a time"""
+    slots = asyncio.Semaphore(concurrency)
+    
+    async def run(index: int) -> Tuple[bool, Dict[str, float]]:
+        async with slots:
+            return await _bench_once(factory, props, index, targets[index])
+    return await asyncio.gather(*(run(index) for index in indexes))
+
+
+def cmd_bench(args: argparse.Namespace) -> int:
+    factory, props = resolve_template(args)
+    workdir = tempfile.mkdtemp(prefix="cli-bench-")
+    try:
+        total = args.warmup + args.iterations
+        if args.render_only:
+            targets: List[Optional[str]] = [None] * total
+        else:
+            # Bare repositories are created up front so they aren't part of the measurements
+            targets = [resolve_target(os.path.join(workdir, f"bench-{i}.git")) for i in range(total)]
+            
+        warmup = asyncio.run(_bench_concurrently(factory, props, range(args.warmup), targets, 1))
+        if not all(ok for ok, _ in warmup):
+            print("Warm-up run failed (run with -v for details)", file=sys.stderr)
+            return 1
+            
+        start = time.perf_counter()
+        results = asyncio.run(_bench_concurrently(factory, props, range(args.warmup, total), targets, args.concurrency))
+        elapsed = time.perf_counter() - start
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+        
+    stages: Dict[str, List[float]] = {}
+    totals = []
+    for ok, timings in results:
+        if not ok:
+            continue
+        for stage, seconds in timings.items():
+            stages.setdefault(stage, []).append(seconds)
+        totals.append(sum(timings.values()))
+    failures = len(results) - len(totals)
+    
+    mode = "render only" if args.render_only else "render and publish"
+    print(
+        f"{args.iterations} runs ({mode}), concurrency {args.concurrency}: "
+        f"{elapsed:.2f}s, {len(totals) / elapsed:.2f} jobs/s, {failures} failed"
+    )
+    if not totals:
+        return 1
+    print(f"  {'stage':<16} {'mean':>10} {'p50':>10} {'p95':>10} {'max':>10}   (ms)")
+    for stage, values in [*stages.items(), ("total", totals)]:
+        print(
+            f"  {stage:<16} {statistics.mean(values) * 1000:10.1f} {statistics.median(values) * 1000:10.1f}"
+            f" {percentile(values, 0.95) * 1000:10.1f} {max(values) * 1000:10.1f}"
+        )
+    return 1 if failures else 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="python -m app.cli",
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("-v", "--verbose", action="store_true", help="Log pipeline progress")
+    commands = parser.add_subparsers(dest="command", required=True)
+    
+    template = argparse.ArgumentParser(add_help=False)
+    source = template.add_mutually_exclusive_group(required=True)
+    source.add_argument("--template", help="Template type or alias from the template registry")
+    source.add_argument("--template-url", help="Cookiecutter template URL or local directory")
+    template.add_argument("--prop", action="append", default=[], metavar="KEY=VALUE", help="Template property")
+    
+    commands.add_parser("render", parents=[template], help="Render a template and keep the project")
+    
+    publish = commands.add_parser("publish", parents=[template], help="Render a template and push it")
+    publish.add_argument(
+        "--target", required=True,
+        help="Remote to push to; a file:// URL or path that doesn't exist is created as a bare repository"
+    )
+    publish.add_argument("--repo", help="ORG/NAME the job is named after, used for LFS endpoints (default cli/<template>)")
+    
+    bench = commands.add_parser("bench", parents=[template], help="Create projects concurrently and time each stage")
+    bench.add_argument("-n", "--iterations", type=int, default=20, help="Measured runs")
+    bench.add_argument("--concurrency", type=int, default=4, help="Runs at a time")
+    bench.add_argument("--warmup", type=int, default=1, help="Runs before measuring (fills the template cache)")
+    bench.add_argument("--render-only", action="store_true", help="Only render, don't commit or push")
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    logging.basicConfig(
+        level=logging.INFO if args.verbose else logging.WARNING,
+        format="%(asctime)s %(levelname)s %(name)s: %(message)s"
+    )
+    if args.template_url and os.path.isdir(os.path.join(INVOCATION_DIR, args.template_url)):
+        args.template_url = os.path.join(INVOCATION_DIR, args.template_url)
+    if getattr(args, "target", None) and "://" not in args.target:
+        args.target = os.path.join(INVOCATION_DIR, args.target)
+    
+    commands = {"render": cmd_render, "publish": cmd_publish, "bench": cmd_bench}
+    try:
+        return commands[args.command](args)
+    except CLIError as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
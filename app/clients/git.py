@@ -1,14 +1,71 @@
+import fcntl
+import fnmatch
 import logging
 import os
+import re
 import shutil
+import threading
+import time
+import uuid
+from dataclasses import dataclass, field
 from pathlib import Path
+from typing import IO, Dict, List, Optional, Set, Tuple
+from binaryornot.check import is_binary
 from git import Repo
 
+from clients.lfs import LFSObject, lfs_client, pointer, store_object
 from core.config import settings
+from core.resources import tree_bytes
+from utils import timed
 
 logger = logging.getLogger(__name__)
 
 remote_name = "origin"
+default_branch = "main"
+
+# GitHub rejects pushes containing files larger than this
+GITHUB_MAX_FILE_BYTES = 100 * 1024 * 1024
+
+# Paths passed to one `git check-ignore` call
+IGNORE_CHECK_BATCH_SIZE = 1000
+
+# Characters with a meaning in .gitattributes patterns
+GITATTRIBUTES_SPECIAL = re.compile(r"([\\*?\[\]!#])")
+
+# Generations of the shared object cache, named so that they sort by creation time
+GENERATION_PATTERN = re.compile(r"^g-\d{13}-[0-9a-f]{8}$")
+
+# Shared lock on the object cache generation each repository of this process borrows from:
+# git dir -> (lease file, generation directory)
+_object_cache_leases: Dict[str, Tuple[IO, str]] = {}
+_object_cache_lock = threading.Lock()
+
+
+@dataclass
+class StagedFiles:
+    """What stage_files() committed, by how each file is stored"""
+    files: int = 0
+    bytes: int = 0
+    lfs_objects: List[LFSObject] = field(default_factory=list)
+    large_files: List[str] = field(default_factory=list)  # Over LFS_THRESHOLD_BYTES but committed directly
+
+
+def get_remote_url(remote_org: str, remote_repo: str) -> str:
+    """
+    Build the push URL for a repository.
+    HTTPS URLs carry the GitHub token; other schemes (e.g. file://) are used as-is.
+    
+    Args:
+        remote_org: GitHub organization or username
+        remote_repo: Repository name
+        
+    Returns:
+        Remote URL for the repository
+    """
+    base_url = settings.GH_GIT_URL.rstrip("/")
+    if base_url.startswith("https://"):
+        base_url = f"https://{settings.GH_ACCESS_TOKEN}@{base_url[len('https://'):]}"
+    return f"{base_url}/{remote_org}/{remote_repo}"
 
 
 def init_repo(path: str) -> Repo:
@@ -22,7 +79,246 @@ def init_repo(path: str) -> Repo:
         Initialized Repo object
     """
     logger.info(f"Initializing git repository at {path}")
-    return Repo.init(path)
+    repo = Repo.init(path)
+    if settings.GIT_OBJECT_CACHE_DIR:
+        _use_object_cache(repo)
+    return repo
+
+
+def _use_object_cache(repo: Repo) -> None:
+    """
+    Borrow objects from the shared object cache (git alternates), so files
+    that an earlier job already stored are not compressed and written again.
+    
+    The repository borrows from the newest generation of the cache and holds
+    a shared lock on it until release_object_cache(), so the generation isn't
+    pruned while the repository may still need its objects.
+    """
+    cache_dir = os.path.abspath(settings.GIT_OBJECT_CACHE_DIR)
+    os.makedirs(cache_dir, exist_ok=True)
+    while True:
+        generation = _current_generation(cache_dir)
+        try:
+            lease = open(os.path.join(generation, ".lease"), "a")
+        except FileNotFoundError:
+            continue  # Pruned since it was listed
+        fcntl.flock(lease, fcntl.LOCK_SH)
+        # Pruning renames a generation away while holding an exclusive lock, so it's safe to use if it's still there
+        if os.path.isdir(generation):
+            break
+        lease.close()
+        
+    with _object_cache_lock:
+        _object_cache_leases[repo.git_dir] = (lease, generation)
+    alternates_path = os.path.join(repo.git_dir, "objects", "info", "alternates")
+    os.makedirs(os.path.dirname(alternates_path), exist_ok=True)
+    with open(alternates_path, "a+") as f:
+        f.seek(0)
+        if generation not in f.read().splitlines():
+            f.write(f"{generation}\n")
+
+
+def release_object_cache(repo: Repo) -> None:
+    """Stop borrowing from the shared object cache; the repository can't be used afterwards"""
+    with _object_cache_lock:
+        lease = _object_cache_leases.pop(repo.git_dir, None)
+    if lease is not None:
+        lease[0].close()
+
+
+def _generations(cache_dir: str) -> List[str]:
+    """Generations of the object cache, oldest first"""
+    try:
+        names = os.listdir(cache_dir)
+    except FileNotFoundError:
+        return []
+    return [os.path.join(cache_dir, name) for name in sorted(names) if GENERATION_PATTERN.match(name)]
+
+
+def _current_generation(cache_dir: str) -> str:
+    generations = _generations(cache_dir)
+    return generations[-1] if generations else _new_generation(cache_dir)
+
+
+def _new_generation(cache_dir: str) -> str:
+    generation = os.path.join(cache_dir, f"g-{int(time.time() * 1000)}-{uuid.uuid4().hex[:8]}")
+    os.makedirs(generation)
+    return generation
+
+
+def prune_object_cache() -> int:
+    """
+    Bound the shared object cache. Once the newest generation holds
+    GIT_OBJECT_CACHE_MAX_MB, new repositories start borrowing from a fresh
+    one; older generations are deleted as soon as no repository, in any
+    worker process, borrows from them any more.
+    
+    Returns:
+        Bytes in the cache after pruning
+    """
+    cache_dir = os.path.abspath(settings.GIT_OBJECT_CACHE_DIR)
+    os.makedirs(cache_dir, exist_ok=True)
+    with open(os.path.join(cache_dir, ".prune.lock"), "a") as prune_lock:
+        try:
+            fcntl.flock(prune_lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            # Another worker is pruning right now
+            return sum(tree_bytes(generation) for generation in _generations(cache_dir))
+            
+        # Left behind if a worker stopped between retiring a generation and deleting it
+        for name in os.listdir(cache_dir):
+            if name.startswith("retired-"):
+                shutil.rmtree(os.path.join(cache_dir, name), ignore_errors=True)
+                
+        generations = _generations(cache_dir)
+        sizes = {generation: tree_bytes(generation) for generation in generations}
+        newest = sizes[generations[-1]] if generations else 0
+        if newest and newest >= settings.GIT_OBJECT_CACHE_MAX_MB * 1024 * 1024:
+            generation = _new_generation(cache_dir)
+            generations.append(generation)
+            sizes[generation] = 0
+            logger.info(f"Shared object cache is full, new repositories borrow from {generation}")
+            
+        for generation in generations[:-1]:
+            with open(os.path.join(generation, ".lease"), "a") as lease:
+                try:
+                    fcntl.flock(lease, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    continue  # Still borrowed from
+                retired = os.path.join(cache_dir, f"retired-{os.path.basename(generation)}")
+                os.rename(generation, retired)
+            shutil.rmtree(retired, ignore_errors=True)
+            del sizes[generation]
+        return sum(sizes.values())
+
+
+def publish_objects(repo: Repo) -> int:
+    """
+    Copy the repository's loose objects into the object cache generation it
+    borrows from, for later jobs to borrow. Objects are content-addressed, so
+    existing ones are skipped and each is moved into place atomically.
+    
+    Args:
+        repo: Repository initialized with init_repo()
+        
+    Returns:
+        Number of objects added to the cache
+    """
+    with _object_cache_lock:
+        lease = _object_cache_leases.get(repo.git_dir)
+    if lease is None:
+        return 0
+    cache_dir = lease[1]
+    objects_dir = os.path.join(repo.git_dir, "objects")
+    published = 0
+    for fanout in os.scandir(objects_dir):
+        if len(fanout.name) != 2 or not fanout.is_dir():
+            continue  # info/ and pack/
+        for obj in os.scandir(fanout.path):
+            target = os.path.join(cache_dir, fanout.name, obj.name)
+            if os.path.exists(target):
+                continue
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            temp_path = f"{target}.{uuid.uuid4().hex}.tmp"
+            try:
+                os.link(obj.path, temp_path)
+            except OSError:
+                shutil.copyfile(obj.path, temp_path)
+            os.replace(temp_path, target)
+            published += 1
+    return published
+
+
+def _is_lfs_path(rel_path: str) -> bool:
+    return any(
+        fnmatch.fnmatch(rel_path, pattern) or fnmatch.fnmatch(os.path.basename(rel_path), pattern)
+        for pattern in settings.LFS_PATTERNS
+    )
+
+
+def stage_files(repo: Repo) -> StagedFiles:
+    """
+    Stage every file in the working tree, classifying files by size and type.
+    
+    With LFS_ENABLED, files matching LFS_PATTERNS of at least
+    LFS_THRESHOLD_BYTES are moved to the LFS object cache and replaced by LFS
+    pointers, which are marked in .gitattributes. Other large files are
+    committed directly and logged, and files too large for GitHub are
+    rejected before anything is pushed. Files excluded by .gitignore are
+    left alone.
+    
+    Args:
+        repo: Git repository object
+        
+    Returns:
+        What was staged, including the LFS objects to upload before pushing
+        
+    Raises:
+        ValueError: If a file can't be pushed to GitHub without LFS
+    """
+    root = repo.working_dir
+    staged = StagedFiles()
+    lfs_paths = []
+    rel_paths = []
+    for dirpath, dirnames, filenames in os.walk(root):
+        if ".git" in dirnames:
+            dirnames.remove(".git")
+        for name in filenames:
+            path = os.path.join(dirpath, name)
+            if not os.path.islink(path):
+                rel_paths.append(os.path.relpath(path, root).replace(os.sep, "/"))
+                
+    # Files excluded by .gitignore are never committed, so they aren't counted or sent to LFS
+    ignored = _ignored_paths(repo, rel_paths)
+    for rel_path in rel_paths:
+        if rel_path in ignored:
+            continue
+        path = os.path.join(root, rel_path)
+        size = os.path.getsize(path)
+        staged.files += 1
+        
+        if size >= settings.LFS_THRESHOLD_BYTES:
+            if settings.LFS_ENABLED and _is_lfs_path(rel_path):
+                obj = store_object(path)
+                with open(path, "w") as f:
+                    f.write(pointer(obj))
+                staged.lfs_objects.append(obj)
+                lfs_paths.append(rel_path)
+                continue
+            if size > GITHUB_MAX_FILE_BYTES:
+                raise ValueError(
+                    f"{rel_path} is {size // (1024 * 1024)} MB, over GitHub's 100 MB limit. "
+                    f"Enable LFS_ENABLED and add a matching pattern to LFS_PATTERNS."
+                )
+            kind = "binary" if is_binary(path) else "text"
+            staged.large_files.append(f"{rel_path} ({kind}, {size} bytes)")
+        staged.bytes += size
+        
+    if lfs_paths:
+        with open(os.path.join(root, ".gitattributes"), "a") as f:
+            f.write("\n# Git LFS\n")
+            for rel_path in lfs_paths:
+                escaped = GITATTRIBUTES_SPECIAL.sub(r"\\\1", rel_path).replace(" ", "[[:space:]]")
+                f.write(f"/{escaped} filter=lfs diff=lfs merge=lfs -text\n")
+    if staged.large_files:
+        logger.warning(
+            f"Committing {len(staged.large_files)} large files without LFS: {', '.join(staged.large_files)}"
+        )
+        
+    repo.git.add('.')
+    logger.info(
+        f"Staged {staged.files} files ({staged.bytes} bytes in git, "
+        f"{len(staged.lfs_objects)} in LFS totalling {sum(obj.size for obj in staged.lfs_objects)} bytes)"
+    )
+    return staged
+
+
+def _ignored_paths(repo: Repo, rel_paths: List[str]) -> Set[str]:
+    """Paths among rel_paths that .gitignore excludes, checked in batches to keep command lines short"""
+    ignored = set()
+    for start in range(0, len(rel_paths), IGNORE_CHECK_BATCH_SIZE):
+        ignored.update(repo.ignored(*rel_paths[start:start + IGNORE_CHECK_BATCH_SIZE]))
+    return ignored
 
 
 def remove_workflow_files(repo_path: str) -> None:
@@ -50,11 +346,14 @@ def upload_all_files(
     remote_org: str,
     remote_repo: str,
     commit_msg: str = "Initial commit from template",
-    head_branch: str = "main",
-    exclude_workflows: bool = False
+    head_branch: str = default_branch,
+    exclude_workflows: bool = False,
+    remote_url: Optional[str] = None,
+    timings: Optional[Dict[str, float]] = None
 ) -> None:
     """
     Stage all files, commit, and push to remote GitHub repository.
+    Files routed to LFS (see stage_files) are uploaded before the push.
     
     Args:
         repo: Git repository object
@@ -64,6 +363,8 @@ def upload_all_files(
         head_branch: Name of the main branch
         exclude_workflows: If True, removes .github/workflows before committing
                           (use this if token doesn't have 'workflow' scope)
+        remote_url: Push here instead of the GitHub URL of remote_org/remote_repo
+        timings: If given, seconds spent in each step are added to it
     """
     try:
         # Remove workflow files if requested
@@ -71,13 +372,16 @@ def upload_all_files(
             remove_workflow_files(repo.working_dir)
         
         logger.info(f"Staging all files in {repo.working_dir}")
-        repo.git.add('.')
+        with timed(timings, "stage"):
+            staged = stage_files(repo)
         
         logger.info(f"Creating commit: {commit_msg}")
-        repo.index.commit(commit_msg)
+        with timed(timings, "commit"):
+            repo.index.commit(commit_msg)
         
         # Create remote URL with authentication token
-        remote_url = f"https://{settings.GH_ACCESS_TOKEN}@github.com/{remote_org}/{remote_repo}"
+        if remote_url is None:
+            remote_url = get_remote_url(remote_org, remote_repo)
         
         logger.info(f"Adding remote origin: {remote_org}/{remote_repo}")
         repo.create_remote(name=remote_name, url=remote_url)
@@ -85,11 +389,24 @@ def upload_all_files(
         logger.info(f"Creating branch: {head_branch}")
         branch = repo.create_head(head_branch)
         
+        # LFS objects must be on the server before the pointers referencing them are pushed
+        if staged.lfs_objects:
+            with timed(timings, "lfs_upload"):
+                lfs_client.upload(remote_org, remote_repo, staged.lfs_objects, ref=f"refs/heads/{head_branch}")
+            
         logger.info(f"Pushing to remote: {remote_name}/{head_branch}")
-        repo.git.push("--set-upstream", remote_name, branch)
+        with timed(timings, "push"):
+            repo.git.push("--set-upstream", remote_name, branch)
         
         logger.info(f"Successfully pushed all files to {remote_org}/{remote_repo}")
         
+        if settings.GIT_OBJECT_CACHE_DIR:
+            try:
+                with timed(timings, "publish_objects"):
+                    publish_objects(repo)
+            except OSError as e:
+                logger.warning(f"Failed to add objects to the shared object cache: {e}")
+        
     except Exception as e:
         logger.error(f"Failed to upload files to {remote_org}/{remote_repo}: {e}")
         raise
@@ -1,15 +1,301 @@
+import base64
+import json
 import logging
-from github import Github, GithubException
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from functools import cached_property
+from typing import Any, Dict, List, Optional, Tuple, Union
+from urllib.parse import urlparse
+
+import requests
+from github import Github, GithubException, InputGitTreeElement
+from github.AuthenticatedUser import AuthenticatedUser
+from github.GitCommit import GitCommit
+from github.GitRef import GitRef
+from github.GitTreeElement import GitTreeElement
+from github.Organization import Organization
+from github.Repository import Repository
+from github.Requester import HTTPRequestsConnectionClass, HTTPSRequestsConnectionClass, Requester
+from urllib3.exceptions import NewConnectionError
 
 from core.config import settings
+from core.resilience import CONNECT, SERVER, THROTTLED, TIMEOUT, Failure, Upstream, classify_status
 
 logger = logging.getLogger(__name__)
 
-# Initialize GitHub client
-g = Github(settings.GH_ACCESS_TOKEN, timeout=60)
+github_upstream = Upstream("github", max_timeout=settings.GH_TIMEOUT_SECONDS)
+
+# Path segments that identify a resource rather than an endpoint, replaced when naming endpoints
+_ENDPOINT_PATTERNS = [
+    (re.compile(r"/repos/[^/]+/[^/]+"), "/repos/:owner/:repo"),
+    (re.compile(r"/(orgs|users)/[^/]+"), r"/\1/:name"),
+    (re.compile(r"/teams/[^/]+"), "/teams/:team"),
+    (re.compile(r"/git/(refs?)/.+"), r"/git/\1/:ref"),
+    (re.compile(r"/branches/.+"), "/branches/:branch"),
+    (re.compile(r"/[0-9a-f]{40}\b"), "/:sha"),
+]
+
+# Latest core rate limit seen on any response: (remaining, limit, reset epoch, observed at epoch)
+_rate_limit: Optional[Tuple[int, int, float, float]] = None
+
+# Git Data API writes are content-addressed or set a ref to a given SHA, so repeating them is harmless
+_IDEMPOTENT_WRITE = re.compile(r"/git/(blobs|trees|commits|refs)")
+
+
+def _endpoint_name(method: str, path: str) -> str:
+    for pattern, replacement in _ENDPOINT_PATTERNS:
+        path = pattern.sub(replacement, path)
+    return f"{method} {path}"
+
+
+def _classify(response: Optional[requests.Response], error: Optional[Exception]) -> Optional[Failure]:
+    """Decide whether a GitHub API attempt failed in a way worth retrying"""
+    if isinstance(error, requests.ConnectTimeout):
+        return Failure(CONNECT)
+    if isinstance(error, requests.ConnectionError):
+        reason = getattr(error.args[0], "reason", None) if error.args else None
+        return Failure(CONNECT if isinstance(reason, NewConnectionError) else SERVER)
+    if isinstance(error, requests.Timeout):
+        return Failure(TIMEOUT)
+    if response is None:
+        return None
+        
+    # Primary and secondary rate limits come back as 403 or 429
+    if response.status_code in (403, 429):
+        if response.headers.get("x-ratelimit-remaining") == "0":
+            reset = float(response.headers.get("x-ratelimit-reset", 0))
+            return Failure(THROTTLED, max(0.0, reset - time.time()))
+        if "secondary rate limit" in response.text.lower():
+            return Failure(THROTTLED, float(response.headers.get("Retry-After", 60)))
+    return classify_status(response.status_code, response.headers)
+
+
+def _record_rate_limit(response: requests.Response) -> None:
+    global _rate_limit
+    headers = response.headers
+    if "x-ratelimit-remaining" not in headers or headers.get("x-ratelimit-resource", "core") != "core":
+        return
+    try:
+        _rate_limit = (
+            int(headers["x-ratelimit-remaining"]),
+            int(headers.get("x-ratelimit-limit", 0)),
+            float(headers.get("x-ratelimit-reset", 0)),
+            time.time()
+        )
+    except ValueError:
+        pass
+
+
+class _ResilientAdapter(requests.adapters.HTTPAdapter):
+    """Sends every GitHub API request through the resilience layer, with the endpoint's adaptive timeout"""
+    
+    def send(self, request, stream=False, timeout=None, verify=True, cert=None, proxies=None):
+        method = request.method.upper()
+        path = urlparse(request.url).path
+        idempotent = method in ("GET", "HEAD", "PUT", "DELETE") or bool(_IDEMPOTENT_WRITE.search(path))
+        
+        def attempt(attempt_timeout: float) -> requests.Response:
+            response = super(_ResilientAdapter, self).send(
+                request, stream=stream, timeout=attempt_timeout, verify=verify, cert=cert, proxies=proxies
+            )
+            if not stream:
+                # Read the body now so the connection goes back to the pool even if the response is retried
+                response.content
+            _record_rate_limit(response)
+            return response
+            
+        return github_upstream.call(_endpoint_name(method, path), attempt, _classify, idempotent=idempotent)
+
 
+# One adapter (and connection pool) shared by every PyGithub connection and _session
+_adapter = _ResilientAdapter(pool_connections=10, pool_maxsize=32)
 
-def create_repo(github_org: str, github_repo: str, private: bool = True, description: str = "") -> bool:
+
+class _ResilientHTTPSConnection(HTTPSRequestsConnectionClass):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.session.mount("https://", _adapter)
+    
+    def close(self) -> None:
+        # Keep the shared connection pool open
+        pass
+
+
+class _ResilientHTTPConnection(HTTPRequestsConnectionClass):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.session.mount("http://", _adapter)
+    
+    def close(self) -> None:
+        pass
+
+
+# Must happen before the client is created; PyGithub then makes a connection object per request
+Requester.injectConnectionClasses(_ResilientHTTPConnection, _ResilientHTTPSConnection)
+
+# Initialize GitHub client (retries are handled by the resilience layer)
+g = Github(
+    settings.GH_ACCESS_TOKEN,
+    base_url=settings.GH_API_URL,
+    timeout=settings.GH_TIMEOUT_SECONDS,
+    retry=None,
+    seconds_between_requests=settings.GH_SECONDS_BETWEEN_REQUESTS,
+    seconds_between_writes=settings.GH_SECONDS_BETWEEN_WRITES
+)
+
+# Session for calls PyGithub doesn't cover (GraphQL, team access), on the same pool and resilience layer
+_session = requests.Session()
+_session.mount("https://", _adapter)
+_session.mount("http://", _adapter)
+_session.headers.update({
+    "Accept": "application/vnd.github+json",
+    "User-Agent": settings.PROJECT_NAME,
+    **({"Authorization": f"token {settings.GH_ACCESS_TOKEN}"} if settings.GH_ACCESS_TOKEN else {})
+})
+
+# Runs the calls of the repository settings stage concurrently
+_settings_executor = ThreadPoolExecutor(
+    max_workers=settings.GH_REPO_SETTINGS_MAX_PARALLEL, thread_name_prefix="repo-settings"
+)
+
+
+def get_rate_limit(max_age: float) -> Optional[Tuple[int, int, float, float]]:
+    """
+    Get the core API rate limit, as seen on recent responses.
+    Only calls the API (GET /rate_limit, which doesn't count against the limit)
+    if nothing was seen in the last max_age seconds.
+    
+    Args:
+        max_age: How old the last observation may be, in seconds
+        
+    Returns:
+        (remaining, limit, reset epoch, observed at epoch), or None if unknown
+    """
+    global _rate_limit
+    if _rate_limit is None or time.time() - _rate_limit[3] > max_age:
+        core = g.get_rate_limit().core
+        _rate_limit = (core.remaining, core.limit, core.reset.timestamp(), time.time())
+    return _rate_limit
+
+
+@dataclass
+class FileChange:
+    """
+    A file to write with the Git Data API.
+    Set content to write new text, or sha to reuse a blob that already exists in the repository.
+    """
+    mode: str
+    content: Optional[str] = None
+    sha: Optional[str] = None
+
+
+# Repository options a template can set; they are sent with the repository creation
+REPO_OPTIONS = (
+    "has_issues", "has_wiki", "has_projects",
+    "allow_squash_merge", "allow_merge_commit", "allow_rebase_merge", "delete_branch_on_merge"
+)
+
+# Branch protection settings a template can set, and their CreateBranchProtectionRuleInput fields
+BRANCH_PROTECTION_FIELDS = {
+    "required_approving_review_count": "requiredApprovingReviewCount",
+    "require_code_owner_reviews": "requiresCodeOwnerReviews",
+    "dismiss_stale_reviews": "dismissesStaleReviews",
+    "required_status_checks": "requiredStatusCheckContexts",
+    "strict_status_checks": "requiresStrictStatusChecks",
+    "enforce_admins": "isAdminEnforced",
+    "require_linear_history": "requiresLinearHistory",
+    "require_conversation_resolution": "requiresConversationResolution",
+    "allow_force_pushes": "allowsForcePushes",
+    "allow_deletions": "allowsDeletions",
+}
+
+TEAM_PERMISSIONS = ("pull", "triage", "push", "maintain", "admin")
+
+
+@dataclass(frozen=True)
+class RepoSettings:
+    """
+    Settings applied to every repository created from a template.
+    Built once per template registry load; the GraphQL mutation is compiled on first use and reused.
+    """
+    options: Tuple[Tuple[str, bool], ...] = ()  # REPO_OPTIONS
+    topics: Tuple[str, ...] = ()
+    branch_protection: Tuple[Tuple[str, Any], ...] = ()  # BRANCH_PROTECTION_FIELDS keys, for the default branch
+    teams: Tuple[Tuple[str, str], ...] = ()  # (team slug, permission)
+    
+    @cached_property
+    def mutation(self) -> Optional[str]:
+        """One GraphQL request that sets the topics and creates the branch protection rule"""
+        variables, fields = ["$repositoryId: ID!"], []
+        if self.topics:
+            topic_names = json.dumps(list(self.topics))
+            fields.append(
+                f"topics: updateTopics(input: {{repositoryId: $repositoryId, topicNames: {topic_names}}}) "
+                f"{{ invalidTopicNames }}"
+            )
+        if self.branch_protection:
+            variables.append("$pattern: String!")
+            protection = dict(self.branch_protection)
+            inputs = {"repositoryId": "$repositoryId", "pattern": "$pattern"}
+            if "required_approving_review_count" in protection:
+                inputs["requiresApprovingReviews"] = json.dumps(protection["required_approving_review_count"] > 0)
+            if "required_status_checks" in protection:
+                inputs["requiresStatusChecks"] = json.dumps(bool(protection["required_status_checks"]))
+            for name, value in protection.items():
+                inputs[BRANCH_PROTECTION_FIELDS[name]] = json.dumps(value)
+            fields.append(
+                "protection: createBranchProtectionRule(input: {"
+                + ", ".join(f"{field}: {value}" for field, value in inputs.items())
+                + "}) { branchProtectionRule { id } }"
+            )
+        if not fields:
+            return None
+        return f"mutation({', '.join(variables)}) {{ {' '.join(fields)} }}"
+
+
+# Template repositories rarely change, so look each one up only once
+_template_repos: Dict[str, Repository] = {}
+
+# Owner lookups, cached for GH_OWNER_CACHE_TTL_SECONDS: name -> (owner, fetched_at)
+_owners: Dict[str, Tuple[Union[AuthenticatedUser, Organization], float]] = {}
+_owners_lock = threading.Lock()
+
+
+def get_owner(github_org: str) -> Union[AuthenticatedUser, Organization]:
+    """
+    Get the authenticated user if it matches github_org, otherwise the organization.
+    Lookups are cached, so repeated requests for the same owner make no API calls.
+    
+    Args:
+        github_org: Organization name or username
+        
+    Returns:
+        The user or organization, raises GithubException if it can't be found
+    """
+    with _owners_lock:
+        cached = _owners.get(github_org)
+    if cached and time.monotonic() - cached[1] < settings.GH_OWNER_CACHE_TTL_SECONDS:
+        return cached[0]
+        
+    user = g.get_user()
+    
+    # Check if target is the authenticated user or an organization
+    owner = user if user.login == github_org else g.get_organization(github_org)
+    with _owners_lock:
+        _owners[github_org] = (owner, time.monotonic())
+    return owner
+
+
+def create_repo(
+    github_org: str,
+    github_repo: str,
+    private: bool = True,
+    description: str = "",
+    options: Optional[Dict[str, bool]] = None
+) -> Repository:
     """
     Create a new GitHub repository in the specified organization or user account.
     
@@ -18,34 +304,257 @@ def create_repo(github_org: str, github_repo: str, private: bool = True, descrip
         github_repo: Repository name
         private: Whether the repository should be private
         description: Repository description
+        options: Repository options (see REPO_OPTIONS), set in the same call
         
     Returns:
-        True if successful, raises exception otherwise
+        The new repository, raises exception otherwise
     """
     try:
-        user = g.get_user()
-        
-        # Check if target is the authenticated user or an organization
-        if user.login == github_org:
-            org = user
-        else:
-            org = g.get_organization(github_org)
+        org = get_owner(github_org)
         
         logger.info(f"Creating repository {github_org}/{github_repo}")
-        org.create_repo(
+        repo = org.create_repo(
             github_repo,
             private=private,
             description=description,
-            auto_init=False  # We'll push our own initial commit
+            auto_init=False,  # We'll push our own initial commit
+            **(options or {})
         )
         logger.info(f"Successfully created repository {github_org}/{github_repo}")
-        return True
+        return repo
         
     except GithubException as e:
         logger.error(f"Failed to create repository {github_org}/{github_repo}: {e}")
         raise
 
 
+def create_repo_from_template(
+    github_org: str,
+    github_repo: str,
+    template_repo: str,
+    private: bool = True,
+    description: str = ""
+) -> Repository:
+    """
+    Create a new GitHub repository from a template repository.
+    GitHub copies the template's files server-side.
+    
+    Args:
+        github_org: Organization name or username
+        github_repo: Repository name
+        template_repo: Template repository as "owner/repo"
+        private: Whether the repository should be private
+        description: Repository description
+        
+    Returns:
+        The new repository, raises exception otherwise
+    """
+    try:
+        template = _template_repos.get(template_repo)
+        if template is None:
+            template = g.get_repo(template_repo)
+            _template_repos[template_repo] = template
+            
+        org = get_owner(github_org)
+        
+        logger.info(f"Generating repository {github_org}/{github_repo} from template {template_repo}")
+        repo = org.create_repo_from_template(
+            github_repo,
+            template,
+            description=description,
+            private=private
+        )
+        logger.info(f"Successfully generated repository {github_org}/{github_repo}")
+        return repo
+        
+    except GithubException as e:
+        logger.error(f"Failed to generate repository {github_org}/{github_repo} from {template_repo}: {e}")
+        raise
+
+
+def wait_for_branch(repo: Repository, branch: str, timeout: float) -> Tuple[GitRef, GitCommit]:
+    """
+    Wait for a branch to exist. Repositories generated from a template are
+    populated asynchronously, so the branch may not be there straight away.
+    
+    Args:
+        repo: Repository to check
+        branch: Branch name
+        timeout: Maximum time to wait in seconds
+        
+    Returns:
+        The branch ref and its head commit, raises exception on timeout
+    """
+    deadline = time.monotonic() + timeout
+    delay = 0.1
+    while True:
+        try:
+            ref = repo.get_git_ref(f"heads/{branch}")
+            return ref, repo.get_git_commit(ref.object.sha)
+        except GithubException as e:
+            # 404 until the branch exists, 409 while the repository is still empty
+            if e.status not in (404, 409) or time.monotonic() + delay > deadline:
+                raise
+        time.sleep(delay)
+        delay = min(delay * 2, 2)
+
+
+def list_tree_files(repo: Repository, tree_sha: str) -> List[GitTreeElement]:
+    """
+    List every file in a tree, including files in subdirectories.
+    
+    Args:
+        repo: Repository the tree belongs to
+        tree_sha: SHA of the tree
+        
+    Returns:
+        Blob entries of the tree
+    """
+    tree = repo.get_git_tree(tree_sha, recursive=True)
+    return [element for element in tree.tree if element.type == "blob"]
+
+
+def read_blob(repo: Repository, blob_sha: str) -> bytes:
+    """
+    Read the content of a blob.
+    
+    Args:
+        repo: Repository the blob belongs to
+        blob_sha: SHA of the blob
+        
+    Returns:
+        Raw blob content
+    """
+    blob = repo.get_git_blob(blob_sha)
+    return base64.b64decode(blob.content)
+
+
+def commit_files(
+    repo: Repository,
+    ref: GitRef,
+    parent: GitCommit,
+    files: Dict[str, Optional[FileChange]],
+    commit_msg: str
+) -> GitCommit:
+    """
+    Commit file changes on top of a branch using the Git Data API, without a local clone.
+    
+    Args:
+        repo: Repository to commit to
+        ref: Branch ref to update
+        parent: Current head commit of the branch
+        files: Map of path to the change to write, or None to delete the path
+        commit_msg: Commit message
+        
+    Returns:
+        The new commit
+    """
+    elements = []
+    for path, change in files.items():
+        if change is None:
+            elements.append(InputGitTreeElement(path, "100644", "blob", sha=None))
+        elif change.content is not None:
+            elements.append(InputGitTreeElement(path, change.mode, "blob", content=change.content))
+        else:
+            elements.append(InputGitTreeElement(path, change.mode, "blob", sha=change.sha))
+    
+    # File content goes inline in the tree request, so no separate blob calls are needed
+    tree = repo.create_git_tree(elements, base_tree=parent.tree)
+    commit = repo.create_git_commit(commit_msg, tree, [parent])
+    ref.edit(commit.sha)
+    logger.info(f"Committed {len(files)} file changes to {repo.full_name}")
+    return commit
+
+
+def _graphql_url() -> str:
+    # GitHub Enterprise serves REST under /api/v3 and GraphQL at /api/graphql
+    base = settings.GH_API_URL.rstrip("/")
+    return f"{base[:-len('/v3')] if base.endswith('/v3') else base}/graphql"
+
+
+def _graphql(query: str, variables: dict) -> dict:
+    response = _session.post(
+        _graphql_url(), json={"query": query, "variables": variables}, timeout=settings.GH_TIMEOUT_SECONDS
+    )
+    response.raise_for_status()
+    payload = response.json()
+    # GraphQL reports failed mutations in the body of a 200 response
+    if payload.get("errors"):
+        raise RuntimeError("; ".join(error.get("message", str(error)) for error in payload["errors"]))
+    return payload.get("data") or {}
+
+
+def _set_topics_and_protection(repo: Repository, repo_settings: RepoSettings, branch: str) -> None:
+    # PyGithub 2.1 doesn't expose node_id, but it is in the creation response
+    variables = {"repositoryId": repo.raw_data["node_id"]}
+    if repo_settings.branch_protection:
+        variables["pattern"] = branch
+    data = _graphql(repo_settings.mutation, variables)
+    invalid = (data.get("topics") or {}).get("invalidTopicNames")
+    if invalid:
+        raise RuntimeError(f"invalid topics {', '.join(invalid)}")
+
+
+def _set_team_access(repo: Repository, github_org: str, team: str, permission: str) -> None:
+    response = _session.put(
+        f"{settings.GH_API_URL.rstrip('/')}/orgs/{github_org}/teams/{team}/repos/{repo.full_name}",
+        json={"permission": permission},
+        timeout=settings.GH_TIMEOUT_SECONDS
+    )
+    response.raise_for_status()
+
+
+def apply_repo_settings(
+    repo: Repository,
+    github_org: str,
+    repo_settings: RepoSettings,
+    branch: str,
+    edit: bool = False
+) -> None:
+    """
+    Apply a template's repository settings to a new repository. Topics and
+    branch protection are set in a single GraphQL request; it runs concurrently
+    with the team access calls (one per team, REST only) on the shared connection pool.
+    
+    Args:
+        repo: Repository to configure
+        github_org: Organization name or username that owns the repository
+        repo_settings: Settings to apply
+        branch: Branch to protect
+        edit: Also set the repository options, for repositories that weren't
+            created with them (e.g. generated from a template repository)
+            
+    Raises:
+        RuntimeError: If any of the settings couldn't be applied, after all calls finish
+    """
+    calls = {}
+    if repo_settings.mutation:
+        calls["topics and branch protection"] = lambda: _set_topics_and_protection(repo, repo_settings, branch)
+    if repo_settings.teams:
+        if isinstance(get_owner(github_org), Organization):
+            for team, permission in repo_settings.teams:
+                calls[f"team {team}"] = lambda team=team, permission=permission: _set_team_access(
+                    repo, github_org, team, permission
+                )
+        else:
+            logger.warning(f"Skipping team access for {repo.full_name}: {github_org} is not an organization")
+    if edit and repo_settings.options:
+        calls["repository options"] = lambda: repo.edit(**dict(repo_settings.options))
+    if not calls:
+        return
+        
+    futures = {name: _settings_executor.submit(call) for name, call in calls.items()}
+    errors = []
+    for name, future in futures.items():
+        try:
+            future.result()
+        except Exception as e:
+            errors.append(f"{name}: {e}")
+    if errors:
+        raise RuntimeError(f"Failed to apply repository settings to {repo.full_name}: {'; '.join(errors)}")
+    logger.info(f"Applied repository settings to {repo.full_name} ({len(calls)} calls)")
+
+
 def check_repo_exists(github_org: str, github_repo: str) -> bool:
     """
     Check if a repository already exists.
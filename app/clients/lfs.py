@@ -0,0 +1,235 @@
+import hashlib
+import logging
+import os
+import shutil
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Iterator, List, Optional
+
+import httpx
+
+from core.config import settings
+from core.resilience import CONNECT, SERVER, TIMEOUT, Failure, Upstream, classify_status
+
+logger = logging.getLogger(__name__)
+
+LFS_MEDIA_TYPE = "application/vnd.git-lfs+json"
+POINTER_VERSION = "https://git-lfs.github.com/spec/v1"
+CHUNK_SIZE = 1024 * 1024
+
+# Cached objects used more recently than this are never evicted: a job needs its objects from
+# staging until its upload finishes, which takes far less time
+MIN_EVICTION_AGE_SECONDS = 3600
+
+
+@dataclass
+class LFSObject:
+    """A file stored in git LFS, kept in the shared LFS object cache"""
+    oid: str  # SHA-256 of the content
+    size: int
+    path: str  # Location of the content in the object cache
+
+
+def pointer(obj: LFSObject) -> str:
+    """The pointer file committed in place of the content"""
+    return f"version {POINTER_VERSION}\noid sha256:{obj.oid}\nsize {obj.size}\n"
+
+
+def store_object(file_path: str) -> LFSObject:
+    """
+    Move a file into the LFS object cache (LFS_CACHE_DIR), keyed by the SHA-256
+    of its content. A file already in the cache is not stored twice, but is
+    marked as used so it isn't evicted.
+    
+    Args:
+        file_path: File to move; it no longer exists afterwards
+        
+    Returns:
+        The object and where its content is cached
+    """
+    sha256 = hashlib.sha256()
+    size = 0
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            sha256.update(chunk)
+            size += len(chunk)
+    oid = sha256.hexdigest()
+    
+    cached_path = os.path.join(settings.LFS_CACHE_DIR, oid[:2], oid[2:4], oid)
+    if os.path.exists(cached_path):
+        os.remove(file_path)
+        os.utime(cached_path)
+    else:
+        os.makedirs(os.path.dirname(cached_path), exist_ok=True)
+        temp_path = f"{cached_path}.{uuid.uuid4().hex}.tmp"
+        shutil.move(file_path, temp_path)
+        os.replace(temp_path, cached_path)
+    return LFSObject(oid=oid, size=size, path=cached_path)
+
+
+def prune_cache() -> int:
+    """
+    Evict the least recently used objects from the LFS object cache until it
+    fits LFS_CACHE_MAX_MB, keeping objects used in the last
+    MIN_EVICTION_AGE_SECONDS. Safe to run from several processes at once.
+    
+    Returns:
+        Bytes in the cache after pruning
+    """
+    objects = []
+    for dirpath, _, filenames in os.walk(settings.LFS_CACHE_DIR):
+        for name in filenames:
+            path = os.path.join(dirpath, name)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            objects.append((stat.st_mtime, stat.st_size, path))
+            
+    total = sum(size for _, size, _ in objects)
+    limit = settings.LFS_CACHE_MAX_MB * 1024 * 1024
+    cutoff = time.time() - MIN_EVICTION_AGE_SECONDS
+    for used_at, size, path in sorted(objects):
+        # Temporary files of interrupted moves are evicted like unused objects
+        if used_at >= cutoff or (total <= limit and not path.endswith(".tmp")):
+            continue
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        total -= size
+    return total
+
+
+def _classify(response: Optional[httpx.Response], error: Optional[Exception]) -> Optional[Failure]:
+    if isinstance(error, (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)):
+        return Failure(CONNECT)
+    if isinstance(error, httpx.TimeoutException):
+        return Failure(TIMEOUT)
+    if isinstance(error, httpx.TransportError):
+        return Failure(SERVER)
+    if response is not None:
+        return classify_status(response.status_code, response.headers)
+    return None
+
+
+class LFSClient:
+    """
+    Client for the git LFS Batch API (basic transfer adapter).
+    
+    Objects are announced to the server in batches of LFS_BATCH_SIZE; the
+    server only asks for the ones it doesn't have yet, which are then
+    uploaded LFS_MAX_PARALLEL at a time. Calls go through the shared
+    resilience layer.
+    """
+    
+    def __init__(self):
+        self.upstream = Upstream("lfs", max_timeout=settings.LFS_TIMEOUT_SECONDS)
+        self._client = httpx.Client()
+    
+    @staticmethod
+    def endpoint(remote_org: str, remote_repo: str) -> str:
+        """LFS endpoint of a repository, following the git-lfs convention of {remote}.git/info/lfs"""
+        base_url = (settings.LFS_URL or settings.GH_GIT_URL).rstrip("/")
+        if not base_url.startswith(("http://", "https://")):
+            raise ValueError(f"Git LFS needs an HTTP(S) endpoint, set LFS_URL (got {base_url})")
+        return f"{base_url}/{remote_org}/{remote_repo}.git/info/lfs"
+    
+    def upload(self, remote_org: str, remote_repo: str, objects: List[LFSObject], ref: str) -> int:
+        """
+        Upload objects that the repository's LFS server doesn't have yet.
+        
+        Args:
+            remote_org: GitHub organization or username
+            remote_repo: Repository name
+            objects: Objects referenced by the commit being pushed
+            ref: Ref the objects are pushed to, e.g. "refs/heads/main"
+            
+        Returns:
+            Number of objects uploaded
+        """
+        endpoint = self.endpoint(remote_org, remote_repo)
+        unique = list({obj.oid: obj for obj in objects}.values())
+        
+        actions = []
+        for start in range(0, len(unique), settings.LFS_BATCH_SIZE):
+            batch = unique[start:start + settings.LFS_BATCH_SIZE]
+            actions.extend(self._batch(endpoint, batch, ref))
+            
+        with ThreadPoolExecutor(max_workers=settings.LFS_MAX_PARALLEL) as executor:
+            list(executor.map(lambda item: self._transfer(*item), actions))
+            
+        logger.info(
+            f"Uploaded {len(actions)} of {len(unique)} LFS objects to {remote_org}/{remote_repo} "
+            f"({sum(obj.size for obj, _ in actions)} bytes)"
+        )
+        return len(actions)
+    
+    def _batch(self, endpoint: str, objects: List[LFSObject], ref: str) -> List[tuple]:
+        """Announce objects; returns (object, actions) for the ones the server wants"""
+        payload = {
+            "operation": "upload",
+            "transfers": ["basic"],
+            "ref": {"name": ref},
+            "objects": [{"oid": obj.oid, "size": obj.size} for obj in objects],
+            "hash_algo": "sha256"
+        }
+        
+        def send(timeout: float) -> httpx.Response:
+            return self._client.post(
+                f"{endpoint}/objects/batch",
+                json=payload,
+                headers={"Accept": LFS_MEDIA_TYPE, "Content-Type": LFS_MEDIA_TYPE},
+                auth=("x-access-token", settings.GH_ACCESS_TOKEN or ""),
+                timeout=timeout
+            )
+            
+        response = self.upstream.call("batch", send, _classify)
+        response.raise_for_status()
+        
+        by_oid = {obj.oid: obj for obj in objects}
+        wanted = []
+        for item in response.json().get("objects", []):
+            if "error" in item:
+                raise RuntimeError(f"LFS server rejected object {item['oid']}: {item['error'].get('message')}")
+            if item.get("actions", {}).get("upload"):
+                wanted.append((by_oid[item["oid"]], item["actions"]))
+        return wanted
+    
+    def _transfer(self, obj: LFSObject, actions: dict) -> None:
+        """Upload one object with the basic transfer adapter, then verify it if the server asks"""
+        upload = actions["upload"]
+        headers = {
+            **upload.get("header", {}),
+            "Content-Type": "application/octet-stream",
+            "Content-Length": str(obj.size)
+        }
+        
+        def content() -> Iterator[bytes]:
+            with open(obj.path, "rb") as f:
+                yield from iter(lambda: f.read(CHUNK_SIZE), b"")
+        
+        def send_upload(timeout: float) -> httpx.Response:
+            return self._client.put(upload["href"], content=content(), headers=headers, timeout=timeout)
+            
+        response = self.upstream.call("upload", send_upload, _classify)
+        response.raise_for_status()
+        
+        verify = actions.get("verify")
+        if verify:
+            def send_verify(timeout: float) -> httpx.Response:
+                return self._client.post(
+                    verify["href"],
+                    json={"oid": obj.oid, "size": obj.size},
+                    headers={**verify.get("header", {}), "Accept": LFS_MEDIA_TYPE, "Content-Type": LFS_MEDIA_TYPE},
+                    timeout=timeout
+                )
+                
+            response = self.upstream.call("verify", send_verify, _classify)
+            response.raise_for_status()
+
+
+# Singleton instance
+lfs_client = LFSClient()
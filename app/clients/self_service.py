@@ -3,21 +3,60 @@ import httpx
 from typing import Optional, Literal
 
 from core.config import settings
+from core.resilience import CONNECT, TIMEOUT, SERVER, Failure, Upstream, classify_status
 
 logger = logging.getLogger(__name__)
 
 
+def _classify(response: Optional[httpx.Response], error: Optional[Exception]) -> Optional[Failure]:
+    """Decide whether a DX API attempt failed in a way worth retrying"""
+    if isinstance(error, (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)):
+        return Failure(CONNECT)
+    if isinstance(error, httpx.TimeoutException):
+        return Failure(TIMEOUT)
+    if isinstance(error, httpx.TransportError):
+        return Failure(SERVER)
+    if response is not None:
+        return classify_status(response.status_code, response.headers)
+    return None
+
+
 class DXClient:
     """
     Client for communicating with DX self-service platform.
     
     Uses DX's workflow API endpoints to report status back to workflow runs.
     See: https://docs.getdx.com/self-service/
+    
+    Calls go through the shared resilience layer (retries, circuit breakers,
+    adaptive timeouts) over one pooled HTTP client.
     """
     
     def __init__(self):
         self.api_url = settings.DX_API_URL
         self.api_key = settings.DX_API_KEY
+        self.upstream = Upstream("dx", max_timeout=settings.DX_TIMEOUT_SECONDS)
+        self._client = httpx.Client()
+    
+    def _post(self, endpoint: str, payload: dict, idempotent: bool) -> None:
+        """
+        POST to a DX workflow API endpoint, raising on failure.
+        
+        Args:
+            endpoint: API method, e.g. "workflowRuns.postMessage"
+            payload: JSON body
+            idempotent: Whether repeating the call is harmless
+        """
+        headers = {
+            "Authorization": f"Bearer {self.api_key}",
+            "Content-Type": "application/json"
+        }
+        
+        def send(timeout: float) -> httpx.Response:
+            return self._client.post(f"{self.api_url}/{endpoint}", json=payload, headers=headers, timeout=timeout)
+            
+        response = self.upstream.call(endpoint, send, _classify, idempotent=idempotent)
+        response.raise_for_status()
         
     def post_message(
         self,
@@ -39,20 +78,13 @@ class DXClient:
             return False
             
         try:
-            url = f"{self.api_url}/workflowRuns.postMessage"
-            headers = {
-                "Authorization": f"Bearer {self.api_key}",
-                "Content-Type": "application/json"
-            }
             payload = {
                 "workflow_run_id": workflow_run_id,
                 "message": message
             }
+            # Not idempotent: a retried message could be posted twice
+            self._post("workflowRuns.postMessage", payload, idempotent=False)
             
-            with httpx.Client() as client:
-                response = client.post(url, json=payload, headers=headers, timeout=30)
-                response.raise_for_status()
-                
             logger.info(f"Posted message to DX workflow run {workflow_run_id}")
             return True
             
@@ -84,11 +116,6 @@ class DXClient:
             return False
             
         try:
-            api_url = f"{self.api_url}/workflowRuns.addLink"
-            headers = {
-                "Authorization": f"Bearer {self.api_key}",
-                "Content-Type": "application/json"
-            }
             link_data = {
                 "url": url,
                 "label": label
@@ -100,11 +127,8 @@ class DXClient:
                 "workflow_run_id": workflow_run_id,
                 "link": link_data
             }
+            self._post("workflowRuns.addLink", payload, idempotent=False)
             
-            with httpx.Client() as client:
-                response = client.post(api_url, json=payload, headers=headers, timeout=30)
-                response.raise_for_status()
-                
             logger.info(f"Added link to DX workflow run {workflow_run_id}: {label}")
             return True
             
@@ -132,20 +156,12 @@ class DXClient:
             return False
             
         try:
-            url = f"{self.api_url}/workflowRuns.changeStatus"
-            headers = {
-                "Authorization": f"Bearer {self.api_key}",
-                "Content-Type": "application/json"
-            }
             payload = {
                 "workflow_run_id": workflow_run_id,
                 "status": status
             }
+            self._post("workflowRuns.changeStatus", payload, idempotent=True)
             
-            with httpx.Client() as client:
-                response = client.post(url, json=payload, headers=headers, timeout=30)
-                response.raise_for_status()
-                
             logger.info(f"Changed DX workflow run {workflow_run_id} status to {status}")
             return True
             
@@ -0,0 +1,161 @@
+import heapq
+import logging
+import math
+import multiprocessing
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+from core.config import settings
+from core.metrics import metrics
+from core.resources import resource_manager
+from core.store import store
+
+logger = logging.getLogger(__name__)
+
+# Weight of the newest run in a template's service time average
+SERVICE_TIME_ALPHA = 0.2
+
+_decisions = metrics.counter(
+    "admission_decisions_total", "Admission decisions for new jobs", ("template", "decision")
+)
+_estimated_wait = metrics.gauge(
+    "admission_estimated_wait_seconds", "Estimated queue wait at the last admission decision"
+)
+_service_time = metrics.gauge(
+    "admission_service_time_seconds", "Smoothed run time of recent jobs", ("template",)
+)
+
+
+@dataclass
+class AdmissionDecision:
+    """Outcome of an admission check"""
+    admitted: bool
+    estimated_wait: float  # Seconds before the job would start
+    retry_after: int = 0  # Seconds until the estimate is expected to be back under the SLO
+
+
+def job_slots() -> int:
+    """
+    Jobs the deployment runs at once: ADMISSION_JOB_SLOTS, or per worker the
+    jobs that fit both JOB_CONCURRENCY and the job resource budgets. Jobs over
+    the budgets wait for resources after they're admitted, so counting them
+    as running would underestimate the wait.
+    """
+    if settings.ADMISSION_JOB_SLOTS:
+        return settings.ADMISSION_JOB_SLOTS
+    return (settings.WEB_CONCURRENCY or multiprocessing.cpu_count()) * resource_manager.job_capacity()
+
+
+class AdmissionController:
+    """
+    Load shedding for new jobs, based on how long they would wait to start.
+    
+    Service times are averaged per template type over recently finished jobs
+    in the state store, so every worker uses the same estimates. The queue
+    wait is estimated by assigning the active jobs in the state store to
+    job_slots() slots in arrival order: running jobs hold a slot for the rest
+    of their expected run time and pending jobs take the first slot to come
+    free. The wait of a new job is when the next slot comes free after that.
+    
+    A job whose estimated wait exceeds ADMISSION_WAIT_SLO_SECONDS is shed,
+    unless it has high priority.
+    """
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._service_times: Dict[str, float] = {}
+        self._refreshed_at = 0.0
+    
+    def _refresh(self) -> None:
+        """Recompute per-template service times from recent jobs, at most every ADMISSION_REFRESH_SECONDS"""
+        now = time.monotonic()
+        with self._lock:
+            if now - self._refreshed_at < settings.ADMISSION_REFRESH_SECONDS:
+                return
+            self._refreshed_at = now
+            
+        service_times: Dict[str, float] = {}
+        for template_type, duration in store.recent_service_times(settings.ADMISSION_HISTORY_JOBS):
+            previous = service_times.get(template_type)
+            if previous is None:
+                service_times[template_type] = duration
+            else:
+                service_times[template_type] = (1 - SERVICE_TIME_ALPHA) * previous + SERVICE_TIME_ALPHA * duration
+                
+        with self._lock:
+            self._service_times = service_times
+        for template_type, seconds in service_times.items():
+            _service_time.set(seconds, template=template_type)
+    
+    def service_time(self, template_type: str) -> float:
+        """Expected run time of a job, in seconds"""
+        self._refresh()
+        with self._lock:
+            return self._service_times.get(template_type, settings.ADMISSION_DEFAULT_SERVICE_SECONDS)
+    
+    def estimate_wait(self, exclude_job_id: Optional[str] = None) -> float:
+        """
+        Estimate how long a job queued now would wait before it starts.
+        
+        Args:
+            exclude_job_id: Job to leave out of the queue (the one being admitted)
+            
+        Returns:
+            Estimated wait in seconds
+        """
+        now = time.time()
+        jobs = [
+            job for job in store.list_active_jobs(since=now - settings.ADMISSION_STALE_SECONDS)
+            if job["job_id"] != exclude_job_id
+        ]
+        slots = job_slots()
+        
+        # Time from now until each slot is free; running jobs hold theirs for their remaining run time
+        free_at: List[float] = [0.0] * slots
+        running = [job for job in jobs if job["status"] == "RUNNING" and job["started_at"]]
+        for i, job in enumerate(running[:slots]):
+            free_at[i] = max(0.0, self.service_time(job["template_type"]) - (now - job["started_at"]))
+        heapq.heapify(free_at)
+        
+        for job in jobs:
+            if job["status"] == "PENDING" or not job["started_at"]:
+                start = heapq.heappop(free_at)
+                heapq.heappush(free_at, start + self.service_time(job["template_type"]))
+        return free_at[0]
+    
+    def admit(self, job_id: str, template_type: str, priority: str = "normal") -> AdmissionDecision:
+        """
+        Decide whether to run a new job, given the jobs already queued.
+        
+        Args:
+            job_id: ID of the new job
+            template_type: Template type of the new job
+            priority: "high" bypasses load shedding
+            
+        Returns:
+            The decision, with the estimated wait
+        """
+        wait = self.estimate_wait(exclude_job_id=job_id)
+        _estimated_wait.set(wait)
+        
+        if wait <= settings.ADMISSION_WAIT_SLO_SECONDS:
+            _decisions.inc(template=template_type, decision="accepted")
+            return AdmissionDecision(admitted=True, estimated_wait=wait)
+        if priority == "high":
+            logger.info(f"Admitting high priority job {job_id} despite an estimated wait of {wait:.0f}s")
+            _decisions.inc(template=template_type, decision="bypassed")
+            return AdmissionDecision(admitted=True, estimated_wait=wait)
+            
+        retry_after = max(1, math.ceil(wait - settings.ADMISSION_WAIT_SLO_SECONDS))
+        logger.warning(
+            f"Shedding job {job_id}: estimated wait {wait:.0f}s exceeds the "
+            f"{settings.ADMISSION_WAIT_SLO_SECONDS:g}s SLO"
+        )
+        _decisions.inc(template=template_type, decision="shed")
+        return AdmissionDecision(admitted=False, estimated_wait=wait, retry_after=retry_after)
+
+
+# Singleton instance
+admission_controller = AdmissionController()
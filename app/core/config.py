@@ -1,12 +1,21 @@
 import os
 from pathlib import Path
-from typing import Optional
+from typing import Dict, List, Optional
+from pydantic import model_validator
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 # Get the project root directory (one level up from app/)
 PROJECT_ROOT = Path(__file__).parent.parent.parent
 ENV_FILE = PROJECT_ROOT / ".env"
 
+# Relative paths in these settings are resolved against the working directory at startup.
+# Cookiecutter changes the process working directory while it renders, so a relative path
+# used on another thread at that moment would point into the template.
+PATH_SETTINGS = (
+    "LFS_CACHE_DIR", "GIT_OBJECT_CACHE_DIR", "TEMPLATE_REGISTRY_PATH", "COOKIECUTTER_OUTPUT_DIR",
+    "HOOK_CACHE_DIR", "TEMPLATE_CACHE_DIR", "WARM_POOL_DIR", "STATE_DB_PATH", "PROFILE_DIR"
+)
+
 
 class Settings(BaseSettings):
     """Application settings and configuration"""
@@ -25,12 +34,106 @@ class Settings(BaseSettings):
     # GitHub Configuration
     GH_ACCESS_TOKEN: Optional[str] = None
     EXCLUDE_GITHUB_WORKFLOWS: bool = False  # Set to True if your token doesn't have 'workflow' scope
+    GH_API_URL: str = "https://api.github.com"
+    GH_GIT_URL: str = "https://github.com"  # Base URL for pushes (file:// URLs are supported for local testing)
+    GH_SECONDS_BETWEEN_REQUESTS: float = 0.25  # PyGithub client-side throttling (PyGithub defaults)
+    GH_SECONDS_BETWEEN_WRITES: float = 1.0
+    GH_OWNER_CACHE_TTL_SECONDS: int = 300  # How long organization/user lookups are cached
+    GH_TIMEOUT_SECONDS: int = 60  # Maximum request timeout (the adaptive timeout is usually lower)
+    GH_REPO_SETTINGS_MAX_PARALLEL: int = 8  # Concurrent calls when applying template repository settings
+    
+    # GitHub Template Repositories
+    # Map template types to "owner/repo" template repositories. These templates are generated
+    # server-side by GitHub and only get a variable-substitution commit, instead of a cookiecutter render.
+    GITHUB_TEMPLATE_REPOSITORIES: Dict[str, str] = {}
+    GITHUB_TEMPLATE_TIMEOUT_SECONDS: int = 30  # How long to wait for GitHub to generate the repository
+    
+    # Preflight Validation
+    # Requests are checked (names, owner, existing repository, required props) before queuing
+    PREFLIGHT_ENABLED: bool = True
+    PREFLIGHT_TIMEOUT_SECONDS: float = 3.0  # GitHub checks that take longer are skipped
+    
+    # Admission Control
+    # New jobs are shed with 503 + Retry-After when their estimated queue wait exceeds the SLO
+    ADMISSION_ENABLED: bool = True
+    ADMISSION_WAIT_SLO_SECONDS: float = 300
+    # Jobs run at once across workers (default per worker: JOB_CONCURRENCY, or fewer if the resource budgets allow less)
+    ADMISSION_JOB_SLOTS: Optional[int] = None
+    ADMISSION_DEFAULT_SERVICE_SECONDS: float = 60  # Assumed run time of templates without finished jobs
+    ADMISSION_HISTORY_JOBS: int = 200  # Recently finished jobs used to estimate run times
+    ADMISSION_REFRESH_SECONDS: float = 5  # How often run time estimates are recomputed
+    ADMISSION_STALE_SECONDS: float = 3600  # Ignore queued jobs older than this (e.g. left by a crashed worker)
+    
+    # Job Execution
+    # Jobs run as coroutines on the event loop; their blocking stages run on dedicated thread pools,
+    # never on the event loop or anyio's default threadpool
+    JOB_CONCURRENCY: int = 40  # Jobs a worker runs at once; further jobs wait their turn
+    EXECUTOR_REQUESTS_THREADS: int = 8  # Webhook handling: state store, admission and preflight lookups
+    EXECUTOR_JOBS_THREADS: Optional[int] = None  # Resource budget waits, state store, DX (defaults to JOB_CONCURRENCY)
+    EXECUTOR_RENDER_THREADS: Optional[int] = None  # Cookiecutter renders and hooks (defaults to the CPU count)
+    # Render processes of the whole host (defaults to the CPU count), split evenly between the WEB_CONCURRENCY
+    # gunicorn workers with at least one each, so adding workers doesn't multiply the render interpreters
+    RENDER_PROCESSES: Optional[int] = None
+    EXECUTOR_GIT_THREADS: int = 8  # git init, commit and push, LFS uploads, workspace cleanup
+    EXECUTOR_GITHUB_THREADS: int = 16  # GitHub API calls
+    EVENT_LOOP_DEBUG: bool = False  # asyncio debug mode, and log the stack of calls that block the event loop
+    EVENT_LOOP_SLOW_CALLBACK_SECONDS: float = 0.1
+    
+    # Health Checks
+    # /api/health/ready serves state refreshed in the background, so it never waits on upstreams
+    HEALTH_REFRESH_SECONDS: float = 2
+    HEALTH_MAX_POOL_UTILIZATION: float = 0.9  # Not ready when this share of job slots is in use
+    HEALTH_MIN_GITHUB_RATE_LIMIT: int = 100  # Not ready when fewer GitHub API calls are left
+    HEALTH_GITHUB_RATE_LIMIT_MAX_AGE_SECONDS: float = 60  # Poll GET /rate_limit if no response showed it
     
     # DX Self-Service Configuration
     DX_API_URL: str = "https://api.getdx.com"
     DX_API_KEY: Optional[str] = None
+    DX_TIMEOUT_SECONDS: float = 30  # Maximum request timeout (the adaptive timeout is usually lower)
+    
+    # Upstream Resilience (DX and GitHub API calls)
+    RESILIENCE_MAX_ATTEMPTS: int = 4  # Including the first attempt
+    RESILIENCE_BACKOFF_BASE_SECONDS: float = 0.2  # Exponential backoff with full jitter
+    RESILIENCE_BACKOFF_MAX_SECONDS: float = 10
+    RESILIENCE_MAX_RETRY_AFTER_SECONDS: float = 60  # Don't retry if the upstream asks us to wait longer
+    RESILIENCE_RETRY_BUDGET_RATIO: float = 0.2  # Retries allowed per request, per upstream
+    RESILIENCE_RETRY_BUDGET_MIN: int = 10  # Retries always allowed per window
+    RESILIENCE_RETRY_BUDGET_WINDOW_SECONDS: float = 60
+    RESILIENCE_FAILURE_THRESHOLD: int = 5  # Consecutive failures that open an endpoint's circuit
+    RESILIENCE_RESET_SECONDS: float = 30  # How long a circuit stays open before a probe
+    RESILIENCE_MIN_TIMEOUT_SECONDS: float = 5  # Lower bound of the adaptive timeout
+    RESILIENCE_MIN_SAMPLES: int = 5  # Successful calls before the adaptive timeout is used
+    
+    # Large Files and Git LFS
+    # Files matching LFS_PATTERNS of at least LFS_THRESHOLD_BYTES are committed as LFS pointers
+    LFS_ENABLED: bool = False
+    LFS_URL: Optional[str] = None  # Base URL of the LFS server, {LFS_URL}/{org}/{repo}.git/info/lfs (defaults to GH_GIT_URL)
+    LFS_PATTERNS: List[str] = [
+        "*.png", "*.jpg", "*.jpeg", "*.gif", "*.ico", "*.webp", "*.pdf",
+        "*.ttf", "*.otf", "*.woff", "*.woff2", "*.eot",
+        "*.zip", "*.tar.gz", "*.jar", "*.min.js", "vendor/*"
+    ]
+    LFS_THRESHOLD_BYTES: int = 1024 * 1024  # Also the size from which files are logged as large
+    LFS_BATCH_SIZE: int = 100  # Objects per Batch API request
+    LFS_MAX_PARALLEL: int = 4  # Concurrent object uploads
+    LFS_TIMEOUT_SECONDS: float = 300
+    LFS_CACHE_DIR: str = "lfs_cache"  # Content-addressed LFS objects, shared by all jobs
+    LFS_CACHE_MAX_MB: int = 2048  # Least recently used objects are evicted beyond this
+    
+    # Shared Git Object Cache
+    # Objects of pushed repositories, borrowed by later jobs (git alternates) so identical files are
+    # compressed and stored once. Safe to delete while the service is stopped; empty (default) disables it.
+    GIT_OBJECT_CACHE_DIR: str = ""
+    GIT_OBJECT_CACHE_MAX_MB: int = 2048  # New jobs move to a fresh generation beyond this; old ones are deleted
+    SHARED_CACHE_PRUNE_INTERVAL_SECONDS: int = 60  # How often the object and LFS caches are pruned
     
-    # Cookiecutter Template URLs
+    # Template Registry
+    # JSON file mapping template types to their URL, ref, directory, hooks policy, backend and props schema
+    TEMPLATE_REGISTRY_PATH: str = "templates.json"
+    TEMPLATE_REGISTRY_RELOAD_SECONDS: int = 5  # How often to check the file for changes (0 disables reloading)
+    TEMPLATE_REGISTRY_PREWARM: bool = True  # Clone new templates into the template cache in the background
+    
+    # Cookiecutter Template URLs (referenced from the template registry as ${COOKIECUTTER_..._URL})
     COOKIECUTTER_DJANGO_URL: str = "https://github.com/cookiecutter/cookiecutter-django"
     COOKIECUTTER_GO_URL: str = "https://github.com/lacion/cookiecutter-golang"
     COOKIECUTTER_CPP_URL: str = "https://github.com/DerThorsten/cpp_cookiecutter"
@@ -41,8 +144,73 @@ class Settings(BaseSettings):
     # Set to False to skip post-generation hooks (useful if templates require tools like 'uv')
     COOKIECUTTER_ACCEPT_HOOKS: bool = False
     
+    # Hook Runner Configuration
+    # Hooks run in sandboxed subprocesses with a persistent per-template tool/package cache
+    HOOK_CACHE_DIR: str = "hook_cache"
+    HOOK_TIMEOUT_SECONDS: int = 300  # Per hook script
+    HOOK_MAX_PARALLEL: int = 4  # Hooks in hooks/<stage>.d/ run in parallel
+    
+    # Template Cache Configuration
+    # Local checkouts of cookiecutter templates, cloned once per process
+    TEMPLATE_CACHE_DIR: str = "template_cache"
+    TEMPLATE_CACHE_TTL_SECONDS: int = 3600  # Re-clone templates after this long
+    
+    # Warm Pool Configuration
+    # Keep pre-materialized workspaces (static template files already written) per template type
+    WARM_POOL_ENABLED: bool = False
+    WARM_POOL_TEMPLATES: List[str] = ["python"]
+    WARM_POOL_DIR: str = "cookiecutter_output/warm_pool"
+    WARM_POOL_MIN_SIZE: int = 1
+    WARM_POOL_MAX_SIZE: int = 8
+    WARM_POOL_RATE_WINDOW_SECONDS: int = 300  # Window used to measure the arrival rate
+    WARM_POOL_HORIZON_SECONDS: int = 60  # Keep enough workspaces for this many seconds of demand
+    WARM_POOL_REFILL_INTERVAL_SECONDS: int = 5
+    WARM_POOL_PRECOMPUTE_BLOBS: bool = True  # Stage static files in git ahead of time
+    
+    # Job Resource Budgets (per worker process)
+    # Jobs wait to start until the memory, workspace disk and open files their template is expected
+    # to need fit the remaining budget. Expected usage is learned from the peaks of finished jobs.
+    RESOURCE_BUDGETS_ENABLED: bool = True
+    RESOURCE_MEMORY_BUDGET_MB: int = 2048  # RSS growth over the idle worker, plus its child processes
+    RESOURCE_DISK_BUDGET_MB: int = 10240  # Job workspaces, including deleted ones not yet reaped
+    RESOURCE_FD_BUDGET: int = 512  # Open file handles over the idle worker
+    RESOURCE_DEFAULT_JOB_MEMORY_MB: int = 256  # Expected usage of a template until one of its jobs finished
+    RESOURCE_DEFAULT_JOB_DISK_MB: int = 256
+    RESOURCE_DEFAULT_JOB_FDS: int = 32
+    RESOURCE_JOB_MAX_SHARE: float = 1.0  # A job using more than this share of a budget fails at its next stage
+    RESOURCE_WAIT_TIMEOUT_SECONDS: int = 600  # Jobs that can't start within this long fail
+    RESOURCE_SAMPLE_INTERVAL_SECONDS: float = 0.5
+    # Under sustained load the memory baseline becomes the lowest sample of each window (see ResourceManager)
+    RESOURCE_BASELINE_WINDOW_SECONDS: int = 300
+    RESOURCE_REAPER_INTERVAL_SECONDS: float = 2  # Workspaces are deleted in batches on a background thread
+    RESOURCE_REAPER_BATCH_SIZE: int = 32
+    
+    # Shared State
+    # SQLite database (WAL mode) shared by all worker processes: jobs, idempotency keys, cache metadata
+    STATE_DB_PATH: str = "state/service.db"
+    IDEMPOTENCY_TTL_SECONDS: int = 86400
+    
+    # Profiling
+    # Jobs requested with "profile": true run with a sampling profiler on their own threads
+    PROFILING_ENABLED: bool = False
+    PROFILE_DIR: str = "profiles"
+    PROFILE_SAMPLE_INTERVAL_SECONDS: float = 0.005
+    # Also track allocations with tracemalloc, which slows down every job in the worker while it runs
+    PROFILE_ALLOCATIONS: bool = False
+    
+    # Deployment
+    WEB_CONCURRENCY: Optional[int] = None  # Number of gunicorn workers (defaults to the CPU count)
+    
     # Webhook Security (optional)
     WEBHOOK_SECRET: Optional[str] = None
+    
+    @model_validator(mode="after")
+    def resolve_paths(self) -> "Settings":
+        for name in PATH_SETTINGS:
+            value = getattr(self, name)
+            if value:
+                setattr(self, name, os.path.abspath(value))
+        return self
 
 
 settings = Settings()
@@ -0,0 +1,288 @@
+import asyncio
+import contextvars
+import logging
+import multiprocessing
+import sys
+import threading
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Callable, Dict, Optional, TypeVar
+
+from core.config import settings
+from core.metrics import metrics
+from core.profiling import job_profiler
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+_busy = metrics.gauge("executor_busy_threads", "Threads of a stage executor running a call", ("executor",))
+_queued = metrics.gauge("executor_queued_calls", "Calls waiting for a thread of a stage executor", ("executor",))
+_calls = metrics.counter("executor_calls_total", "Calls run on a stage executor", ("executor",))
+_running_jobs = metrics.gauge("jobs_running", "Jobs running on this worker")
+_blocked = metrics.counter("event_loop_blocked_total", "Times the event loop was blocked longer than the threshold")
+
+
+def executor_sizes() -> Dict[str, int]:
+    """Threads of each stage executor"""
+    return {
+        # Webhook handling: state store, admission and preflight lookups, apart from job load
+        "requests": settings.EXECUTOR_REQUESTS_THREADS,
+        # Job bookkeeping: waiting for resource budgets, state store updates and DX messages
+        "jobs": settings.EXECUTOR_JOBS_THREADS or settings.JOB_CONCURRENCY,
+        # Cookiecutter renders (each in a render process, see run_in_process()), warm pool claims and hooks
+        "render": settings.EXECUTOR_RENDER_THREADS or multiprocessing.cpu_count(),
+        # Local git work: init, commit, push, LFS uploads and workspace cleanup
+        "git": settings.EXECUTOR_GIT_THREADS,
+        # GitHub API calls
+        "github": settings.EXECUTOR_GITHUB_THREADS,
+    }
+
+
+def render_processes() -> int:
+    """
+    Render processes of this worker: its share of RENDER_PROCESSES, which
+    counts the render processes of all WEB_CONCURRENCY workers on the host
+    """
+    workers = settings.WEB_CONCURRENCY or multiprocessing.cpu_count()
+    return max(1, (settings.RENDER_PROCESSES or multiprocessing.cpu_count()) // workers)
+
+
+class StageExecutors:
+    """
+    Dedicated, separately sized thread pools for blocking work.
+    
+    Jobs run as coroutines on the event loop and hand every blocking stage to
+    the executor for its kind of work, so a burst of renders can't hold up
+    pushes or GitHub calls, and none of them compete with request handling or
+    anyio's default threadpool. Calls run in a copy of the caller's context,
+    so context variables (the current job of the resource manager, an active
+    profile) follow the job from stage to stage.
+    
+    Work that can't share a process with other threads runs in a pool of
+    pool of render processes (see run_in_process()), so renders really run
+    in parallel. The render processes are budgeted per host, not per worker
+    (see render_processes()).
+    
+    At most JOB_CONCURRENCY jobs run at once per worker; the rest wait for a
+    job slot in arrival order.
+    """
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pools: Dict[str, ThreadPoolExecutor] = {}
+        self._processes: Optional[ProcessPoolExecutor] = None
+        self._busy: Dict[str, int] = {}
+        self._queued: Dict[str, int] = {}
+        self._job_slots: Optional[asyncio.Semaphore] = None
+        self.running_jobs = 0
+    
+    def _pool(self, name: str) -> ThreadPoolExecutor:
+        with self._lock:
+            pool = self._pools.get(name)
+            if pool is None:
+                sizes = executor_sizes()
+                if name not in sizes:
+                    raise KeyError(f"Unknown executor: {name} (expected one of {', '.join(sizes)})")
+                pool = ThreadPoolExecutor(max_workers=sizes[name], thread_name_prefix=f"{name}-stage")
+                self._pools[name] = pool
+                self._busy[name] = self._queued[name] = 0
+            return pool
+    
+    def _count(self, name: str, busy: int = 0, queued: int = 0) -> None:
+        with self._lock:
+            self._busy[name] += busy
+            self._queued[name] += queued
+            _busy.set(self._busy[name], executor=name)
+            _queued.set(self._queued[name], executor=name)
+    
+    def _dequeue(self, name: str, state: dict) -> None:
+        """Stop counting a call as queued, once, whether it started or was cancelled"""
+        with self._lock:
+            if state["dequeued"]:
+                return
+            state["dequeued"] = True
+        self._count(name, queued=-1)
+    
+    async def run(self, name: str, func: Callable[..., T], *args, **kwargs) -> T:
+        """
+        Run a blocking call on an executor and wait for it without blocking the event loop.
+        
+        Args:
+            name: Executor to run on (see executor_sizes())
+            func: Blocking function
+            *args, **kwargs: Arguments for func
+            
+        Returns:
+            What func returns; exceptions are raised in the caller
+        """
+        pool = self._pool(name)
+        context = contextvars.copy_context()
+        state = {"dequeued": False}
+        
+        def sampled() -> T:
+            with job_profiler.sample_thread():
+                return func(*args, **kwargs)
+                
+        def call() -> T:
+            self._dequeue(name, state)
+            self._count(name, busy=1)
+            try:
+                return context.run(sampled)
+            finally:
+                self._count(name, busy=-1)
+                
+        self._count(name, queued=1)
+        _calls.inc(executor=name)
+        try:
+            return await asyncio.get_running_loop().run_in_executor(pool, call)
+        finally:
+            # A cancelled call that never started won't run, so it no longer counts as queued
+            self._dequeue(name, state)
+    
+    def run_in_process(self, func: Callable[..., T], *args, **kwargs) -> T:
+        """
+        Run a blocking call in a render process and wait for it. For work that
+        changes process-wide state, like cookiecutter, which changes the
+        working directory while it renders. Call it from a render executor
+        thread, which keeps one process busy at a time.
+        
+        Processes are spawned on first use, so func must be importable by
+        module and name, and it and its arguments must be picklable. A process
+        that dies (e.g. killed for memory) fails its call and the pool is
+        replaced for the next one.
+        
+        Calls of the job being profiled run in this process instead, so the
+        stack sampler and tracemalloc see them. Only one job per worker is
+        profiled at a time, so they never run concurrently with each other;
+        paths in the settings are absolute, so other threads don't mind the
+        working directory changing under them.
+        
+        Returns:
+            What func returns; exceptions are raised in the caller
+        """
+        if job_profiler.active():
+            return func(*args, **kwargs)
+        with self._lock:
+            if self._processes is None:
+                self._processes = ProcessPoolExecutor(
+                    max_workers=render_processes(),
+                    mp_context=multiprocessing.get_context("spawn")
+                )
+            processes = self._processes
+        try:
+            return processes.submit(func, *args, **kwargs).result()
+        except BrokenProcessPool:
+            with self._lock:
+                if self._processes is processes:
+                    self._processes = None
+            processes.shutdown(wait=False, cancel_futures=True)
+            raise
+    
+    @asynccontextmanager
+    async def job_slot(self) -> AsyncIterator[None]:
+        """Hold one of the worker's JOB_CONCURRENCY job slots for the duration of a job"""
+        if self._job_slots is None:
+            self._job_slots = asyncio.Semaphore(settings.JOB_CONCURRENCY)
+        async with self._job_slots:
+            self.running_jobs += 1
+            _running_jobs.set(self.running_jobs)
+            try:
+                yield
+            finally:
+                self.running_jobs -= 1
+                _running_jobs.set(self.running_jobs)
+    
+    def snapshot(self) -> Dict[str, dict]:
+        """Threads, busy threads and queued calls of each executor started so far"""
+        sizes = executor_sizes()
+        with self._lock:
+            return {
+                name: {"threads": sizes[name], "busy": self._busy[name], "queued": self._queued[name]}
+                for name in self._pools
+            }
+    
+    def shutdown(self) -> None:
+        """Stop accepting calls; calls already running finish on their threads"""
+        with self._lock:
+            pools, self._pools = list(self._pools.values()), {}
+            if self._processes is not None:
+                pools.append(self._processes)
+                self._processes = None
+        for pool in pools:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+
+class EventLoopWatchdog:
+    """
+    Detects blocking calls made on the event loop (EVENT_LOOP_DEBUG only).
+    
+    Turns on asyncio debug mode, which logs every callback that runs longer
+    than EVENT_LOOP_SLOW_CALLBACK_SECONDS, and runs a heartbeat task on the
+    loop. When the heartbeat is late by more than the threshold, a watchdog
+    thread logs the stack the loop thread is stuck in, so the blocking call
+    can be found while it is still running.
+    """
+    
+    def __init__(self):
+        self._task: Optional[asyncio.Task] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = threading.Event()
+        self._loop_thread_id: Optional[int] = None
+        self._last_beat = 0.0
+    
+    def start(self) -> None:
+        """Start watching the running event loop, if EVENT_LOOP_DEBUG is on"""
+        if not settings.EVENT_LOOP_DEBUG:
+            return
+        loop = asyncio.get_running_loop()
+        loop.set_debug(True)
+        loop.slow_callback_duration = settings.EVENT_LOOP_SLOW_CALLBACK_SECONDS
+        self._loop_thread_id = threading.get_ident()
+        self._last_beat = time.monotonic()
+        self._stopping.clear()
+        self._task = loop.create_task(self._heartbeat())
+        self._thread = threading.Thread(target=self._watch, name="event-loop-watchdog", daemon=True)
+        self._thread.start()
+        logger.info(
+            f"Event loop debug mode on: logging callbacks slower than {settings.EVENT_LOOP_SLOW_CALLBACK_SECONDS}s"
+        )
+    
+    def stop(self) -> None:
+        """Stop the heartbeat and the watchdog thread"""
+        self._stopping.set()
+        if self._task:
+            self._task.cancel()
+            self._task = None
+        if self._thread:
+            self._thread.join(timeout=5)
+            self._thread = None
+    
+    async def _heartbeat(self) -> None:
+        interval = settings.EVENT_LOOP_SLOW_CALLBACK_SECONDS / 2
+        while True:
+            self._last_beat = time.monotonic()
+            await asyncio.sleep(interval)
+    
+    def _watch(self) -> None:
+        threshold = settings.EVENT_LOOP_SLOW_CALLBACK_SECONDS
+        reported_beat = None
+        while not self._stopping.wait(threshold / 2):
+            last_beat = self._last_beat
+            # The heartbeat sleeps half the threshold, so only lag beyond that counts
+            lag = time.monotonic() - last_beat - threshold / 2
+            if lag <= threshold or last_beat == reported_beat:
+                continue
+            reported_beat = last_beat
+            _blocked.inc()
+            frame = sys._current_frames().get(self._loop_thread_id)
+            stack = "".join(traceback.format_stack(frame)) if frame is not None else "(stack unavailable)\n"
+            logger.warning(f"Event loop blocked for {lag:.3f}s so far, in:\n{stack.rstrip()}")
+
+
+# Singleton instances
+executors = StageExecutors()
+event_loop_watchdog = EventLoopWatchdog()
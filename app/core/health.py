@@ -0,0 +1,192 @@
+import json
+import logging
+import threading
+import time
+from typing import Callable, Dict, Optional, Tuple
+
+from github import GithubException
+
+from clients import github
+from clients.self_service import dx_client
+from core.admission import admission_controller
+from core.config import settings
+from core.executors import executors
+from core.registry import template_registry
+from core.resilience import CIRCUIT_OPEN
+from core.resources import resource_manager
+from core.shared_caches import shared_caches
+from core.store import store
+from core.template_cache import template_cache
+from core.warm_pool import warm_pools
+
+logger = logging.getLogger(__name__)
+
+# Check results, from best to worst; any "fail" makes the worker not ready
+OK = "ok"
+DEGRADED = "degraded"
+FAIL = "fail"
+
+
+class HealthMonitor:
+    """
+    Readiness state of this worker, refreshed on a background thread.
+    
+    Every HEALTH_REFRESH_SECONDS the monitor checks the job slots, the
+    job queue (all workers), job resource budgets, template cache warmth, the
+    GitHub rate limit and the GitHub and DX circuit breakers, and stores the
+    encoded response. The readiness endpoint only returns that snapshot, so it
+    answers in well under a millisecond and never waits on GitHub, DX or the
+    state store. A snapshot older than three refresh intervals counts as not
+    ready, so a stuck refresh thread can't report stale health forever.
+    """
+    
+    def __init__(self):
+        self._snapshot: Tuple[int, bytes, float] = (503, b'{"status": "starting"}', 0.0)
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._started_at = time.time()
+    
+    def start(self) -> None:
+        """Start refreshing the readiness state"""
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, name="health-monitor", daemon=True)
+        self._thread.start()
+    
+    def stop(self) -> None:
+        """Stop the refresh thread"""
+        self._stopping.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+            self._thread = None
+    
+    def readiness(self) -> Tuple[int, bytes]:
+        """The latest readiness response: HTTP status and JSON body"""
+        status_code, body, refreshed_at = self._snapshot
+        if time.monotonic() - refreshed_at > 3 * settings.HEALTH_REFRESH_SECONDS:
+            return 503, b'{"status": "not_ready", "reason": "health state is stale"}'
+        return status_code, body
+    
+    def liveness(self) -> dict:
+        """Whether the process is up; doesn't depend on anything outside it"""
+        return {"status": "alive", "uptime_seconds": round(time.time() - self._started_at)}
+    
+    def _run(self) -> None:
+        # The first refresh runs here too, so startup never waits on GitHub
+        while True:
+            self.refresh()
+            if self._stopping.wait(settings.HEALTH_REFRESH_SECONDS):
+                return
+    
+    def refresh(self) -> None:
+        """Run every check and replace the readiness snapshot"""
+        checks = {}
+        for name, check in self._checks().items():
+            try:
+                checks[name] = check()
+            except Exception as e:
+                logger.warning(f"Health check {name} failed: {e}")
+                checks[name] = {"status": FAIL, "error": str(e)}
+                
+        ready = all(check["status"] != FAIL for check in checks.values())
+        body = {
+            "status": "ready" if ready else "not_ready",
+            "checked_at": time.time(),
+            "checks": checks
+        }
+        self._snapshot = (200 if ready else 503, json.dumps(body).encode(), time.monotonic())
+    
+    def _checks(self) -> Dict[str, Callable[[], dict]]:
+        return {
+            "worker_pool": self._check_worker_pool,
+            "queue": self._check_queue,
+            "resources": self._check_resources,
+            "template_cache": self._check_template_cache,
+            "github": self._check_github,
+            "dx": self._check_dx
+        }
+    
+    def _check_worker_pool(self) -> dict:
+        """Job slots of this worker in use, and the load on each stage executor"""
+        running, total = executors.running_jobs, settings.JOB_CONCURRENCY
+        utilization = running / total if total else 1.0
+        return {
+            "status": FAIL if utilization >= settings.HEALTH_MAX_POOL_UTILIZATION else OK,
+            "running_jobs": running,
+            "job_slots": total,
+            "utilization": round(utilization, 3),
+            "executors": executors.snapshot()
+        }
+    
+    def _check_queue(self) -> dict:
+        """Jobs queued and running across all workers, and the wait a new job would have"""
+        jobs = store.list_active_jobs(since=time.time() - settings.ADMISSION_STALE_SECONDS)
+        running = sum(1 for job in jobs if job["status"] == "RUNNING")
+        wait = admission_controller.estimate_wait()
+        return {
+            "status": FAIL if settings.ADMISSION_ENABLED and wait > settings.ADMISSION_WAIT_SLO_SECONDS else OK,
+            "pending": len(jobs) - running,
+            "running": running,
+            "estimated_wait_seconds": round(wait, 1)
+        }
+    
+    def _check_resources(self) -> dict:
+        """
+        Job resource budgets of this worker, and the caches shared by all workers.
+        Jobs waiting for resources only start later; a cache over its limit is
+        still borrowed from by running jobs and shrinks once they finish.
+        """
+        snapshot = resource_manager.snapshot()
+        caches = shared_caches.snapshot()
+        degraded = snapshot["waiting_jobs"] or any(cache["bytes"] > cache["limit"] for cache in caches.values())
+        return {"status": DEGRADED if degraded else OK, **snapshot, "shared_caches": caches}
+    
+    def _check_template_cache(self) -> dict:
+        """Registry templates with a fresh local checkout in this worker; cold ones are only slower"""
+        entries = [template_registry.get(name) for name in template_registry.names()]
+        cookiecutter = [entry for entry in entries if entry.backend == "cookiecutter"]
+        cold = [entry.name for entry in cookiecutter if not template_cache.is_warm(entry.url, entry.ref)]
+        return {
+            "status": DEGRADED if cold else OK,
+            "warm": len(cookiecutter) - len(cold),
+            "total": len(cookiecutter),
+            "cold": cold,
+            "warm_pool_workspaces": warm_pools.sizes()
+        }
+    
+    def _check_github(self) -> dict:
+        """Core API rate limit (from recent responses) and circuit breakers"""
+        open_circuits = _open_circuits(github.github_upstream.circuit_states())
+        try:
+            remaining, limit, reset_at, _ = github.get_rate_limit(
+                max_age=settings.HEALTH_GITHUB_RATE_LIMIT_MAX_AGE_SECONDS
+            )
+        except GithubException as e:
+            # GitHub Enterprise answers 404 when rate limiting is disabled
+            if e.status != 404:
+                raise
+            remaining, limit, reset_at = None, None, None
+        limited = (
+            remaining is not None
+            and remaining < settings.HEALTH_MIN_GITHUB_RATE_LIMIT
+            and reset_at > time.time()
+        )
+        return {
+            "status": FAIL if limited or open_circuits else OK,
+            "rate_limit_remaining": remaining,
+            "rate_limit": limit,
+            "rate_limit_reset_at": reset_at,
+            "open_circuits": open_circuits
+        }
+    
+    def _check_dx(self) -> dict:
+        """DX circuit breakers; jobs still run while DX is down, they just can't report"""
+        open_circuits = _open_circuits(dx_client.upstream.circuit_states())
+        return {"status": DEGRADED if open_circuits else OK, "open_circuits": open_circuits}
+
+
+def _open_circuits(states: Dict[str, str]) -> list:
+    return sorted(name for name, state in states.items() if state == CIRCUIT_OPEN)
+
+
+# Singleton instance
+health_monitor = HealthMonitor()
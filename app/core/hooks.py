@@ -0,0 +1,203 @@
+import hashlib
+import logging
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+from cookiecutter.environment import StrictEnvironment
+
+from core.config import settings
+
+logger = logging.getLogger(__name__)
+
+HOOK_STAGES = ("pre_gen_project", "post_gen_project")
+
+# Number of output characters kept in error messages
+OUTPUT_TAIL_CHARS = 2000
+
+
+class HookError(Exception):
+    """Raised when a template hook fails or times out"""
+
+
+@dataclass
+class HookResult:
+    """Outcome of a single hook script run"""
+    name: str
+    returncode: Optional[int]  # None if the hook timed out
+    duration: float
+    stdout: str
+    stderr: str
+    
+    @property
+    def succeeded(self) -> bool:
+        return self.returncode == 0
+
+
+class HookRunner:
+    """
+    Runs cookiecutter pre/post generation hooks in sandboxed subprocesses.
+    
+    Hooks run with a minimal environment (no service credentials), a per-hook
+    timeout and captured output. Each template gets a persistent home and
+    cache directory shared by all of its runs, so tools like `uv` or `pip`
+    resolve and download dependencies once instead of on every render.
+    
+    Besides the standard `hooks/<stage>.py|sh` scripts, scripts placed in
+    `hooks/<stage>.d/` are declared independent of each other and run in
+    parallel after the standard hook of the same stage.
+    """
+    
+    def __init__(self, cache_dir: str):
+        self.cache_dir = cache_dir
+    
+    def has_hooks(self, repo_dir: str, stage: str) -> bool:
+        """Whether a template has any hook script for a stage"""
+        return bool(self._standard_scripts(repo_dir, stage) or self._independent_scripts(repo_dir, stage))
+    
+    def run_hooks(
+        self,
+        template_url: str,
+        repo_dir: str,
+        project_dir: str,
+        context: dict,
+        stages: Tuple[str, ...] = HOOK_STAGES
+    ) -> List[HookResult]:
+        """
+        Run the hooks of a template against a project directory.
+        
+        Args:
+            template_url: Template URL, which identifies the template's cache directory
+            repo_dir: Local template directory
+            project_dir: Project directory (hooks run in it)
+            context: Cookiecutter context used to render the hook scripts
+            stages: Hook stages to run, in order
+            
+        Returns:
+            Results of every hook that ran, raises HookError if any failed
+        """
+        if not (Path(repo_dir) / "hooks").is_dir():
+            return []
+            
+        env = self._sandbox_env(template_url)
+        results = []
+        for stage in stages:
+            for script in self._standard_scripts(repo_dir, stage):
+                results.append(self._run_checked(script, project_dir, context, env))
+                
+            independent = self._independent_scripts(repo_dir, stage)
+            if independent:
+                workers = min(settings.HOOK_MAX_PARALLEL, len(independent))
+                with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="hook") as executor:
+                    stage_results = list(executor.map(
+                        lambda script: self._run_script(script, project_dir, context, env),
+                        independent
+                    ))
+                results.extend(stage_results)
+                for result in stage_results:
+                    self._check(result)
+        return results
+    
+    @staticmethod
+    def _standard_scripts(repo_dir: str, stage: str) -> List[Path]:
+        return [path for path in (Path(repo_dir) / "hooks").glob(f"{stage}.*") if path.suffix in (".py", ".sh")]
+    
+    @staticmethod
+    def _independent_scripts(repo_dir: str, stage: str) -> List[Path]:
+        return sorted(path for path in (Path(repo_dir) / "hooks" / f"{stage}.d").glob("*") if path.is_file())
+    
+    def _run_checked(self, script: Path, project_dir: str, context: dict, env: dict) -> HookResult:
+        result = self._run_script(script, project_dir, context, env)
+        self._check(result)
+        return result
+    
+    @staticmethod
+    def _check(result: HookResult) -> None:
+        if result.returncode is None:
+            raise HookError(f"Hook {result.name} timed out after {settings.HOOK_TIMEOUT_SECONDS}s")
+        if not result.succeeded:
+            raise HookError(
+                f"Hook {result.name} failed (exit status: {result.returncode}): "
+                f"{result.stderr[-OUTPUT_TAIL_CHARS:]}"
+            )
+    
+    def _run_script(self, script: Path, project_dir: str, context: dict, env: dict) -> HookResult:
+        """Render a hook script with the context and run it in a subprocess"""
+        env_vars = context['cookiecutter'].get('_jinja2_env_vars', {})
+        jinja_env = StrictEnvironment(context=context, keep_trailing_newline=True, **env_vars)
+        rendered = jinja_env.from_string(script.read_text(encoding='utf-8')).render(**context)
+        
+        with tempfile.NamedTemporaryFile('w', suffix=script.suffix, delete=False, encoding='utf-8') as f:
+            f.write(rendered)
+            rendered_path = f.name
+        os.chmod(rendered_path, 0o700)
+        
+        command = [sys.executable, rendered_path] if script.suffix == ".py" else [rendered_path]
+        start = time.monotonic()
+        try:
+            # New session so a timeout kills everything the hook started
+            process = subprocess.Popen(
+                command,
+                cwd=project_dir,
+                env=env,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                text=True,
+                start_new_session=True
+            )
+            try:
+                stdout, stderr = process.communicate(timeout=settings.HOOK_TIMEOUT_SECONDS)
+                returncode = process.returncode
+            except subprocess.TimeoutExpired:
+                os.killpg(process.pid, signal.SIGKILL)
+                stdout, stderr = process.communicate()
+                returncode = None
+        finally:
+            os.unlink(rendered_path)
+            
+        result = HookResult(
+            name=script.name,
+            returncode=returncode,
+            duration=time.monotonic() - start,
+            stdout=stdout,
+            stderr=stderr
+        )
+        logger.info(f"Hook {result.name} finished in {result.duration:.2f}s (exit status: {returncode})")
+        if stdout:
+            logger.debug(f"Hook {result.name} stdout:\n{stdout}")
+        if stderr:
+            logger.debug(f"Hook {result.name} stderr:\n{stderr}")
+        return result
+    
+    def _sandbox_env(self, template_url: str) -> dict:
+        """
+        Build the hook environment. HOME and the XDG directories point at a
+        persistent per-template directory, which is where uv, pip, npm and go
+        keep their caches by default.
+        """
+        digest = hashlib.sha1(template_url.encode()).hexdigest()[:16]
+        home = os.path.abspath(os.path.join(self.cache_dir, digest))
+        cache = os.path.join(home, ".cache")
+        os.makedirs(cache, exist_ok=True)
+        
+        return {
+            "PATH": os.environ.get("PATH", os.defpath),
+            "LANG": os.environ.get("LANG", "C.UTF-8"),
+            "HOME": home,
+            "XDG_CACHE_HOME": cache,
+            "XDG_CONFIG_HOME": os.path.join(home, ".config"),
+            "XDG_DATA_HOME": os.path.join(home, ".local", "share"),
+            "UV_CACHE_DIR": os.path.join(cache, "uv"),
+            "PIP_CACHE_DIR": os.path.join(cache, "pip"),
+        }
+
+
+# Singleton instance
+hook_runner = HookRunner(settings.HOOK_CACHE_DIR)
@@ -0,0 +1,106 @@
+import threading
+from typing import Dict, List, Tuple
+
+
+class _Metric:
+    """A metric with a fixed set of label names, one value per label combination"""
+    
+    type_name = "untyped"
+    
+    def __init__(self, name: str, description: str, label_names: Tuple[str, ...] = ()):
+        self.name = name
+        self.description = description
+        self.label_names = label_names
+        self._lock = threading.Lock()
+        self._values: Dict[Tuple[str, ...], float] = {}
+    
+    def _key(self, labels: dict) -> Tuple[str, ...]:
+        return tuple(str(labels[name]) for name in self.label_names)
+    
+    def value(self, **labels) -> float:
+        """Current value for a label combination"""
+        return self._values.get(self._key(labels), 0.0)
+    
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} {self.type_name}"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            if key:
+                label_text = ",".join(
+                    f'{name}="{_escape(label)}"' for name, label in zip(self.label_names, key)
+                )
+                lines.append(f"{self.name}{{{label_text}}} {value:g}")
+            else:
+                lines.append(f"{self.name} {value:g}")
+        return lines
+
+
+class Counter(_Metric):
+    """Monotonically increasing count"""
+    
+    type_name = "counter"
+    
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+
+class Gauge(_Metric):
+    """Value that can go up and down"""
+    
+    type_name = "gauge"
+    
+    def set(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class MetricsRegistry:
+    """
+    Process-wide metrics in the Prometheus text exposition format.
+    
+    Metrics are per process: with several gunicorn workers, each scrape of
+    /metrics is answered by one of them.
+    """
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._metrics: Dict[str, _Metric] = {}
+    
+    def counter(self, name: str, description: str, label_names: Tuple[str, ...] = ()) -> Counter:
+        """Get or create a counter"""
+        return self._register(Counter, name, description, label_names)
+    
+    def gauge(self, name: str, description: str, label_names: Tuple[str, ...] = ()) -> Gauge:
+        """Get or create a gauge"""
+        return self._register(Gauge, name, description, label_names)
+    
+    def _register(self, metric_class: type, name: str, description: str, label_names: Tuple[str, ...]):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = metric_class(name, description, label_names)
+                self._metrics[name] = metric
+            elif not isinstance(metric, metric_class) or metric.label_names != label_names:
+                raise ValueError(f"Metric {name} is already registered with a different type or labels")
+            return metric
+    
+    def render(self) -> str:
+        """All metrics in the Prometheus text format"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+# Singleton instance
+metrics = MetricsRegistry()
@@ -0,0 +1,94 @@
+import asyncio
+import logging
+import re
+import time
+
+from github import GithubException
+
+from clients import github
+from core.config import settings
+from core.executors import executors
+
+logger = logging.getLogger(__name__)
+
+# GitHub repository names: letters, digits, '.', '-' and '_', at most 100 characters
+REPO_NAME_PATTERN = re.compile(r"^[A-Za-z0-9._-]{1,100}$")
+
+# GitHub user and organization names: alphanumeric or single hyphens, at most 39 characters
+OWNER_NAME_PATTERN = re.compile(r"^[A-Za-z0-9](?:[A-Za-z0-9]|-(?=[A-Za-z0-9])){0,38}$")
+
+
+class PreflightError(Exception):
+    """Raised when a request is rejected before any work is queued"""
+    
+    def __init__(self, status_code: int, detail: str):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+
+
+def check_names(github_org: str, github_repo: str) -> None:
+    """Check the organization and repository names against GitHub's naming rules"""
+    if not OWNER_NAME_PATTERN.match(github_org):
+        raise PreflightError(422, f"Invalid GitHub organization name: {github_org}")
+    if not REPO_NAME_PATTERN.match(github_repo) or github_repo in (".", "..") or github_repo.endswith(".git"):
+        raise PreflightError(
+            422,
+            f"Invalid repository name: {github_repo}. Use up to 100 letters, digits, '.', '-' or '_' "
+            f"(not '.', '..' or ending in '.git')"
+        )
+
+
+def check_owner(github_org: str) -> None:
+    """Check that the organization exists and the token can see it (cached)"""
+    try:
+        github.get_owner(github_org)
+    except GithubException as e:
+        if e.status == 404:
+            raise PreflightError(404, f"GitHub organization not found or not accessible: {github_org}")
+        if e.status == 401:
+            raise PreflightError(403, "The configured GitHub token was rejected")
+        raise
+
+
+def check_repo_available(github_org: str, github_repo: str) -> None:
+    """Check that the target repository doesn't exist yet"""
+    if github.check_repo_exists(github_org, github_repo):
+        raise PreflightError(409, f"Repository already exists: {github_org}/{github_repo}")
+
+
+async def run_preflight(github_org: str, github_repo: str) -> None:
+    """
+    Validate a request before it is queued, so doomed jobs fail in milliseconds
+    instead of after a full render.
+    
+    Local checks run first; the GitHub checks then run concurrently. The
+    preflight is only an early rejection: if GitHub is slow or errors, the
+    checks are skipped and the job runs (and fails) as before.
+    
+    Args:
+        github_org: GitHub organization or username
+        github_repo: Repository name
+        
+    Raises:
+        PreflightError: If the request can't succeed
+    """
+    start = time.monotonic()
+    check_names(github_org, github_repo)
+    
+    try:
+        await asyncio.wait_for(
+            asyncio.gather(
+                executors.run("requests", check_owner, github_org),
+                executors.run("requests", check_repo_available, github_org, github_repo)
+            ),
+            timeout=settings.PREFLIGHT_TIMEOUT_SECONDS
+        )
+    except PreflightError:
+        raise
+    except asyncio.TimeoutError:
+        logger.warning(f"Preflight GitHub checks for {github_org}/{github_repo} timed out, skipping them")
+    except Exception as e:
+        logger.warning(f"Preflight GitHub checks for {github_org}/{github_repo} failed, skipping them: {e}")
+        
+    logger.info(f"Preflight for {github_org}/{github_repo} passed in {(time.monotonic() - start) * 1000:.0f}ms")
@@ -0,0 +1,302 @@
+import asyncio
+import collections
+import contextvars
+import functools
+import hashlib
+import json
+import logging
+import os
+import re
+import sys
+import threading
+import time
+import tracemalloc
+import zipfile
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Callable, Iterator, Optional, Set
+
+from core.config import settings
+from core.store import store
+
+logger = logging.getLogger(__name__)
+
+# Number of entries in the top-N reports
+REPORT_LIMIT = 50
+
+# Sampler of the job profiled in the current context, if any
+_active_sampler: contextvars.ContextVar = contextvars.ContextVar("active_sampler", default=None)
+
+
+class _StackSampler(threading.Thread):
+    """
+    Samples the Python stacks of a set of threads at a fixed interval.
+    
+    Only the profiled threads' frames are walked, so other threads pay
+    nothing beyond the sampler briefly holding the GIL. Threads join and
+    leave the set as they start and finish work for the profiled job.
+    """
+    
+    def __init__(self, interval: float):
+        super().__init__(name="profile-sampler", daemon=True)
+        self.thread_ids: Set[int] = set()
+        self.interval = interval
+        self.stacks: collections.Counter = collections.Counter()
+        self.samples = 0
+        self._stop_event = threading.Event()
+    
+    def run(self) -> None:
+        while not self._stop_event.wait(self.interval):
+            frames = sys._current_frames()
+            for thread_id in list(self.thread_ids):
+                frame = frames.get(thread_id)
+                if frame is None:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(_frame_label(frame))
+                    frame = frame.f_back
+                self.stacks[tuple(reversed(stack))] += 1
+                self.samples += 1
+    
+    def stop(self) -> None:
+        self._stop_event.set()
+        self.join()
+
+
+@dataclass
+class _ProfileSession:
+    """A profile in progress"""
+    sampler: _StackSampler
+    before: Optional[tracemalloc.Snapshot]  # None unless allocations are tracked
+    started_tracing: bool
+    start: float
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{_short_path(code.co_filename)}:{code.co_name}:{code.co_firstlineno}"
+
+
+@functools.lru_cache(maxsize=4096)
+def _short_path(filename: str) -> str:
+    """Strip the longest sys.path prefix so labels stay readable"""
+    paths = [os.path.abspath(path or os.curdir) for path in sys.path]
+    prefixes = [path for path in paths if filename.startswith(path + os.sep)]
+    return filename[len(max(prefixes, key=len)) + 1:] if prefixes else filename
+
+
+class JobProfiler:
+    """
+    Opt-in profiling of a single job run.
+    
+    A profiled job runs with a sampling stack profiler on the threads that
+    run its stages. Samples are taken on wall-clock time, so time spent
+    waiting on git, GitHub or hook subprocesses shows up under the call that
+    waited; time spent waiting for a stage executor thread isn't sampled.
+    Only the job's threads are walked, so other jobs don't slow down.
+    
+    With PROFILE_ALLOCATIONS, the job also runs with tracemalloc allocation
+    tracking. tracemalloc hooks every allocation in the process, so while it
+    runs every other job and request in the worker pays for it too; leave it
+    off unless the worker is otherwise idle. Only one job per worker process
+    is profiled at a time; further profile requests run unprofiled. Neither
+    can see into render processes, so the profiled job renders in the
+    worker process itself (see StageExecutors.run_in_process).
+    
+    The artifacts are written to a zip file in PROFILE_DIR and its path is
+    recorded on the job:
+    - cpu.folded: collapsed stacks (flamegraph.pl / speedscope format)
+    - cpu_top.txt: functions by self and total samples
+    - allocations.txt: allocations made during the job by source line (PROFILE_ALLOCATIONS only)
+    - summary.json: duration, sample count and peak traced memory
+    """
+    
+    def __init__(self, profile_dir: str):
+        self.profile_dir = profile_dir
+        self._lock = threading.Lock()
+    
+    def wrap(self, job_id: str, func: Callable) -> Callable:
+        """
+        Wrap a job function so the call is profiled.
+        
+        Args:
+            job_id: Job ID the profile is recorded on
+            func: Function or coroutine function running the job
+            
+        Returns:
+            Function with the same signature that profiles the job
+        """
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def profiled_async(*args, **kwargs):
+                # Snapshots and reports are slow, so they're taken off the event loop. The loop
+                # thread serves other requests too, so only threads in sample_thread() are sampled.
+                session = await asyncio.to_thread(self._start, job_id, None)
+                if session is None:
+                    return await func(*args, **kwargs)
+                token = _active_sampler.set(session.sampler)
+                try:
+                    return await func(*args, **kwargs)
+                finally:
+                    _active_sampler.reset(token)
+                    await asyncio.to_thread(self._finish, job_id, session)
+            return profiled_async
+            
+        @functools.wraps(func)
+        def profiled(*args, **kwargs):
+            with self.profile(job_id):
+                return func(*args, **kwargs)
+        return profiled
+    
+    def active(self) -> bool:
+        """Whether the current context runs the job being profiled"""
+        return _active_sampler.get() is not None
+    
+    @contextmanager
+    def sample_thread(self) -> Iterator[None]:
+        """Sample the current thread inside the block if it works for the job profiled in this context"""
+        sampler = _active_sampler.get()
+        if sampler is None:
+            yield
+            return
+        thread_id = threading.get_ident()
+        sampler.thread_ids.add(thread_id)
+        try:
+            yield
+        finally:
+            sampler.thread_ids.discard(thread_id)
+    
+    @contextmanager
+    def profile(self, job_id: str) -> Iterator[None]:
+        """Profile the code run by the current thread, and by sample_thread() blocks in its context"""
+        session = self._start(job_id, threading.get_ident())
+        if session is None:
+            yield
+            return
+        token = _active_sampler.set(session.sampler)
+        try:
+            yield
+        finally:
+            _active_sampler.reset(token)
+            self._finish(job_id, session)
+    
+    def _start(self, job_id: str, thread_id: Optional[int]) -> Optional["_ProfileSession"]:
+        """Start sampling (thread_id, if given) and tracing; None if another job is being profiled"""
+        if not self._lock.acquire(blocking=False):
+            logger.warning(f"Another job is being profiled, running job {job_id} without profiling")
+            return None
+        try:
+            started_tracing = False
+            before = None
+            if settings.PROFILE_ALLOCATIONS:
+                started_tracing = not tracemalloc.is_tracing()
+                if started_tracing:
+                    tracemalloc.start()
+                tracemalloc.reset_peak()
+                before = tracemalloc.take_snapshot()
+                
+            sampler = _StackSampler(settings.PROFILE_SAMPLE_INTERVAL_SECONDS)
+            if thread_id is not None:
+                sampler.thread_ids.add(thread_id)
+            sampler.start()
+            return _ProfileSession(sampler, before, started_tracing, time.monotonic())
+        except BaseException:
+            self._lock.release()
+            raise
+    
+    def _finish(self, job_id: str, session: "_ProfileSession") -> None:
+        """Stop tracing and sampling and write the profile"""
+        try:
+            session.sampler.stop()
+            duration = time.monotonic() - session.start
+            after = None
+            peak = None
+            if session.before is not None:
+                after = tracemalloc.take_snapshot()
+                _, peak = tracemalloc.get_traced_memory()
+            if session.started_tracing:
+                tracemalloc.stop()
+                
+            try:
+                path = self._write_artifacts(job_id, session.sampler, session.before, after, duration, peak)
+                store.update_job(job_id, profile_path=path)
+                logger.info(f"Profile of job {job_id} written to {path}")
+            except Exception as e:
+                logger.error(f"Failed to write profile of job {job_id}: {e}", exc_info=True)
+        finally:
+            self._lock.release()
+    
+    def _write_artifacts(
+        self,
+        job_id: str,
+        sampler: _StackSampler,
+        before: Optional[tracemalloc.Snapshot],
+        after: Optional[tracemalloc.Snapshot],
+        duration: float,
+        peak: Optional[int]
+    ) -> str:
+        """Write the profile reports into a zip file and return its path"""
+        # Job IDs come from requests, so don't use them as file names directly
+        safe_id = re.sub(r"[^A-Za-z0-9_.-]", "_", job_id)[:64]
+        digest = hashlib.sha1(job_id.encode()).hexdigest()[:8]
+        os.makedirs(self.profile_dir, exist_ok=True)
+        path = os.path.abspath(os.path.join(self.profile_dir, f"{safe_id}-{digest}.zip"))
+        
+        summary = {
+            "job_id": job_id,
+            "duration_seconds": round(duration, 3),
+            "sample_interval_seconds": sampler.interval,
+            "samples": sampler.samples,
+            "peak_traced_memory_bytes": peak,
+        }
+        
+        with zipfile.ZipFile(path, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+            archive.writestr("summary.json", json.dumps(summary, indent=2))
+            archive.writestr("cpu.folded", self._folded_stacks(sampler))
+            archive.writestr("cpu_top.txt", self._top_functions(sampler))
+            if before is not None and after is not None:
+                archive.writestr("allocations.txt", self._allocations(before, after))
+        return path
+    
+    @staticmethod
+    def _allocations(before: tracemalloc.Snapshot, after: tracemalloc.Snapshot) -> str:
+        # Ignore allocations made by tracemalloc itself and this module
+        filters = [
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, __file__)
+        ]
+        allocations = after.filter_traces(filters).compare_to(before.filter_traces(filters), "lineno")
+        return "\n".join(
+            ["Allocations during the job (size difference by source line):", ""]
+            + [str(stat) for stat in allocations[:REPORT_LIMIT]]
+        ) + "\n"
+    
+    @staticmethod
+    def _folded_stacks(sampler: _StackSampler) -> str:
+        lines = [f"{';'.join(stack)} {count}" for stack, count in sampler.stacks.most_common()]
+        return "\n".join(lines) + "\n"
+    
+    @staticmethod
+    def _top_functions(sampler: _StackSampler) -> str:
+        own = collections.Counter()
+        total = collections.Counter()
+        for stack, count in sampler.stacks.items():
+            own[stack[-1]] += count
+            for label in set(stack):
+                total[label] += count
+                
+        samples = max(sampler.samples, 1)
+        lines = [f"{'self %':>7} {'total %':>8}  function"]
+        for label, _ in total.most_common(REPORT_LIMIT):
+            lines.append(f"{own[label] / samples:>7.1%} {total[label] / samples:>8.1%}  {label}")
+        return "\n".join(lines) + "\n"
+    
+    def get_profile_path(self, job: dict) -> Optional[str]:
+        """Path of a job's profile, or None if it has none"""
+        path = job.get("profile_path")
+        return path if path and os.path.isfile(path) else None
+
+
+# Singleton instance
+job_profiler = JobProfiler(settings.PROFILE_DIR)
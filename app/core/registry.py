@@ -0,0 +1,303 @@
+import dataclasses
+import json
+import logging
+import os
+import re
+import threading
+from dataclasses import dataclass
+from typing import Any, Dict, Literal, Optional, Tuple, Type
+
+from pydantic import BaseModel, ConfigDict, Field, create_model
+
+from clients.github import BRANCH_PROTECTION_FIELDS, REPO_OPTIONS, TEAM_PERMISSIONS, RepoSettings
+from core.config import settings
+from core.template_cache import template_cache
+
+logger = logging.getLogger(__name__)
+
+BACKENDS = ("cookiecutter", "github_template")
+
+# Property types a props schema can declare
+PROP_TYPES: Dict[str, type] = {
+    "string": str,
+    "integer": int,
+    "number": float,
+    "boolean": bool,
+}
+
+# "${NAME}" in a string value is replaced with the setting or environment variable NAME
+SETTING_PATTERN = re.compile(r"\$\{(\w+)\}")
+
+# GitHub's rules for topic names
+TOPIC_PATTERN = re.compile(r"[a-z0-9][a-z0-9-]{0,49}")
+
+
+class RegistryError(Exception):
+    """Raised when the template registry file is invalid"""
+
+
+@dataclass(frozen=True)
+class TemplateEntry:
+    """A template type from the registry"""
+    name: str
+    url: str  # Git URL or local path (cookiecutter), or "owner/repo" (github_template)
+    props_model: Type[BaseModel]
+    backend: str = "cookiecutter"
+    ref: Optional[str] = None  # Branch, tag or commit of the template
+    directory: Optional[str] = None  # Subdirectory of the repository that contains the template
+    hooks: Optional[bool] = None  # None follows COOKIECUTTER_ACCEPT_HOOKS
+    aliases: Tuple[str, ...] = ()
+    description: str = ""
+    repository: Optional[RepoSettings] = None  # Settings for every repository created from the template
+    
+    def validate_props(self, props: dict) -> dict:
+        """
+        Validate and coerce request properties against the template's schema.
+        Properties not in the schema are passed through unchanged.
+        
+        Args:
+            props: Template-specific properties
+            
+        Returns:
+            Validated properties, without unset optional ones
+            
+        Raises:
+            pydantic.ValidationError: If the properties don't match the schema
+        """
+        return self.props_model.model_validate(props).model_dump(exclude_none=True)
+
+
+def _expand(value: Any) -> Any:
+    if not isinstance(value, str):
+        return value
+    
+    def lookup(match: re.Match) -> str:
+        name = match.group(1)
+        resolved = getattr(settings, name, None) or os.environ.get(name)
+        if resolved is None:
+            raise RegistryError(f"Unknown setting referenced in template registry: {name}")
+        return str(resolved)
+    return SETTING_PATTERN.sub(lookup, value)
+
+
+def _compile_props_model(name: str, schema: Dict[str, dict]) -> Type[BaseModel]:
+    """Compile a props schema into a pydantic model, once per registry load"""
+    fields = {}
+    for prop, spec in schema.items():
+        prop_type = spec.get("type", "string")
+        if prop_type not in PROP_TYPES:
+            raise RegistryError(f"Template '{name}': unknown type '{prop_type}' for property '{prop}'")
+        annotation = Literal[tuple(spec["enum"])] if "enum" in spec else PROP_TYPES[prop_type]
+        
+        constraints = {"description": spec.get("description")}
+        if prop_type == "string":
+            constraints["pattern"] = spec.get("pattern")
+            constraints["max_length"] = spec.get("max_length")
+        if spec.get("required"):
+            if prop_type == "string":
+                constraints["min_length"] = 1
+            fields[prop] = (annotation, Field(..., **constraints))
+        else:
+            fields[prop] = (Optional[annotation], Field(_expand(spec.get("default")), **constraints))
+            
+    model_name = re.sub(r"\W", "_", name.title()) + "Props"
+    return create_model(model_name, __config__=ConfigDict(extra="allow"), **fields)
+
+
+def _parse_repository(name: str, raw: Any) -> Optional[RepoSettings]:
+    """Parse a template's repository settings, once per registry load"""
+    if raw is None:
+        return None
+    if not isinstance(raw, dict):
+        raise RegistryError(f"Template '{name}': 'repository' must be an object")
+    unknown = set(raw) - {"options", "topics", "branch_protection", "teams"}
+    if unknown:
+        raise RegistryError(f"Template '{name}': unknown repository settings {', '.join(sorted(unknown))}")
+        
+    options = raw.get("options", {})
+    for option, value in options.items():
+        if option not in REPO_OPTIONS or not isinstance(value, bool):
+            raise RegistryError(
+                f"Template '{name}': repository option '{option}' must be a boolean, "
+                f"and one of {', '.join(REPO_OPTIONS)}"
+            )
+    topics = raw.get("topics", [])
+    for topic in topics:
+        if not isinstance(topic, str) or not TOPIC_PATTERN.fullmatch(topic):
+            raise RegistryError(f"Template '{name}': invalid topic '{topic}' (lowercase letters, digits and hyphens)")
+    protection = raw.get("branch_protection", {})
+    for setting, value in protection.items():
+        if setting not in BRANCH_PROTECTION_FIELDS:
+            raise RegistryError(f"Template '{name}': unknown branch protection setting '{setting}'")
+        if setting == "required_approving_review_count":
+            valid = isinstance(value, int) and not isinstance(value, bool) and 0 <= value <= 6
+        elif setting == "required_status_checks":
+            valid = isinstance(value, list) and all(isinstance(check, str) for check in value)
+        else:
+            valid = isinstance(value, bool)
+        if not valid:
+            raise RegistryError(f"Template '{name}': invalid value for branch protection setting '{setting}'")
+    teams = raw.get("teams", {})
+    for team, permission in teams.items():
+        if permission not in TEAM_PERMISSIONS:
+            raise RegistryError(
+                f"Template '{name}': team '{team}' permission must be one of {', '.join(TEAM_PERMISSIONS)}"
+            )
+            
+    return RepoSettings(
+        options=tuple(options.items()),
+        topics=tuple(topics),
+        branch_protection=tuple(
+            (setting, tuple(value) if isinstance(value, list) else value) for setting, value in protection.items()
+        ),
+        teams=tuple(teams.items())
+    )
+
+
+def _parse_entry(name: str, raw: dict) -> TemplateEntry:
+    if not isinstance(raw, dict) or not raw.get("url"):
+        raise RegistryError(f"Template '{name}' must be an object with a 'url'")
+    backend = raw.get("backend", "cookiecutter")
+    if backend not in BACKENDS:
+        raise RegistryError(f"Template '{name}': unknown backend '{backend}' (expected one of {', '.join(BACKENDS)})")
+    hooks = raw.get("hooks", "inherit")
+    if hooks not in ("inherit", True, False):
+        raise RegistryError(f"Template '{name}': 'hooks' must be true, false or \"inherit\"")
+        
+    return TemplateEntry(
+        name=name,
+        url=_expand(raw["url"]),
+        props_model=_compile_props_model(name, raw.get("props", {})),
+        backend=backend,
+        ref=_expand(raw.get("ref")),
+        directory=raw.get("directory"),
+        hooks=None if hooks == "inherit" else hooks,
+        aliases=tuple(alias.lower() for alias in raw.get("aliases", [])),
+        description=raw.get("description", ""),
+        repository=_parse_repository(name, raw.get("repository"))
+    )
+
+
+class TemplateRegistry:
+    """
+    Template types loaded from a JSON registry file (TEMPLATE_REGISTRY_PATH).
+    
+    Entries map a template type to its URL, ref, directory, hooks policy,
+    execution backend and properties schema. Schemas are compiled into
+    validators when the file is loaded, and every name and alias goes into one
+    dict, so a lookup is a single dict access. The file is watched and
+    reloaded on change without a restart; an invalid file is logged and the
+    previous registry stays in use. Templates that are new after a load are
+    cloned into the template cache in the background, so their first request
+    doesn't pay for the clone.
+    
+    Entries in GITHUB_TEMPLATE_REPOSITORIES switch the matching template to the
+    github_template backend.
+    """
+    
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._entries: Dict[str, TemplateEntry] = {}
+        self._templates: Dict[str, TemplateEntry] = {}
+        self._mtime: Optional[float] = None
+        self._loaded = False
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+    
+    def get(self, template_type: str) -> Optional[TemplateEntry]:
+        """Get the entry for a template type or alias, or None if it isn't registered"""
+        if not self._loaded:
+            self.reload()
+        return self._entries.get(template_type.lower())
+    
+    def names(self) -> list:
+        """Registered template types, without aliases"""
+        if not self._loaded:
+            self.reload()
+        return list(self._templates)
+    
+    def reload(self) -> bool:
+        """
+        Load the registry file if it changed since the last load.
+        
+        Returns:
+            True if the registry was (re)loaded
+        """
+        with self._lock:
+            try:
+                mtime = os.stat(self.path).st_mtime
+            except FileNotFoundError:
+                raise RegistryError(f"Template registry not found: {os.path.abspath(self.path)}")
+            if self._loaded and mtime == self._mtime:
+                return False
+                
+            with open(self.path, encoding="utf-8") as f:
+                raw = json.load(f)
+            templates = {
+                name.lower(): _parse_entry(name.lower(), entry)
+                for name, entry in raw.get("templates", {}).items()
+            }
+            
+            for name, template_repo in settings.GITHUB_TEMPLATE_REPOSITORIES.items():
+                name = name.lower()
+                if name in templates:
+                    templates[name] = dataclasses.replace(templates[name], backend="github_template", url=template_repo)
+                else:
+                    templates[name] = _parse_entry(name, {"url": template_repo, "backend": "github_template"})
+                    
+            entries = dict(templates)
+            for entry in templates.values():
+                for alias in entry.aliases:
+                    if alias in entries:
+                        raise RegistryError(f"Template alias '{alias}' is already registered")
+                    entries[alias] = entry
+                    
+            previous = self._templates
+            self._templates, self._entries = templates, entries
+            self._mtime = mtime
+            self._loaded = True
+            
+        logger.info(f"Loaded {len(templates)} templates from {self.path}: {', '.join(templates)}")
+        new = [
+            entry for name, entry in templates.items()
+            if entry.backend == "cookiecutter"
+            and (name not in previous or (previous[name].url, previous[name].ref) != (entry.url, entry.ref))
+        ]
+        if new and settings.TEMPLATE_REGISTRY_PREWARM:
+            threading.Thread(target=self._prewarm, args=(new,), name="registry-prewarm", daemon=True).start()
+        return True
+    
+    @staticmethod
+    def _prewarm(entries: list) -> None:
+        for entry in entries:
+            try:
+                template_cache.get(entry.url, entry.ref)
+            except Exception as e:
+                logger.warning(f"Failed to pre-warm template cache for {entry.name}: {e}")
+    
+    def start(self) -> None:
+        """Load the registry and start watching the file for changes"""
+        self.reload()
+        if settings.TEMPLATE_REGISTRY_RELOAD_SECONDS > 0:
+            self._stopping.clear()
+            self._thread = threading.Thread(target=self._watch, name="template-registry", daemon=True)
+            self._thread.start()
+    
+    def stop(self) -> None:
+        """Stop watching the registry file"""
+        self._stopping.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+            self._thread = None
+    
+    def _watch(self) -> None:
+        while not self._stopping.wait(settings.TEMPLATE_REGISTRY_RELOAD_SECONDS):
+            try:
+                self.reload()
+            except Exception as e:
+                logger.error(f"Failed to reload template registry, keeping the previous one: {e}")
+
+
+# Singleton instance
+template_registry = TemplateRegistry(settings.TEMPLATE_REGISTRY_PATH)
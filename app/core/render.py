@@ -0,0 +1,93 @@
+import os
+import shutil
+from typing import Optional
+
+from cookiecutter.main import cookiecutter
+
+from core.config import settings
+from core.executors import executors
+from core.hooks import hook_runner
+from core.template_cache import build_context, render_project_dir_name, template_cache
+from utils import get_unique_output_dir
+
+
+def render_template(
+    template_url: str,
+    props: dict,
+    output_dir: Optional[str] = None,
+    checkout: Optional[str] = None,
+    directory: Optional[str] = None,
+    template_dir: Optional[str] = None,
+    accept_hooks: Optional[bool] = None,
+    **cookiecutter_kwargs
+) -> str:
+    """
+    Generate a project from a cookiecutter template.
+    
+    The template comes from the local template cache. Cookiecutter changes
+    the process working directory while it generates files and reads the
+    template through relative paths, so it runs in a render process (see
+    StageExecutors.run_in_process) and renders don't block each other.
+    Cookiecutter's own hook execution is always disabled; when hooks are
+    accepted, the template's hooks run in the sandboxed hook runner at the
+    same points cookiecutter runs them: pre_gen_project in the empty project
+    directory before any file is generated, post_gen_project afterwards.
+    If the render or a hook fails, the generated files are deleted.
+    
+    Args:
+        template_url: Git URL or local path of the cookiecutter template
+        props: Template-specific properties
+        output_dir: Where to generate the project (a unique directory by default)
+        checkout: Optional branch, tag or commit of the template
+        directory: Subdirectory of the repository that contains the template
+        template_dir: Render this local template directory instead of the cached checkout
+        accept_hooks: Whether to run the template's hooks (defaults to COOKIECUTTER_ACCEPT_HOOKS)
+        **cookiecutter_kwargs: Extra arguments passed to cookiecutter()
+        
+    Returns:
+        Path to the generated project directory
+    """
+    if template_dir is None:
+        repo_dir = template_cache.get(template_url, checkout)
+        template_dir = os.path.join(repo_dir, directory) if directory else repo_dir
+    if accept_hooks is None:
+        accept_hooks = settings.COOKIECUTTER_ACCEPT_HOOKS
+    owns_output_dir = output_dir is None
+    output_dir = os.path.abspath(output_dir or get_unique_output_dir())
+    
+    context = None
+    if accept_hooks:
+        context = build_context(template_dir, props)
+        context['cookiecutter']['_template'] = template_url
+        context['cookiecutter']['_output_dir'] = output_dir
+        context['cookiecutter']['_repo_dir'] = template_dir
+        context['cookiecutter']['_checkout'] = checkout
+        
+    project_dir = None
+    try:
+        if context and hook_runner.has_hooks(template_dir, "pre_gen_project"):
+            project_dir = os.path.join(output_dir, render_project_dir_name(template_dir, context))
+            os.makedirs(project_dir, exist_ok=True)
+            hook_runner.run_hooks(template_url, template_dir, project_dir, context, stages=("pre_gen_project",))
+            cookiecutter_kwargs.setdefault('overwrite_if_exists', True)
+            
+        project_dir = executors.run_in_process(
+            cookiecutter,
+            os.path.abspath(template_dir),
+            extra_context=props,
+            no_input=True,
+            output_dir=output_dir,
+            accept_hooks=False,
+            **cookiecutter_kwargs
+        )
+        
+        if context:
+            hook_runner.run_hooks(template_url, template_dir, project_dir, context, stages=("post_gen_project",))
+    except Exception:
+        # The caller never learns the project path, so nothing else would delete the files
+        cleanup_dir = output_dir if owns_output_dir else project_dir
+        if cleanup_dir:
+            shutil.rmtree(cleanup_dir, ignore_errors=True)
+        raise
+        
+    return project_dir
@@ -0,0 +1,340 @@
+import email.utils
+import logging
+import random
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Callable, Deque, Dict, Mapping, Optional, Tuple, TypeVar
+
+from core.config import settings
+from core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Failure kinds reported by classifiers
+CONNECT = "connect"  # The request never reached the upstream, always safe to retry
+TIMEOUT = "timeout"
+SERVER = "server"  # 5xx
+THROTTLED = "throttled"  # 429 or rate limited, retried after Retry-After
+
+# Kinds that count against a circuit breaker; throttling is the upstream working as intended
+BREAKER_FAILURES = (CONNECT, TIMEOUT, SERVER)
+
+CIRCUIT_CLOSED = "closed"
+CIRCUIT_HALF_OPEN = "half_open"
+CIRCUIT_OPEN = "open"
+CIRCUIT_STATE_VALUES = {CIRCUIT_CLOSED: 0, CIRCUIT_HALF_OPEN: 1, CIRCUIT_OPEN: 2}
+
+_requests = metrics.counter(
+    "upstream_requests_total", "Upstream request attempts by outcome", ("upstream", "endpoint", "outcome")
+)
+_retries = metrics.counter("upstream_retries_total", "Upstream request retries", ("upstream", "endpoint"))
+_budget_exhausted = metrics.counter(
+    "upstream_retry_budget_exhausted_total", "Retries skipped because the retry budget was spent", ("upstream",)
+)
+_rejections = metrics.counter(
+    "upstream_circuit_rejections_total", "Calls rejected by an open circuit breaker", ("upstream", "endpoint")
+)
+_circuit_state = metrics.gauge(
+    "upstream_circuit_state", "Circuit breaker state (0 closed, 1 half-open, 2 open)", ("upstream", "endpoint")
+)
+_timeout = metrics.gauge(
+    "upstream_timeout_seconds", "Current adaptive request timeout", ("upstream", "endpoint")
+)
+_latency = metrics.gauge(
+    "upstream_latency_seconds", "Smoothed latency of successful requests", ("upstream", "endpoint")
+)
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling an upstream endpoint whose circuit breaker is open"""
+
+
+@dataclass
+class Failure:
+    """Why an attempt failed, as decided by a classifier"""
+    kind: str
+    retry_after: Optional[float] = None  # Seconds the upstream asked us to wait
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Parse a Retry-After header (seconds or HTTP date) into seconds from now"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, email.utils.parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def classify_status(status: int, headers: Mapping[str, str]) -> Optional[Failure]:
+    """Classify an HTTP response status; None means the upstream is healthy (including 4xx)"""
+    if status == 429 or (status == 503 and headers.get("Retry-After")):
+        return Failure(THROTTLED, parse_retry_after(headers.get("Retry-After")))
+    if status >= 500:
+        return Failure(SERVER)
+    return None
+
+
+class RetryBudget:
+    """
+    Caps retries at a fraction of recent requests, so retries can't multiply
+    load on an upstream that is already struggling.
+    """
+    
+    def __init__(self, ratio: float, min_retries: int, window: float):
+        self.ratio = ratio
+        self.min_retries = min_retries
+        self.window = window
+        self._lock = threading.Lock()
+        self._requests: Deque[float] = deque()
+        self._retries: Deque[float] = deque()
+    
+    def _trim(self, now: float) -> None:
+        for events in (self._requests, self._retries):
+            while events and events[0] < now - self.window:
+                events.popleft()
+    
+    def record_request(self) -> None:
+        now = time.monotonic()
+        with self._lock:
+            self._trim(now)
+            self._requests.append(now)
+    
+    def try_retry(self) -> bool:
+        """Spend a retry if the budget allows one"""
+        now = time.monotonic()
+        with self._lock:
+            self._trim(now)
+            if len(self._retries) >= max(self.min_retries, self.ratio * len(self._requests)):
+                return False
+            self._retries.append(now)
+            return True
+
+
+class Endpoint:
+    """
+    Circuit breaker and adaptive timeout for one upstream endpoint.
+    
+    The breaker opens after RESILIENCE_FAILURE_THRESHOLD consecutive failures,
+    rejects calls for RESILIENCE_RESET_SECONDS, then lets a single probe
+    through (half-open) and closes again if it succeeds.
+    
+    The timeout follows the endpoint's latency like TCP's retransmission
+    timeout: smoothed latency plus four deviations, clamped between
+    RESILIENCE_MIN_TIMEOUT_SECONDS and the client's maximum. A healthy
+    endpoint therefore times out in seconds rather than after the maximum, so
+    a stalled upstream trips the breaker quickly. Each timeout doubles it
+    until the next success, so an upstream that is merely slower adapts.
+    """
+    
+    def __init__(self, upstream: str, name: str, max_timeout: float):
+        self.upstream = upstream
+        self.name = name
+        self.max_timeout = max_timeout
+        self._lock = threading.Lock()
+        self._state = CIRCUIT_CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self._samples = 0
+        self._latency = 0.0
+        self._deviation = 0.0
+        self._backoff = 1.0
+        _circuit_state.set(0, upstream=upstream, endpoint=name)
+        _timeout.set(max_timeout, upstream=upstream, endpoint=name)
+    
+    @property
+    def state(self) -> str:
+        return self._state
+    
+    def timeout(self) -> float:
+        with self._lock:
+            if self._samples < settings.RESILIENCE_MIN_SAMPLES:
+                return self.max_timeout
+            estimate = (self._latency + 4 * self._deviation) * self._backoff
+            return min(self.max_timeout, max(settings.RESILIENCE_MIN_TIMEOUT_SECONDS, estimate))
+    
+    def before_call(self) -> None:
+        """Raise CircuitOpenError unless a call may go through now"""
+        with self._lock:
+            if self._state == CIRCUIT_OPEN:
+                if time.monotonic() - self._opened_at < settings.RESILIENCE_RESET_SECONDS:
+                    raise CircuitOpenError(f"Circuit open for {self.upstream} {self.name}")
+                self._set_state(CIRCUIT_HALF_OPEN)
+            if self._state == CIRCUIT_HALF_OPEN:
+                if self._probing:
+                    raise CircuitOpenError(f"Circuit half-open for {self.upstream} {self.name}, probe in flight")
+                self._probing = True
+    
+    def record_success(self, latency: float) -> None:
+        with self._lock:
+            if self._samples == 0:
+                self._latency, self._deviation = latency, latency / 2
+            else:
+                self._deviation = 0.75 * self._deviation + 0.25 * abs(latency - self._latency)
+                self._latency = 0.875 * self._latency + 0.125 * latency
+            self._samples += 1
+            self._backoff = 1.0
+            self._failures = 0
+            self._probing = False
+            if self._state != CIRCUIT_CLOSED:
+                logger.info(f"Circuit closed for {self.upstream} {self.name}")
+                self._set_state(CIRCUIT_CLOSED)
+        _latency.set(self._latency, upstream=self.upstream, endpoint=self.name)
+        _timeout.set(self.timeout(), upstream=self.upstream, endpoint=self.name)
+    
+    def record_failure(self, kind: str) -> None:
+        with self._lock:
+            self._probing = False
+            if kind == TIMEOUT:
+                self._backoff = min(self._backoff * 2, 64)
+            if kind not in BREAKER_FAILURES:
+                return
+            self._failures += 1
+            if self._state == CIRCUIT_HALF_OPEN or self._failures >= settings.RESILIENCE_FAILURE_THRESHOLD:
+                if self._state != CIRCUIT_OPEN:
+                    logger.warning(f"Circuit opened for {self.upstream} {self.name} after {self._failures} failures")
+                self._opened_at = time.monotonic()
+                self._set_state(CIRCUIT_OPEN)
+        _timeout.set(self.timeout(), upstream=self.upstream, endpoint=self.name)
+    
+    def release_probe(self) -> None:
+        """Let another probe through after a call that was neither a success nor a failure"""
+        with self._lock:
+            self._probing = False
+    
+    def _set_state(self, state: str) -> None:
+        self._state = state
+        _circuit_state.set(CIRCUIT_STATE_VALUES[state], upstream=self.upstream, endpoint=self.name)
+
+
+class Upstream:
+    """
+    Resilience policy shared by all calls to one upstream service: a retry
+    budget for the service plus a circuit breaker and adaptive timeout per
+    endpoint.
+    
+    Failed attempts are retried with exponential backoff and full jitter, or
+    after the upstream's Retry-After if it sent one. Attempts that may have
+    reached the upstream (timeouts, 5xx) are only retried for idempotent
+    calls.
+    """
+    
+    def __init__(self, name: str, max_timeout: float):
+        self.name = name
+        self.max_timeout = max_timeout
+        self.budget = RetryBudget(
+            ratio=settings.RESILIENCE_RETRY_BUDGET_RATIO,
+            min_retries=settings.RESILIENCE_RETRY_BUDGET_MIN,
+            window=settings.RESILIENCE_RETRY_BUDGET_WINDOW_SECONDS
+        )
+        self._lock = threading.Lock()
+        self._endpoints: Dict[str, Endpoint] = {}
+    
+    def endpoint(self, name: str) -> Endpoint:
+        with self._lock:
+            endpoint = self._endpoints.get(name)
+            if endpoint is None:
+                endpoint = Endpoint(self.name, name, self.max_timeout)
+                self._endpoints[name] = endpoint
+            return endpoint
+    
+    def circuit_states(self) -> Dict[str, str]:
+        """Circuit breaker state per endpoint"""
+        with self._lock:
+            return {name: endpoint.state for name, endpoint in self._endpoints.items()}
+    
+    def call(
+        self,
+        endpoint_name: str,
+        send: Callable[[float], T],
+        classify: Callable[[Optional[T], Optional[Exception]], Optional[Failure]],
+        idempotent: bool = True
+    ) -> T:
+        """
+        Call an upstream endpoint with retries, circuit breaking and an adaptive timeout.
+        
+        Args:
+            endpoint_name: Name of the endpoint, which selects its breaker and timeout
+            send: Makes one attempt, given the timeout in seconds
+            classify: Decides whether an attempt's result or exception is a failure
+            idempotent: Whether attempts that may have reached the upstream can be retried
+            
+        Returns:
+            The result of the last attempt (which may be a failed response
+            when retries are exhausted)
+            
+        Raises:
+            CircuitOpenError: If the endpoint's circuit breaker is open
+            Exception: The last attempt's exception, when retries are exhausted
+        """
+        endpoint = self.endpoint(endpoint_name)
+        self.budget.record_request()
+        attempt = 0
+        while True:
+            try:
+                endpoint.before_call()
+            except CircuitOpenError:
+                _rejections.inc(upstream=self.name, endpoint=endpoint_name)
+                raise
+                
+            start = time.monotonic()
+            result, error = None, None
+            try:
+                result = send(endpoint.timeout())
+            except Exception as e:
+                error = e
+            latency = time.monotonic() - start
+            
+            failure = classify(result, error)
+            if failure is None:
+                _requests.inc(upstream=self.name, endpoint=endpoint_name, outcome="success" if error is None else "error")
+                if error is None:
+                    endpoint.record_success(latency)
+                else:
+                    endpoint.release_probe()
+                    raise error
+                return result
+                
+            _requests.inc(upstream=self.name, endpoint=endpoint_name, outcome=failure.kind)
+            endpoint.record_failure(failure.kind)
+            delay = self._retry_delay(attempt, failure, idempotent)
+            if delay is None:
+                if error is not None:
+                    raise error
+                return result
+                
+            logger.warning(
+                f"{self.name} {endpoint_name} failed ({failure.kind}), "
+                f"retrying in {delay:.2f}s (attempt {attempt + 2}/{settings.RESILIENCE_MAX_ATTEMPTS})"
+            )
+            _retries.inc(upstream=self.name, endpoint=endpoint_name)
+            time.sleep(delay)
+            attempt += 1
+    
+    def _retry_delay(self, attempt: int, failure: Failure, idempotent: bool) -> Optional[float]:
+        """Seconds to wait before the next attempt, or None if the call shouldn't be retried"""
+        if attempt + 1 >= settings.RESILIENCE_MAX_ATTEMPTS:
+            return None
+        if not idempotent and failure.kind not in (CONNECT, THROTTLED):
+            return None
+        if failure.retry_after is not None:
+            if failure.retry_after > settings.RESILIENCE_MAX_RETRY_AFTER_SECONDS:
+                return None
+            delay = failure.retry_after
+        else:
+            cap = min(settings.RESILIENCE_BACKOFF_MAX_SECONDS, settings.RESILIENCE_BACKOFF_BASE_SECONDS * 2 ** attempt)
+            delay = random.uniform(0, cap)
+        if not self.budget.try_retry():
+            _budget_exhausted.inc(upstream=self.name)
+            logger.warning(f"Retry budget for {self.name} exhausted, not retrying")
+            return None
+        return delay
@@ -0,0 +1,561 @@
+import contextvars
+import logging
+import multiprocessing
+import os
+import shutil
+import threading
+import time
+from dataclasses import dataclass, field, replace
+from multiprocessing import resource_tracker
+from typing import Dict, List, Optional, Set, Tuple
+
+from core.config import settings
+from core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+RESOURCES = ("memory", "disk", "fds")
+
+# Weight of the newest job when a template's expected usage decays towards smaller jobs
+ESTIMATE_ALPHA = 0.2
+
+_reserved = metrics.gauge(
+    "job_resources_reserved", "Resources reserved by running jobs (bytes, or open files)", ("resource",)
+)
+_used = metrics.gauge(
+    "job_resources_used", "Resources used by running jobs (bytes, or open files)", ("resource",)
+)
+_waiting = metrics.gauge("job_resources_waiting_jobs", "Jobs waiting for resources to start")
+_exceeded = metrics.counter(
+    "job_resources_exceeded_total", "Jobs failed for using more than their share of a budget", ("resource",)
+)
+_reap_pending = metrics.gauge("workspace_reap_pending_bytes", "Bytes of workspaces waiting to be deleted")
+
+# Job that workspaces and checkpoints in the current context belong to (see ResourceManager.bind)
+_current_job: contextvars.ContextVar = contextvars.ContextVar("current_job", default=None)
+
+
+class ResourceBudgetExceeded(Exception):
+    """Raised when a job can't start within its wait timeout, or uses more than its share of a budget"""
+
+
+@dataclass
+class Usage:
+    """Resources of a job or a worker"""
+    memory: int = 0  # RSS in bytes, including child processes
+    disk: int = 0  # Workspace bytes
+    fds: int = 0  # Open file handles
+    
+    def get(self, resource: str) -> int:
+        return getattr(self, resource)
+
+
+@dataclass
+class _Job:
+    job_id: str
+    template_type: str
+    reserved: Usage
+    peak: Usage = field(default_factory=Usage)
+    workspaces: Dict[str, int] = field(default_factory=dict)  # Path -> bytes at the last measurement
+
+
+def current_rss() -> Optional[int]:
+    """Resident set size of this process in bytes, or None where /proc isn't available"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        return None
+
+
+def persistent_children() -> Set[int]:
+    """
+    PIDs of child processes that stay up between jobs: the render processes
+    and the resource tracker multiprocessing starts for them
+    """
+    pids = {process.pid for process in multiprocessing.active_children()}
+    tracker = getattr(resource_tracker._resource_tracker, "_pid", None)
+    if tracker is not None:
+        pids.add(tracker)
+    return pids
+
+
+def descendants_rss(persistent: Set[int] = frozenset()) -> Tuple[int, int]:
+    """
+    Resident set size of this process's descendants in bytes, 0 where /proc isn't available.
+    
+    Args:
+        persistent: PIDs of long-lived child processes, counted separately
+        
+    Returns:
+        RSS of the persistent processes, and of all other descendants (git, hooks)
+    """
+    try:
+        pids = [int(name) for name in os.listdir("/proc") if name.isdigit()]
+    except OSError:
+        return 0, 0
+    children: Dict[int, List[int]] = {}
+    for pid in pids:
+        try:
+            with open(f"/proc/{pid}/stat") as f:
+                stat = f.read()
+            # The command name may contain spaces and parentheses, so fields are counted from its end
+            ppid = int(stat[stat.rindex(")") + 2:].split()[1])
+        except (OSError, ValueError):
+            continue
+        children.setdefault(ppid, []).append(pid)
+        
+    persistent_total, total = 0, 0
+    stack = list(children.get(os.getpid(), []))
+    while stack:
+        pid = stack.pop()
+        stack.extend(children.get(pid, []))
+        try:
+            with open(f"/proc/{pid}/statm") as f:
+                rss = int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+        except (OSError, ValueError):
+            continue
+        if pid in persistent:
+            persistent_total += rss
+        else:
+            total += rss
+    return persistent_total, total
+
+
+def open_fds() -> Optional[int]:
+    """Open file handles of this process, or None where /proc isn't available"""
+    try:
+        return len(os.listdir("/proc/self/fd"))
+    except OSError:
+        return None
+
+
+def tree_bytes(path: str) -> int:
+    """Bytes of the files under path, without following symlinks"""
+    total = 0
+    stack = [path]
+    while stack:
+        try:
+            entries = list(os.scandir(stack.pop()))
+        except OSError:
+            continue
+        for entry in entries:
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+                else:
+                    total += entry.stat(follow_symlinks=False).st_size
+            except OSError:
+                continue
+    return total
+
+
+def budgets() -> Usage:
+    """Resources the jobs of one worker may use together"""
+    return Usage(
+        memory=settings.RESOURCE_MEMORY_BUDGET_MB * 1024 * 1024,
+        disk=settings.RESOURCE_DISK_BUDGET_MB * 1024 * 1024,
+        fds=settings.RESOURCE_FD_BUDGET
+    )
+
+
+def default_job_usage() -> Usage:
+    """Expected usage of a template until one of its jobs finished"""
+    return Usage(
+        memory=settings.RESOURCE_DEFAULT_JOB_MEMORY_MB * 1024 * 1024,
+        disk=settings.RESOURCE_DEFAULT_JOB_DISK_MB * 1024 * 1024,
+        fds=settings.RESOURCE_DEFAULT_JOB_FDS
+    )
+
+
+class ResourceManager:
+    """
+    Per-job resource accounting and budget-based admission for this worker.
+    
+    Before a job starts it reserves the memory, workspace disk and open files
+    its template is expected to need, and waits until that fits the remaining
+    budget (RESOURCE_*_BUDGET). A job that can't start within
+    RESOURCE_WAIT_TIMEOUT_SECONDS fails. One job is always let through when
+    nothing else runs, so a template larger than the budget still runs alone.
+    
+    While jobs run, a monitor thread samples the worker's RSS (including its
+    render processes, which stay up between jobs) and open files; growth
+    over the baseline, plus the RSS of the child processes jobs start (git,
+    hooks), is split between running jobs in proportion to their
+    reservations. The baseline is the idle worker, or under sustained load
+    the lowest sample of the last RESOURCE_BASELINE_WINDOW_SECONDS, so memory
+    Python keeps after jobs finish isn't charged to later jobs for long.
+    Workspaces are measured at every stage checkpoint.
+    A job's reservation grows with its measured peak, and a job that uses more
+    than RESOURCE_JOB_MAX_SHARE of a budget fails at its next checkpoint.
+    Expected usage per template follows the peaks of finished jobs: larger
+    peaks are adopted immediately, smaller ones are averaged in slowly.
+    
+    Workspaces are deleted by a background reaper in batches instead of at
+    the end of each job; their bytes count against the disk budget until they
+    are gone.
+    """
+    
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._jobs: Dict[str, _Job] = {}
+        self._estimates: Dict[str, Usage] = {}
+        self._baseline = Usage()
+        self._window = Usage()  # Lowest RSS and open files sampled in the current baseline window
+        self._window_ends = 0.0
+        self._usage = Usage()  # Growth over the baseline at the last sample
+        self._waiting = 0
+        self._reap_queue: List[Tuple[str, int]] = []
+        self._reaping_bytes = 0
+        self._reap_event = threading.Event()
+        self._stopping = threading.Event()
+        self._threads: List[threading.Thread] = []
+    
+    def start(self) -> None:
+        """Start the monitor and reaper threads"""
+        self._sample()
+        self._stopping.clear()
+        self._threads = [
+            threading.Thread(target=self._monitor, name="resource-monitor", daemon=True),
+            threading.Thread(target=self._reaper, name="workspace-reaper", daemon=True)
+        ]
+        for thread in self._threads:
+            thread.start()
+    
+    def stop(self) -> None:
+        """Stop the background threads, deleting the workspaces still queued"""
+        self._stopping.set()
+        self._reap_event.set()
+        for thread in self._threads:
+            thread.join(timeout=30)
+        self._threads = []
+        self._reap_batch(len(self._reap_queue))
+    
+    def estimate(self, template_type: str) -> Usage:
+        """Expected peak usage of a job"""
+        with self._condition:
+            estimate = self._estimates.get(template_type)
+        return estimate or default_job_usage()
+    
+    def job_capacity(self) -> int:
+        """
+        Jobs of typical size that fit this worker's budgets at once, at most
+        JOB_CONCURRENCY. The typical job uses the mean expected usage of the
+        templates seen so far (RESOURCE_DEFAULT_JOB_* before any finished).
+        At least one, since a job always starts when nothing else runs.
+        """
+        if not settings.RESOURCE_BUDGETS_ENABLED:
+            return settings.JOB_CONCURRENCY
+        with self._condition:
+            estimates = list(self._estimates.values()) or [default_job_usage()]
+        limits = budgets()
+        capacity = min(
+            limits.get(resource) * len(estimates) // max(1, sum(estimate.get(resource) for estimate in estimates))
+            for resource in RESOURCES
+        )
+        return max(1, min(settings.JOB_CONCURRENCY, capacity))
+    
+    def acquire(self, job_id: str, template_type: str) -> None:
+        """
+        Reserve resources for a job, waiting until they fit the remaining budget.
+        Blocks, so async callers run it on an executor and then bind() the job.
+        
+        Args:
+            job_id: Job ID
+            template_type: Template type, which determines the expected usage
+            
+        Raises:
+            ResourceBudgetExceeded: If the job couldn't start within RESOURCE_WAIT_TIMEOUT_SECONDS
+        """
+        need = self.estimate(template_type)
+        deadline = time.monotonic() + settings.RESOURCE_WAIT_TIMEOUT_SECONDS
+        with self._condition:
+            if not self._fits(need):
+                logger.info(f"Job {job_id} is waiting for resources")
+                self._waiting += 1
+                _waiting.set(self._waiting)
+                try:
+                    while not self._fits(need):
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            raise ResourceBudgetExceeded(
+                                f"Not enough memory, disk or file handles to start the job within "
+                                f"{settings.RESOURCE_WAIT_TIMEOUT_SECONDS}s"
+                            )
+                        self._condition.wait(min(remaining, settings.RESOURCE_SAMPLE_INTERVAL_SECONDS))
+                finally:
+                    self._waiting -= 1
+                    _waiting.set(self._waiting)
+            if not self._jobs:
+                self._set_baseline()
+            self._jobs[job_id] = _Job(job_id=job_id, template_type=template_type, reserved=replace(need))
+            self._publish()
+    
+    def bind(self, job_id: Optional[str]) -> contextvars.Token:
+        """
+        Make a job the current job of the calling context (thread or asyncio
+        task). Stage executor calls made from the context inherit it, and
+        track_workspace, checkpoint and reap apply to it.
+        
+        Returns:
+            Token to restore the previous current job with unbind()
+        """
+        return _current_job.set(job_id)
+    
+    def unbind(self, token: contextvars.Token) -> None:
+        _current_job.reset(token)
+    
+    def release(self, job_id: str) -> None:
+        """Return a job's reservation and learn its template's usage from the job's peak"""
+        with self._condition:
+            job = self._jobs.pop(job_id, None)
+            if job is None:
+                return
+            previous = self._estimates.get(job.template_type) or job.peak
+            self._estimates[job.template_type] = Usage(**{
+                resource: max(
+                    job.peak.get(resource),
+                    round((1 - ESTIMATE_ALPHA) * previous.get(resource) + ESTIMATE_ALPHA * job.peak.get(resource))
+                )
+                for resource in RESOURCES
+            })
+            self._publish()
+            self._condition.notify_all()
+        logger.info(
+            f"Job {job_id} peak usage: {job.peak.memory // (1024 * 1024)} MB memory, "
+            f"{job.peak.disk // (1024 * 1024)} MB disk, {job.peak.fds} open files"
+        )
+    
+    def track_workspace(self, path: str) -> None:
+        """Count a directory against the current job's disk usage until it is reaped"""
+        job_id = _current_job.get()
+        with self._condition:
+            job = self._jobs.get(job_id)
+            if job is not None:
+                job.workspaces[path] = 0
+        self.checkpoint()
+    
+    def checkpoint(self) -> None:
+        """
+        Measure the current job and enforce RESOURCE_JOB_MAX_SHARE. Called
+        between stages; does nothing outside a job.
+        
+        Raises:
+            ResourceBudgetExceeded: If the job uses more than its share of a budget
+        """
+        job_id = _current_job.get()
+        with self._condition:
+            job = self._jobs.get(job_id)
+            paths = list(job.workspaces) if job else []
+        if job is None:
+            return
+            
+        sizes = {path: tree_bytes(path) for path in paths}
+        self._sample()
+        limits = budgets()
+        with self._condition:
+            job.workspaces.update(sizes)
+            self._record(job, "disk", sum(job.workspaces.values()))
+            self._publish()
+            for resource in RESOURCES:
+                limit = settings.RESOURCE_JOB_MAX_SHARE * limits.get(resource)
+                if job.peak.get(resource) > limit:
+                    _exceeded.inc(resource=resource)
+                    raise ResourceBudgetExceeded(
+                        f"Job {job_id} exceeded its {resource} limit: "
+                        f"{job.peak.get(resource)} of {limit:.0f} {_unit(resource)}"
+                    )
+    
+    def reap(self, path: str) -> None:
+        """
+        Delete a workspace on the reaper thread; its bytes count against the
+        disk budget until it is deleted. Without a running reaper (e.g. in the
+        CLI) the workspace is deleted right away.
+        """
+        job_id = _current_job.get()
+        with self._condition:
+            job = self._jobs.get(job_id)
+            size = job.workspaces.pop(path, None) if job else None
+        if not self._threads:
+            _delete_workspace(path)
+            return
+        if size is None:
+            size = tree_bytes(path)
+            
+        with self._condition:
+            self._reap_queue.append((path, size))
+            self._reaping_bytes += size
+            _reap_pending.set(self._reaping_bytes)
+            urgent = len(self._reap_queue) >= settings.RESOURCE_REAPER_BATCH_SIZE or self._waiting
+        if urgent:
+            self._reap_event.set()
+    
+    def snapshot(self) -> dict:
+        """Reservations, usage and budgets of this worker"""
+        limits = budgets()
+        capacity = self.job_capacity()
+        with self._condition:
+            reserved = self._reserved()
+            return {
+                "running_jobs": len(self._jobs),
+                "waiting_jobs": self._waiting,
+                "job_capacity": capacity,
+                "reap_pending_bytes": self._reaping_bytes,
+                **{
+                    resource: {
+                        "reserved": reserved.get(resource),
+                        "used": self._usage.get(resource),
+                        "budget": limits.get(resource)
+                    }
+                    for resource in RESOURCES
+                }
+            }
+    
+    def _reserved(self) -> Usage:
+        """Reservations of running jobs, plus workspaces waiting to be deleted (caller holds the lock)"""
+        total = Usage(disk=self._reaping_bytes)
+        for job in self._jobs.values():
+            total.memory += job.reserved.memory
+            total.disk += job.reserved.disk
+            total.fds += job.reserved.fds
+        return total
+    
+    def _fits(self, need: Usage) -> bool:
+        """Whether a job fits next to the running ones (caller holds the lock)"""
+        if not settings.RESOURCE_BUDGETS_ENABLED or not self._jobs:
+            return True
+        reserved, limits = self._reserved(), budgets()
+        return all(
+            max(reserved.get(resource), self._usage.get(resource)) + need.get(resource) <= limits.get(resource)
+            for resource in RESOURCES
+        )
+    
+    def _record(self, job: _Job, resource: str, value: int) -> None:
+        """Raise a job's peak and reservation to a measurement (caller holds the lock)"""
+        if value > job.peak.get(resource):
+            setattr(job.peak, resource, value)
+        if value > job.reserved.get(resource):
+            setattr(job.reserved, resource, value)
+    
+    def _set_baseline(self, rss: Optional[int] = None) -> None:
+        """Take the idle worker's usage as the baseline (caller holds the lock, no jobs running)"""
+        if rss is None:
+            rss, _ = _worker_rss()
+        self._baseline = Usage(memory=rss, fds=open_fds() or 0)
+        self._window = replace(self._baseline)
+        self._window_ends = time.monotonic() + settings.RESOURCE_BASELINE_WINDOW_SECONDS
+        self._usage = Usage(disk=self._reaping_bytes)
+    
+    def _rebaseline(self, rss: int, fds: int) -> None:
+        """
+        Track the lowest sample of the window, and make it the baseline when
+        the window ends (caller holds the lock, jobs running). The lowest
+        sample still includes the jobs running at that moment, so jobs can be
+        undercounted slightly, but they're never charged for memory that
+        stayed with the worker after earlier jobs finished.
+        """
+        self._window = Usage(memory=min(self._window.memory, rss), fds=min(self._window.fds, fds))
+        now = time.monotonic()
+        if now >= self._window_ends:
+            self._baseline = self._window
+            self._window = Usage(memory=rss, fds=fds)
+            self._window_ends = now + settings.RESOURCE_BASELINE_WINDOW_SECONDS
+    
+    def _sample(self) -> None:
+        """Measure the worker and its child processes and split the growth between running jobs"""
+        (rss, children), fds = _worker_rss(), open_fds()
+        with self._condition:
+            if not self._jobs:
+                self._set_baseline(rss)
+                return
+            self._rebaseline(rss, fds or 0)
+            self._usage = Usage(
+                memory=max(0, rss - self._baseline.memory) + children,
+                disk=self._reaping_bytes + sum(sum(job.workspaces.values()) for job in self._jobs.values()),
+                fds=max(0, (fds or 0) - self._baseline.fds)
+            )
+            for resource in ("memory", "fds"):
+                weights = {job_id: max(1, job.reserved.get(resource)) for job_id, job in self._jobs.items()}
+                total_weight = sum(weights.values())
+                for job_id, job in self._jobs.items():
+                    self._record(job, resource, self._usage.get(resource) * weights[job_id] // total_weight)
+            self._publish()
+            if self._waiting:
+                self._condition.notify_all()
+    
+    def _publish(self) -> None:
+        """Export reservations and usage (caller holds the lock)"""
+        reserved = self._reserved()
+        for resource in RESOURCES:
+            _reserved.set(reserved.get(resource), resource=resource)
+            _used.set(self._usage.get(resource), resource=resource)
+    
+    def _monitor(self) -> None:
+        while not self._stopping.wait(settings.RESOURCE_SAMPLE_INTERVAL_SECONDS):
+            try:
+                self._sample()
+            except Exception as e:
+                logger.warning(f"Failed to sample resource usage: {e}")
+    
+    def _reaper(self) -> None:
+        while not self._stopping.is_set():
+            self._reap_event.wait(settings.RESOURCE_REAPER_INTERVAL_SECONDS)
+            self._reap_event.clear()
+            while self._reap_queue and not self._stopping.is_set():
+                self._reap_batch(settings.RESOURCE_REAPER_BATCH_SIZE)
+    
+    def _reap_batch(self, limit: int) -> None:
+        """Delete up to limit queued workspaces, then return their bytes to the disk budget"""
+        with self._condition:
+            batch, self._reap_queue = self._reap_queue[:limit], self._reap_queue[limit:]
+        if not batch:
+            return
+        for path, _ in batch:
+            _delete_workspace(path)
+        with self._condition:
+            self._reaping_bytes -= sum(size for _, size in batch)
+            _reap_pending.set(self._reaping_bytes)
+            self._condition.notify_all()
+
+
+def _worker_rss() -> Tuple[int, int]:
+    """
+    RSS of the worker in bytes, including the child processes that stay up
+    between jobs (their idle memory belongs in the baseline like the
+    worker's own), and RSS of its other descendants, which jobs start
+    """
+    persistent, children = descendants_rss(persistent_children())
+    return (current_rss() or 0) + persistent, children
+
+
+def _delete_workspace(path: str) -> None:
+    """
+    Delete a workspace, and the per-job directory a render created around it
+    (or the warm pool workspace it was claimed from) once that is empty
+    """
+    try:
+        shutil.rmtree(path)
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        logger.warning(f"Failed to clean up directory {path}: {e}")
+        return
+        
+    unique_dir = os.path.dirname(os.path.abspath(path))
+    output_root = os.path.dirname(os.path.abspath(settings.COOKIECUTTER_OUTPUT_DIR.format(uuid="x")))
+    per_job = "{uuid}" in settings.COOKIECUTTER_OUTPUT_DIR and os.path.dirname(unique_dir) == output_root
+    # Claimed warm pool workspaces live in WARM_POOL_DIR/<template>/<uuid>
+    warm = os.path.dirname(os.path.dirname(unique_dir)) == os.path.abspath(settings.WARM_POOL_DIR)
+    if per_job or warm:
+        try:
+            os.rmdir(unique_dir)
+        except OSError:
+            pass
+
+
+def _unit(resource: str) -> str:
+    return "open files" if resource == "fds" else "bytes"
+
+
+# Singleton instance
+resource_manager = ResourceManager()
@@ -0,0 +1,84 @@
+import logging
+import os
+import threading
+from typing import Callable, Dict, Optional, Tuple
+
+from clients import git, lfs
+from core.config import settings
+from core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+_bytes = metrics.gauge("shared_cache_bytes", "Bytes in a cache shared by all jobs and workers", ("cache",))
+
+
+class SharedCaches:
+    """
+    Keeps the caches shared by all jobs within their size limits.
+    
+    Every SHARED_CACHE_PRUNE_INTERVAL_SECONDS a background thread prunes the
+    git object cache (GIT_OBJECT_CACHE_MAX_MB) and the LFS object cache
+    (LFS_CACHE_MAX_MB), and records their sizes for the readiness check and
+    /metrics. The caches are shared by every worker process, so they are
+    reported rather than counted against a worker's disk budget, which only
+    covers job workspaces.
+    """
+    
+    def __init__(self):
+        self._sizes: Dict[str, int] = {}
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+    
+    def start(self) -> None:
+        """Start pruning the caches in the background"""
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, name="shared-cache-pruner", daemon=True)
+        self._thread.start()
+    
+    def stop(self) -> None:
+        """Stop the pruning thread"""
+        self._stopping.set()
+        if self._thread:
+            self._thread.join(timeout=30)
+            self._thread = None
+    
+    def snapshot(self) -> Dict[str, dict]:
+        """Size and limit of each cache in use, as of the last pruning"""
+        limits = {name: max_mb * 1024 * 1024 for name, (_, max_mb, _) in self._caches().items()}
+        return {
+            name: {"bytes": size, "limit": limits[name]}
+            for name, size in dict(self._sizes).items()
+            if name in limits
+        }
+    
+    def prune(self) -> None:
+        """Prune every cache in use and record its size"""
+        for name, (enabled, _, prune) in self._caches().items():
+            if not enabled:
+                continue
+            try:
+                self._sizes[name] = prune()
+                _bytes.set(self._sizes[name], cache=name)
+            except Exception as e:
+                logger.warning(f"Failed to prune the {name} cache: {e}")
+    
+    @staticmethod
+    def _caches() -> Dict[str, Tuple[bool, int, Callable[[], int]]]:
+        """Name -> (in use, size limit in MB, prune function returning the bytes left)"""
+        return {
+            "git_objects": (
+                bool(settings.GIT_OBJECT_CACHE_DIR), settings.GIT_OBJECT_CACHE_MAX_MB, git.prune_object_cache
+            ),
+            # Objects stay cached after LFS is turned off, so the cache is pruned whenever it exists
+            "lfs": (os.path.isdir(settings.LFS_CACHE_DIR), settings.LFS_CACHE_MAX_MB, lfs.prune_cache),
+        }
+    
+    def _run(self) -> None:
+        while True:
+            self.prune()
+            if self._stopping.wait(settings.SHARED_CACHE_PRUNE_INTERVAL_SECONDS):
+                return
+
+
+# Singleton instance
+shared_caches = SharedCaches()
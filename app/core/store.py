@@ -0,0 +1,232 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Iterator, List, Optional, Tuple
+
+from core.config import settings
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    job_id TEXT PRIMARY KEY,
+    template_type TEXT NOT NULL,
+    github_org TEXT NOT NULL,
+    github_repo TEXT NOT NULL,
+    status TEXT NOT NULL,
+    message TEXT,
+    repository_url TEXT,
+    worker_pid INTEGER,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL,
+    profile_path TEXT
+);
+CREATE INDEX IF NOT EXISTS jobs_created_at ON jobs (created_at);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status);
+CREATE INDEX IF NOT EXISTS jobs_finished_at ON jobs (finished_at);
+CREATE TABLE IF NOT EXISTS idempotency_keys (
+    key TEXT PRIMARY KEY,
+    job_id TEXT NOT NULL,
+    expires_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS cache_metadata (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL,
+    updated_at REAL NOT NULL
+);
+"""
+
+# Columns added after the first release, created on existing databases at startup
+MIGRATIONS = {
+    "jobs": {"profile_path": "TEXT"},
+}
+
+# Columns that update_job() may change
+JOB_FIELDS = ("status", "message", "repository_url", "worker_pid", "started_at", "finished_at", "profile_path")
+
+
+class StateStore:
+    """
+    State shared between worker processes, kept in a local SQLite database.
+    
+    The database runs in WAL mode so readers never block the writer, which
+    lets every gunicorn worker see the same jobs, idempotency keys and cache
+    metadata. Each thread uses its own connection.
+    """
+    
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._local = threading.local()
+        self._init_lock = threading.Lock()
+        self._initialized = False
+    
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+            connection = sqlite3.connect(self.db_path, timeout=10, isolation_level=None)
+            connection.row_factory = sqlite3.Row
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            with self._init_lock:
+                if not self._initialized:
+                    connection.executescript(SCHEMA)
+                    self._migrate(connection)
+                    self._initialized = True
+            self._local.connection = connection
+        return connection
+    
+    @staticmethod
+    def _migrate(connection: sqlite3.Connection) -> None:
+        """Add columns missing from databases created by older versions"""
+        for table, columns in MIGRATIONS.items():
+            existing = {row["name"] for row in connection.execute(f"PRAGMA table_info({table})")}
+            for name, column_type in columns.items():
+                if name not in existing:
+                    connection.execute(f"ALTER TABLE {table} ADD COLUMN {name} {column_type}")
+    
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        """Write transaction that takes the database lock up front to avoid upgrade deadlocks"""
+        connection = self._connection()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            yield connection
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+    
+    def create_job(
+        self,
+        job_id: str,
+        template_type: str,
+        github_org: str,
+        github_repo: str,
+        idempotency_key: str
+    ) -> Tuple[dict, bool]:
+        """
+        Record a new job unless the idempotency key or job ID was already used.
+        
+        Args:
+            job_id: Job ID
+            template_type: Template type
+            github_org: Target GitHub organization
+            github_repo: Target repository name
+            idempotency_key: Key identifying retries of the same request
+            
+        Returns:
+            The job and True if it was created, or the existing job and False
+            if this is a duplicate request
+        """
+        now = time.time()
+        with self._transaction() as connection:
+            connection.execute("DELETE FROM idempotency_keys WHERE expires_at < ?", (now,))
+            row = connection.execute(
+                "SELECT job_id FROM idempotency_keys WHERE key = ?", (idempotency_key,)
+            ).fetchone()
+            existing_id = row["job_id"] if row else job_id
+            existing = connection.execute("SELECT * FROM jobs WHERE job_id = ?", (existing_id,)).fetchone()
+            if existing:
+                return dict(existing), False
+                
+            connection.execute(
+                "INSERT INTO jobs (job_id, template_type, github_org, github_repo, status, created_at) "
+                "VALUES (?, ?, ?, ?, 'PENDING', ?)",
+                (job_id, template_type, github_org, github_repo, now)
+            )
+            connection.execute(
+                "INSERT OR REPLACE INTO idempotency_keys (key, job_id, expires_at) VALUES (?, ?, ?)",
+                (idempotency_key, job_id, now + settings.IDEMPOTENCY_TTL_SECONDS)
+            )
+            job = connection.execute("SELECT * FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+            return dict(job), True
+    
+    def update_job(self, job_id: str, **fields) -> None:
+        """
+        Update fields of a job.
+        
+        Args:
+            job_id: Job ID
+            **fields: Columns to set (see JOB_FIELDS)
+        """
+        unknown = set(fields) - set(JOB_FIELDS)
+        if unknown:
+            raise ValueError(f"Unknown job fields: {', '.join(sorted(unknown))}")
+        if not fields:
+            return
+            
+        assignments = ", ".join(f"{name} = ?" for name in fields)
+        with self._transaction() as connection:
+            connection.execute(
+                f"UPDATE jobs SET {assignments} WHERE job_id = ?",
+                (*fields.values(), job_id)
+            )
+    
+    def delete_job(self, job_id: str) -> None:
+        """Forget a job and its idempotency keys, so the same request can be sent again"""
+        with self._transaction() as connection:
+            connection.execute("DELETE FROM idempotency_keys WHERE job_id = ?", (job_id,))
+            connection.execute("DELETE FROM jobs WHERE job_id = ?", (job_id,))
+    
+    def get_job(self, job_id: str) -> Optional[dict]:
+        """Get a job by ID, or None if it doesn't exist"""
+        row = self._connection().execute("SELECT * FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        return dict(row) if row else None
+    
+    def list_jobs(self, status: Optional[str] = None, limit: int = 50) -> List[dict]:
+        """List the most recent jobs, optionally filtered by status"""
+        if status:
+            rows = self._connection().execute(
+                "SELECT * FROM jobs WHERE status = ? ORDER BY created_at DESC LIMIT ?", (status, limit)
+            ).fetchall()
+        else:
+            rows = self._connection().execute(
+                "SELECT * FROM jobs ORDER BY created_at DESC LIMIT ?", (limit,)
+            ).fetchall()
+        return [dict(row) for row in rows]
+    
+    def list_active_jobs(self, since: float) -> List[dict]:
+        """List PENDING and RUNNING jobs created after since, oldest first"""
+        rows = self._connection().execute(
+            "SELECT job_id, template_type, status, created_at, started_at FROM jobs "
+            "WHERE status IN ('PENDING', 'RUNNING') AND created_at >= ? ORDER BY created_at",
+            (since,)
+        ).fetchall()
+        return [dict(row) for row in rows]
+    
+    def recent_service_times(self, limit: int) -> List[Tuple[str, float]]:
+        """
+        Run times of the most recently finished jobs that ran.
+        
+        Returns:
+            (template_type, seconds) pairs, oldest first
+        """
+        rows = self._connection().execute(
+            "SELECT template_type, finished_at - started_at AS duration FROM jobs "
+            "WHERE finished_at IS NOT NULL AND started_at IS NOT NULL ORDER BY finished_at DESC LIMIT ?",
+            (limit,)
+        ).fetchall()
+        return [(row["template_type"], row["duration"]) for row in reversed(rows)]
+    
+    def get_cache_metadata(self, key: str) -> Optional[dict]:
+        """Get a cache metadata entry, or None if it doesn't exist"""
+        row = self._connection().execute("SELECT value FROM cache_metadata WHERE key = ?", (key,)).fetchone()
+        return json.loads(row["value"]) if row else None
+    
+    def set_cache_metadata(self, key: str, value: dict) -> None:
+        """Create or replace a cache metadata entry"""
+        with self._transaction() as connection:
+            connection.execute(
+                "INSERT OR REPLACE INTO cache_metadata (key, value, updated_at) VALUES (?, ?, ?)",
+                (key, json.dumps(value), time.time())
+            )
+
+
+# Singleton instance
+store = StateStore(settings.STATE_DB_PATH)
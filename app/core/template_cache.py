@@ -0,0 +1,180 @@
+import fcntl
+import hashlib
+import logging
+import os
+import shutil
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional, Tuple
+
+from cookiecutter.config import get_user_config
+from cookiecutter.environment import StrictEnvironment
+from cookiecutter.find import find_template
+from cookiecutter.generate import generate_context
+from cookiecutter.prompt import prompt_for_config
+from cookiecutter.vcs import clone
+
+from core.config import settings
+from core.store import store
+
+logger = logging.getLogger(__name__)
+
+
+class TemplateCache:
+    """
+    Local checkouts of cookiecutter templates.
+    
+    Each template URL is cloned once and reused until it is older than
+    TEMPLATE_CACHE_TTL_SECONDS, so callers that render a template repeatedly
+    don't pay for a clone every time. Clones are recorded in the shared state
+    store, so worker processes reuse each other's checkouts, and a lock file
+    per template makes sure only one worker clones a template at a time. A
+    refresh clones into a new directory; older clones are removed once they
+    can no longer be in use.
+    """
+    
+    def __init__(self, cache_dir: str):
+        self.cache_dir = cache_dir
+        self._lock = threading.Lock()
+        self._clone_locks: Dict[Tuple[str, Optional[str]], threading.Lock] = {}
+        self._checkouts: Dict[Tuple[str, Optional[str]], Tuple[str, float]] = {}
+    
+    def get(self, template_url: str, checkout: Optional[str] = None) -> str:
+        """
+        Get a local checkout of a template, cloning it on first use.
+        
+        Args:
+            template_url: Git URL or local path of the cookiecutter template
+            checkout: Optional branch, tag or commit to check out
+            
+        Returns:
+            Path to the local template directory
+        """
+        if os.path.isdir(template_url):
+            return os.path.abspath(template_url)
+            
+        key = (template_url, checkout)
+        with self._lock:
+            if self._is_fresh(key):
+                return self._checkouts[key][0]
+            clone_lock = self._clone_locks.setdefault(key, threading.Lock())
+            
+        digest = hashlib.sha1(f"{template_url}@{checkout or ''}".encode()).hexdigest()[:16]
+        template_root = os.path.abspath(os.path.join(self.cache_dir, digest))
+        
+        # Clone outside the global lock so different templates clone concurrently
+        with clone_lock, self._process_lock(template_root):
+            if self._is_fresh(key):
+                return self._checkouts[key][0]
+                
+            # Another worker process may already have a fresh clone, possibly made while we waited for the lock
+            metadata_key = f"template:{template_url}@{checkout or ''}"
+            metadata = store.get_cache_metadata(metadata_key)
+            if (
+                metadata
+                and time.time() - metadata["fetched_at"] < settings.TEMPLATE_CACHE_TTL_SECONDS
+                and os.path.isdir(metadata["repo_dir"])
+            ):
+                with self._lock:
+                    self._checkouts[key] = (metadata["repo_dir"], metadata["fetched_at"])
+                return metadata["repo_dir"]
+                
+            # Generations are named after their fetch time, made unique in case clocks or workers collide
+            fetched_at = time.time()
+            clone_to_dir = os.path.join(template_root, f"{int(fetched_at * 1000)}-{uuid.uuid4().hex[:12]}")
+            os.makedirs(clone_to_dir)
+            
+            logger.info(f"Cloning template {template_url} into cache")
+            repo_dir = clone(template_url, checkout=checkout, clone_to_dir=clone_to_dir, no_input=True)
+            
+            with self._lock:
+                self._checkouts[key] = (repo_dir, fetched_at)
+            store.set_cache_metadata(metadata_key, {"repo_dir": repo_dir, "fetched_at": fetched_at})
+            self._remove_old_generations(template_root, os.path.dirname(repo_dir))
+            return repo_dir
+    
+    def is_warm(self, template_url: str, checkout: Optional[str] = None) -> bool:
+        """Check whether a template is available locally and fresh"""
+        return os.path.isdir(template_url) or self._is_fresh((template_url, checkout))
+    
+    def _is_fresh(self, key: Tuple[str, Optional[str]]) -> bool:
+        checkout = self._checkouts.get(key)
+        return checkout is not None and time.time() - checkout[1] < settings.TEMPLATE_CACHE_TTL_SECONDS
+    
+    @staticmethod
+    @contextmanager
+    def _process_lock(template_root: str) -> Iterator[None]:
+        """Hold the template's lock file, shared by every worker process using the cache"""
+        os.makedirs(template_root, exist_ok=True)
+        with open(os.path.join(template_root, ".lock"), "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+    
+    @staticmethod
+    def _remove_old_generations(template_root: str, current: str) -> None:
+        """
+        Remove clones fetched more than two TTLs ago, except the current one.
+        Every worker hands out a checkout only while it is fresh, counting
+        from the fetch time recorded in the store, so no render started since
+        can still be using them. Runs under the template's lock file, so
+        workers never prune while another one clones.
+        """
+        cutoff_ms = (time.time() - 2 * settings.TEMPLATE_CACHE_TTL_SECONDS) * 1000
+        for name in os.listdir(template_root):
+            fetched_ms = name.split("-", 1)[0]
+            path = os.path.join(template_root, name)
+            if fetched_ms.isdigit() and int(fetched_ms) < cutoff_ms and path != current:
+                shutil.rmtree(path, ignore_errors=True)
+    
+    def invalidate(self, template_url: str, checkout: Optional[str] = None) -> None:
+        """Forget a cached checkout so the next get() clones it again"""
+        with self._lock:
+            self._checkouts.pop((template_url, checkout), None)
+
+
+def build_context(repo_dir: str, extra_context: dict) -> dict:
+    """
+    Build the cookiecutter context for a template the same way cookiecutter does
+    with no_input=True.
+    
+    Args:
+        repo_dir: Local template directory
+        extra_context: Variables supplied with the request
+        
+    Returns:
+        Cookiecutter context dict
+    """
+    config_dict = get_user_config()
+    context = generate_context(
+        context_file=os.path.join(repo_dir, 'cookiecutter.json'),
+        default_context=config_dict['default_context'],
+        extra_context=extra_context
+    )
+    context['cookiecutter'].update(prompt_for_config(context, no_input=True))
+    return context
+
+
+def render_project_dir_name(repo_dir: str, context: dict) -> str:
+    """
+    Render the name of the top-level project directory for a template.
+    
+    Args:
+        repo_dir: Local template directory
+        context: Context from build_context()
+        
+    Returns:
+        Rendered project directory name
+    """
+    template_dir = find_template(repo_dir)
+    envvars = context['cookiecutter'].get('_jinja2_env_vars', {})
+    env = StrictEnvironment(context=context, keep_trailing_newline=True, **envvars)
+    return env.from_string(os.path.basename(template_dir)).render(**context)
+
+
+# Singleton instance
+template_cache = TemplateCache(settings.TEMPLATE_CACHE_DIR)
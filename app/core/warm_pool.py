@@ -0,0 +1,326 @@
+import fnmatch
+import json
+import logging
+import math
+import os
+import shutil
+import threading
+import time
+import uuid
+from collections import deque
+from dataclasses import dataclass
+from typing import Deque, Dict, List, Optional
+
+from binaryornot.check import is_binary
+from cookiecutter.find import find_template
+from git import Repo
+
+from core.config import settings
+from core.hooks import HookError, hook_runner
+from core.registry import template_registry
+from core.render import render_template
+from core.template_cache import build_context, render_project_dir_name, template_cache
+
+logger = logging.getLogger(__name__)
+
+# Directory inside a workspace holding the pre-materialized static files
+SKELETON_DIR_NAME = ".skeleton"
+
+# Anything containing one of these is rendered by Jinja and depends on request variables
+JINJA_MARKERS = ("{{", "{%", "{#")
+
+# Template options that change how files are rendered; static detection can't be trusted with them
+UNSUPPORTED_TEMPLATE_OPTIONS = ("_jinja2_env_vars", "_new_lines", "template", "templates")
+
+
+@dataclass
+class Workspace:
+    """A pre-materialized output directory waiting to be claimed"""
+    root: str
+    skeleton: str
+    repo_dir: str  # Template directory the skeleton was built from
+    created_at: float
+
+
+def _is_templated(text: str) -> bool:
+    return any(marker in text for marker in JINJA_MARKERS)
+
+
+class WarmPool:
+    """
+    Pool of pre-materialized workspaces for a single template type.
+    
+    Each workspace already contains the template files whose path and content
+    don't depend on request variables, and optionally has them staged in git so
+    their blobs are precomputed. Claiming a workspace only renders the
+    variable-dependent files. The pool size follows the recent arrival rate and
+    is refilled on a background thread.
+    """
+    
+    def __init__(self, template_type: str):
+        self.template_type = template_type
+        self._lock = threading.Lock()
+        self._ready: Deque[Workspace] = deque()
+        self._arrivals: Deque[float] = deque()
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._repo_dir: Optional[str] = None
+        self._template_dir: Optional[str] = None
+        self._static_files: Optional[List[str]] = None
+    
+    @property
+    def size(self) -> int:
+        """Number of workspaces ready to be claimed"""
+        return len(self._ready)
+    
+    def start(self) -> None:
+        """Start the background refill thread"""
+        self._thread = threading.Thread(
+            target=self._run,
+            name=f"warm-pool-{self.template_type}",
+            daemon=True
+        )
+        self._thread.start()
+    
+    def stop(self) -> None:
+        """Stop refilling and remove all unclaimed workspaces"""
+        self._stopping.set()
+        self._wakeup.set()
+        if self._thread:
+            self._thread.join(timeout=30)
+        with self._lock:
+            workspaces = list(self._ready)
+            self._ready.clear()
+        for workspace in workspaces:
+            shutil.rmtree(workspace.root, ignore_errors=True)
+    
+    def target_size(self) -> int:
+        """
+        Number of workspaces to keep ready, based on the recent arrival rate.
+        
+        Returns:
+            Enough workspaces to cover WARM_POOL_HORIZON_SECONDS of demand,
+            clamped to [WARM_POOL_MIN_SIZE, WARM_POOL_MAX_SIZE]
+        """
+        window = settings.WARM_POOL_RATE_WINDOW_SECONDS
+        now = time.monotonic()
+        with self._lock:
+            while self._arrivals and now - self._arrivals[0] > window:
+                self._arrivals.popleft()
+            arrivals = len(self._arrivals)
+            
+        target = math.ceil(arrivals / window * settings.WARM_POOL_HORIZON_SECONDS)
+        return max(settings.WARM_POOL_MIN_SIZE, min(settings.WARM_POOL_MAX_SIZE, target))
+    
+    def claim(self, props: dict) -> Optional[str]:
+        """
+        Claim a workspace and render the variable-dependent files into it.
+        
+        Args:
+            props: Template-specific properties
+            
+        Returns:
+            Path to the generated project directory, or None if no workspace
+            was available and the caller should render from scratch
+            
+        Raises:
+            HookError: If a template hook failed
+        """
+        with self._lock:
+            self._arrivals.append(time.monotonic())
+            workspace = self._ready.popleft() if self._ready else None
+        self._wakeup.set()
+        
+        if workspace is None:
+            logger.info(f"Warm pool for {self.template_type} is empty, rendering from scratch")
+            return None
+            
+        try:
+            entry = template_registry.get(self.template_type)
+            context = build_context(workspace.repo_dir, props)
+            project_dir = os.path.join(workspace.root, render_project_dir_name(workspace.repo_dir, context))
+            os.rename(workspace.skeleton, project_dir)
+            
+            logger.info(f"Rendering {self.template_type} into warm workspace {workspace.root}")
+            return render_template(
+                entry.url,
+                props,
+                template_dir=workspace.repo_dir,
+                accept_hooks=entry.hooks,
+                output_dir=workspace.root,
+                overwrite_if_exists=True,
+                skip_if_file_exists=True
+            )
+        except HookError:
+            # The cold path would run the render and every hook again, only to fail the same way
+            shutil.rmtree(workspace.root, ignore_errors=True)
+            raise
+        except Exception as e:
+            # The cold path will surface the real error if the render itself is broken
+            logger.warning(f"Failed to render into warm workspace for {self.template_type}: {e}")
+            shutil.rmtree(workspace.root, ignore_errors=True)
+            return None
+    
+    def _run(self) -> None:
+        while not self._stopping.is_set():
+            try:
+                # Re-prepare whenever the template cache has fetched a newer checkout
+                # or the registry entry has changed
+                entry = template_registry.get(self.template_type)
+                if entry is None or entry.backend != "cookiecutter":
+                    raise ValueError("not a cookiecutter template in the template registry")
+                repo_dir = template_cache.get(entry.url, entry.ref)
+                if entry.directory:
+                    repo_dir = os.path.join(repo_dir, entry.directory)
+                if repo_dir != self._repo_dir:
+                    self._prepare(repo_dir)
+                self._refill()
+            except Exception as e:
+                logger.warning(f"Failed to refill warm pool for {self.template_type}: {e}")
+            self._wakeup.wait(timeout=settings.WARM_POOL_REFILL_INTERVAL_SECONDS)
+            self._wakeup.clear()
+    
+    def _prepare(self, repo_dir: str) -> None:
+        """Work out which files of a template checkout are static and drop workspaces built from older ones"""
+        with open(os.path.join(repo_dir, 'cookiecutter.json'), encoding='utf-8') as f:
+            raw_context = json.load(f)
+        unsupported = [option for option in UNSUPPORTED_TEMPLATE_OPTIONS if option in raw_context]
+        if unsupported:
+            raise ValueError(f"template uses unsupported options: {', '.join(unsupported)}")
+        # A warm workspace already holds the static files, but pre_gen_project hooks must see an empty project
+        entry = template_registry.get(self.template_type)
+        if entry.hooks and hook_runner.has_hooks(repo_dir, "pre_gen_project"):
+            raise ValueError("template has pre_gen_project hooks")
+            
+        self._template_dir = str(find_template(repo_dir))
+        self._static_files = self._scan_static_files(raw_context.get('_copy_without_render', []))
+        self._repo_dir = repo_dir
+        
+        with self._lock:
+            stale = list(self._ready)
+            self._ready.clear()
+        for workspace in stale:
+            shutil.rmtree(workspace.root, ignore_errors=True)
+        logger.info(
+            f"Warm pool for {self.template_type} ready: "
+            f"{len(self._static_files)} static files pre-materialized per workspace"
+        )
+    
+    def _scan_static_files(self, copy_without_render: List[str]) -> List[str]:
+        """
+        Find template files whose path and content don't depend on variables.
+        
+        Files matching _copy_without_render are left to cookiecutter, which
+        copies them unconditionally.
+        """
+        static_files = []
+        for root, dirs, files in os.walk(self._template_dir):
+            rel_root = os.path.relpath(root, self._template_dir)
+            if _is_templated(rel_root):
+                dirs[:] = []
+                continue
+                
+            for name in files:
+                rel_path = os.path.normpath(os.path.join(rel_root, name))
+                if _is_templated(name):
+                    continue
+                if any(fnmatch.fnmatch(rel_path, pattern) for pattern in copy_without_render):
+                    continue
+                    
+                path = os.path.join(root, name)
+                if not is_binary(path):
+                    try:
+                        with open(path, encoding='utf-8') as f:
+                            if _is_templated(f.read()):
+                                continue
+                    except UnicodeDecodeError:
+                        continue
+                static_files.append(rel_path)
+        return static_files
+    
+    def _refill(self) -> None:
+        target = self.target_size()
+        while not self._stopping.is_set() and self.size < target:
+            workspace = self._build_workspace()
+            with self._lock:
+                self._ready.append(workspace)
+                
+        # Drop the oldest workspaces when demand has fallen
+        with self._lock:
+            surplus = []
+            while len(self._ready) > target:
+                surplus.append(self._ready.popleft())
+        for workspace in surplus:
+            shutil.rmtree(workspace.root, ignore_errors=True)
+    
+    def _build_workspace(self) -> Workspace:
+        root = os.path.abspath(os.path.join(settings.WARM_POOL_DIR, self.template_type, str(uuid.uuid4())))
+        skeleton = os.path.join(root, SKELETON_DIR_NAME)
+        os.makedirs(skeleton)
+        
+        for rel_path in self._static_files:
+            target = os.path.join(skeleton, rel_path)
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            shutil.copy(os.path.join(self._template_dir, rel_path), target)
+            
+        if settings.WARM_POOL_PRECOMPUTE_BLOBS:
+            # Stage static files now so their blobs and index entries are ready at upload time
+            repo = Repo.init(skeleton)
+            repo.git.add('.')
+            
+        return Workspace(root=root, skeleton=skeleton, repo_dir=self._repo_dir, created_at=time.time())
+
+
+class WarmPoolManager:
+    """Owns one WarmPool per configured template type"""
+    
+    def __init__(self):
+        self._pools: Dict[str, WarmPool] = {}
+    
+    def start(self) -> None:
+        """Start pools for WARM_POOL_TEMPLATES if the warm pool is enabled"""
+        if not settings.WARM_POOL_ENABLED:
+            return
+            
+        for template_type in settings.WARM_POOL_TEMPLATES:
+            entry = template_registry.get(template_type)
+            if entry is None:
+                logger.warning(f"Warm pool template '{template_type}' is not in the template registry")
+                continue
+            template_type = entry.name
+            pool = WarmPool(template_type)
+            pool.start()
+            self._pools[template_type] = pool
+            logger.info(f"Started warm pool for {template_type}")
+    
+    def stop(self) -> None:
+        """Stop all pools and remove their workspaces"""
+        for pool in self._pools.values():
+            pool.stop()
+        self._pools.clear()
+    
+    def sizes(self) -> Dict[str, int]:
+        """Workspaces ready to be claimed, per template type"""
+        return {template_type: pool.size for template_type, pool in self._pools.items()}
+    
+    def claim(self, template_type: str, props: dict) -> Optional[str]:
+        """
+        Render a project using a pre-materialized workspace if one is available.
+        
+        Args:
+            template_type: Template type the request is for
+            props: Template-specific properties
+            
+        Returns:
+            Path to the generated project directory, or None if the template
+            has no pool or the pool is empty
+        """
+        pool = self._pools.get(template_type)
+        if pool is None:
+            return None
+        return pool.claim(props)
+
+
+# Singleton instance
+warm_pools = WarmPoolManager()
@@ -0,0 +1,33 @@
+"""
+Gunicorn configuration for multi-worker deployments.
+
+Runs uvicorn workers; job state, idempotency keys and cache metadata are
+shared between workers through the state store (see core/store.py).
+
+Every worker also starts its own pool of render processes for cookiecutter
+(see core/executors.py). RENDER_PROCESSES is the total for the host and is
+split between the workers, at least one each, so with the defaults (both
+the CPU count) every worker gets one render process rather than every
+worker getting one per CPU. Workers beyond RENDER_PROCESSES still get one,
+so keep WEB_CONCURRENCY at or below it.
+
+Usage:
+    gunicorn main:app -c gunicorn_conf.py
+"""
+import multiprocessing
+import os
+
+from core.config import settings
+
+bind = os.environ.get("BIND", "0.0.0.0:8000")
+workers = settings.WEB_CONCURRENCY or multiprocessing.cpu_count()
+worker_class = "uvicorn.workers.UvicornWorker"
+
+# Give in-flight background jobs time to finish on restart
+graceful_timeout = 120
+timeout = 120
+keepalive = 5
+
+accesslog = "-"
+errorlog = "-"
+loglevel = "info"
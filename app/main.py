@@ -2,9 +2,18 @@ import uvicorn
 import logging
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 
+from api.endpoints import health, jobs
 from api.endpoints.service import router
 from core.config import settings
+from core.executors import event_loop_watchdog, executors
+from core.health import health_monitor
+from core.metrics import metrics
+from core.registry import template_registry
+from core.resources import resource_manager
+from core.shared_caches import shared_caches
+from core.warm_pool import warm_pools
 
 # Configure logging
 logging.basicConfig(
@@ -34,6 +43,8 @@ app.add_middleware(
 
 # Include API router
 app.include_router(router, prefix=settings.API_STR, tags=["service"])
+app.include_router(jobs.router, prefix=settings.API_STR, tags=["jobs"])
+app.include_router(health.router, prefix=settings.API_STR, tags=["health"])
 
 
 @app.on_event("startup")
@@ -42,6 +53,24 @@ async def startup_event():
     logger.info(f"Starting {settings.PROJECT_NAME}")
     logger.info(f"API documentation available at {settings.API_STR}/docs")
     logger.info(f"Webhook endpoint: {settings.API_STR}/service")
+    template_registry.start()
+    warm_pools.start()
+    resource_manager.start()
+    shared_caches.start()
+    health_monitor.start()
+    event_loop_watchdog.start()
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Stop background workers"""
+    event_loop_watchdog.stop()
+    health_monitor.stop()
+    shared_caches.stop()
+    resource_manager.stop()
+    warm_pools.stop()
+    template_registry.stop()
+    executors.shutdown()
 
 
 @app.get("/")
@@ -52,10 +81,19 @@ async def root():
         "version": "1.0.0",
         "status": "running",
         "docs": f"{settings.API_STR}/docs",
-        "webhook_endpoint": f"{settings.API_STR}/service"
+        "webhook_endpoint": f"{settings.API_STR}/service",
+        "jobs_endpoint": f"{settings.API_STR}/jobs",
+        "metrics_endpoint": "/metrics",
+        "readiness_endpoint": f"{settings.API_STR}/health/ready"
     }
 
 
+@app.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+async def metrics_endpoint():
+    """Metrics of this worker process in the Prometheus text format"""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+
 if __name__ == "__main__":
     uvicorn.run(
         "main:app",
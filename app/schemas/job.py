@@ -0,0 +1,39 @@
+from datetime import datetime, timezone
+from typing import Optional
+from pydantic import BaseModel, Field
+
+
+def _timestamp(value: Optional[float]) -> Optional[datetime]:
+    return datetime.fromtimestamp(value, tz=timezone.utc) if value is not None else None
+
+
+class JobResponse(BaseModel):
+    """State of a service creation job"""
+    job_id: str = Field(..., description="Job ID (the DX workflow run ID)")
+    status: str = Field(..., description="Job status (PENDING, RUNNING, SUCCEEDED, PARTIAL, FAILED)")
+    template_type: str = Field(..., description="Template type")
+    github_organization: str = Field(..., description="Target GitHub organization")
+    github_repository: str = Field(..., description="Target repository name")
+    message: Optional[str] = Field(None, description="Result or error message")
+    repository_url: Optional[str] = Field(None, description="URL of created repository")
+    created_at: datetime = Field(..., description="When the job was queued")
+    started_at: Optional[datetime] = Field(None, description="When a worker started the job")
+    finished_at: Optional[datetime] = Field(None, description="When the job finished")
+    profile_available: bool = Field(False, description="Whether a profile can be downloaded from /jobs/{job_id}/profile")
+    
+    @classmethod
+    def from_record(cls, job: dict) -> "JobResponse":
+        """Build a response from a job record in the state store"""
+        return cls(
+            job_id=job["job_id"],
+            status=job["status"],
+            template_type=job["template_type"],
+            github_organization=job["github_org"],
+            github_repository=job["github_repo"],
+            message=job["message"],
+            repository_url=job["repository_url"],
+            created_at=_timestamp(job["created_at"]),
+            started_at=_timestamp(job["started_at"]),
+            finished_at=_timestamp(job["finished_at"]),
+            profile_available=bool(job["profile_path"])
+        )
@@ -1,5 +1,5 @@
-from typing import Optional
-from pydantic import BaseModel, Field
+from typing import Literal, Optional
+from pydantic import BaseModel, ConfigDict, Field
 from datetime import datetime
 
 
@@ -8,30 +8,22 @@ class DXWorkflowRequest(BaseModel):
     Schema for incoming workflow requests from DX self-service platform.
     
     This matches the structure that DX sends when dispatching a workflow
-    to an external HTTP endpoint.
+    to an external HTTP endpoint. Template-specific properties (project_name,
+    description, ...) are sent as additional top-level fields.
     """
     
+    model_config = ConfigDict(extra="allow")
+    
     # DX workflow run ID - critical for reporting back status
     dx_workflow_run_id: str = Field(..., description="DX workflow run ID for status updates")
     
     # Template configuration
-    template_type: str = Field(..., description="Type of template (django, go, cpp, python, custom)")
+    template_type: str = Field(..., description="Template type from the template registry, or custom")
     
     # GitHub configuration
     github_organization: str = Field(..., description="Target GitHub organization")
     github_repository: str = Field(..., description="Target repository name")
     
-    # Template-specific properties (flexible dict for different template needs)
-    # These come from DX workflow parameters
-    project_name: Optional[str] = Field(None, description="Project name")
-    description: Optional[str] = Field(None, description="Project description")
-    app_name: Optional[str] = Field(None, description="Application name (for Go templates)")
-    project_short_description: Optional[str] = Field(None, description="Short description")
-    project_slug: Optional[str] = Field(None, description="Project slug (for Python packages)")
-    author_name: Optional[str] = Field(None, description="Author name")
-    full_name: Optional[str] = Field(None, description="Full name")
-    email: Optional[str] = Field(None, description="Email address")
-    
     # Optional custom template URL (for custom templates)
     cookiecutter_url: Optional[str] = Field(None, description="Custom cookiecutter template URL")
     
@@ -39,26 +31,22 @@ class DXWorkflowRequest(BaseModel):
     entity_identifier: Optional[str] = Field(None, description="DX entity identifier")
     entity_name: Optional[str] = Field(None, description="DX entity name")
     
+    # Urgent requests bypass load shedding (also settable with the X-Priority header)
+    priority: Literal["normal", "high"] = Field("normal", description="Request priority")
+    
+    # Optional CPU/allocation profiling of this job (requires PROFILING_ENABLED)
+    profile: bool = Field(False, description="Profile this job run")
+    
     def get_properties_dict(self) -> dict:
-        """Extract all non-None properties into a dict for cookiecutter"""
-        props = {}
-        if self.project_name:
-            props['project_name'] = self.project_name
-        if self.description:
-            props['description'] = self.description
-        if self.app_name:
-            props['app_name'] = self.app_name
-        if self.project_short_description:
-            props['project_short_description'] = self.project_short_description
-        if self.project_slug:
-            props['project_slug'] = self.project_slug
-        if self.author_name:
-            props['author_name'] = self.author_name
-        if self.full_name:
-            props['full_name'] = self.full_name
-        if self.email:
-            props['email'] = self.email
-        return props
+        """
+        Extract the template-specific properties for cookiecutter: every field
+        not declared above, as sent by the DX workflow parameters. They are
+        validated against the template's schema in the template registry.
+        """
+        return {
+            name: value for name, value in (self.model_extra or {}).items()
+            if value is not None and value != ""
+        }
 
 
 class WorkflowResponse(BaseModel):
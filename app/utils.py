@@ -1,4 +1,8 @@
+import time
 import uuid
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional
+
 from core.config import settings
 
 
@@ -6,3 +10,14 @@ def get_unique_output_dir() -> str:
     """Generate a unique output directory path for cookiecutter"""
     unique_id = str(uuid.uuid4())
     return settings.COOKIECUTTER_OUTPUT_DIR.format(uuid=unique_id)
+
+
+@contextmanager
+def timed(timings: Optional[Dict[str, float]], stage: str) -> Iterator[None]:
+    """Add the wall time of the block to timings[stage] (seconds), if timings is given"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        if timings is not None:
+            timings[stage] = timings.get(stage, 0.0) + time.perf_counter() - start
@@ -0,0 +1,161 @@
+"""
+Exercise the resilience layer (retries, retry budgets, circuit breakers and
+adaptive timeouts) against fault-injecting stand-ins for DX and GitHub.
+
+Both clients run against local fake servers (see fake_dx.py and
+fake_github.py), so no token or network access is needed. The run goes
+through phases, changing the injected faults between them:
+
+    healthy     no faults; the adaptive timeouts settle near the real latency
+    degraded    a share of requests fail with 503 and retries absorb them
+    throttled   a share of requests get 429 with Retry-After
+    outage      every request hangs; timeouts fail fast and breakers open
+    recovery    faults removed; after RESILIENCE_RESET_SECONDS one probe goes through
+                and closes the breaker, concurrent calls are rejected until it returns
+    recovered   the same calls once the breakers are closed
+
+For each phase it prints successes, latency percentiles, retries and the
+circuit states, followed by the /metrics output for the upstream metrics.
+
+Usage:
+    python examples/bench_resilience.py -n 40 --concurrency 4
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+EXAMPLES_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(EXAMPLES_DIR))
+sys.path.insert(0, str(EXAMPLES_DIR.parent / "app"))
+
+from fake_dx import FakeDX  # noqa: E402
+from fake_github import USER_LOGIN, FakeGitHub  # noqa: E402
+
+REPO = f"{USER_LOGIN}/bench-resilience"
+
+
+def percentile(values: list, p: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p))]
+
+
+def run_phase(name: str, calls: int, concurrency: int, dx_client, github) -> None:
+    from core.metrics import metrics
+
+    retries = metrics.counter("upstream_retries_total", "", ("upstream", "endpoint"))
+    retries_before = {
+        "dx": retries.value(upstream="dx", endpoint="workflowRuns.changeStatus"),
+        "github": retries.value(upstream="github", endpoint="GET /repos/:owner/:repo"),
+    }
+
+    def call_dx(_):
+        start = time.perf_counter()
+        ok = dx_client.change_status("bench-run", "SUCCEEDED")
+        return ok, time.perf_counter() - start
+
+    def call_github(_):
+        start = time.perf_counter()
+        try:
+            github.g.get_repo(REPO)
+            ok = True
+        except Exception:
+            ok = False
+        return ok, time.perf_counter() - start
+
+    print(f"\n== {name}")
+    for upstream, func, endpoint in (
+        ("dx", call_dx, "workflowRuns.changeStatus"),
+        ("github", call_github, "GET /repos/:owner/:repo"),
+    ):
+        started = time.perf_counter()
+        with ThreadPoolExecutor(concurrency) as executor:
+            results = list(executor.map(func, range(calls)))
+        elapsed = time.perf_counter() - started
+        latencies = [latency for _, latency in results]
+        succeeded = sum(1 for ok, _ in results if ok)
+        retried = retries.value(upstream=upstream, endpoint=endpoint) - retries_before[upstream]
+        client_upstream = dx_client.upstream if upstream == "dx" else github.github_upstream
+        print(
+            f"  {upstream:<7} ok {succeeded:>3}/{calls}  "
+            f"p50 {statistics.median(latencies) * 1000:7.0f}ms  "
+            f"p95 {percentile(latencies, 0.95) * 1000:7.0f}ms  "
+            f"max {max(latencies) * 1000:7.0f}ms  "
+            f"retries {retried:>3.0f}  wall {elapsed:5.1f}s  "
+            f"timeout {client_upstream.endpoint(endpoint).timeout():.2f}s  "
+            f"circuit {client_upstream.circuit_states().get(endpoint)}"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-n", "--calls", type=int, default=40, help="Calls per upstream and phase")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--hang-seconds", type=float, default=5.0, help="How long requests hang during the outage")
+    args = parser.parse_args()
+
+    git_root = tempfile.mkdtemp(prefix="bench-resilience-")
+    fake_github = FakeGitHub(git_root=git_root)
+    fake_github.add_repo(REPO)
+    fake_dx = FakeDX()
+    for server in (fake_github, fake_dx):
+        server.faults.latency = 0.01
+        server.faults.hang_seconds = args.hang_seconds
+        server.start()
+
+    # Settings are read at import time, so configure them before importing the clients
+    os.environ.update({
+        "GH_API_URL": fake_github.url,
+        "GH_ACCESS_TOKEN": "fake",
+        "GH_SECONDS_BETWEEN_REQUESTS": "0",
+        "GH_SECONDS_BETWEEN_WRITES": "0",
+        "DX_API_URL": fake_dx.url,
+        "DX_API_KEY": "fake",
+        "RESILIENCE_MIN_TIMEOUT_SECONDS": os.environ.get("RESILIENCE_MIN_TIMEOUT_SECONDS", "0.5"),
+        "RESILIENCE_RESET_SECONDS": os.environ.get("RESILIENCE_RESET_SECONDS", "3"),
+    })
+    from clients import github
+    from clients.self_service import dx_client
+    from core.config import settings
+    from core.metrics import metrics
+
+    phases = [
+        ("healthy", {}),
+        ("degraded: 30% 503s", {"error_rate": 0.3}),
+        ("throttled: 30% 429s, Retry-After 0.2s", {"throttle_rate": 0.3, "retry_after": 0.2}),
+        (f"outage: every request hangs {args.hang_seconds:g}s", {"hang_rate": 1.0}),
+    ]
+    for name, faults in phases:
+        for server in (fake_github, fake_dx):
+            server.faults.reset()
+            server.faults.latency = 0.01
+            for key, value in faults.items():
+                setattr(server.faults, key, value)
+        run_phase(name, args.calls, args.concurrency, dx_client, github)
+
+    for server in (fake_github, fake_dx):
+        server.faults.reset()
+    print(f"\n(waiting {settings.RESILIENCE_RESET_SECONDS:g}s for the breakers to half-open)")
+    time.sleep(settings.RESILIENCE_RESET_SECONDS)
+    run_phase("recovery", args.calls, args.concurrency, dx_client, github)
+    run_phase("recovered", args.calls, args.concurrency, dx_client, github)
+
+    print(f"\nDX calls that reached the server: {len(fake_dx.calls)}")
+    print(f"Injected faults: dx {fake_dx.faults.injected}, github {fake_github.faults.injected}")
+    print("\nUpstream metrics:")
+    for line in metrics.render().splitlines():
+        if line.startswith("upstream_") and ("changeStatus" in line or "/repos/:owner/:repo\"" in line or "endpoint" not in line):
+            print(f"  {line}")
+
+    for server in (fake_github, fake_dx):
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""
+Compare the cookiecutter backend with the GitHub template repository backend.
+
+Both backends run against a fake GitHub server (see fake_github.py), so no
+token or network access is needed. The same synthetic template is used for
+both: `--files` files, of which `--templated-percent` contain placeholders.
+
+PyGithub's client-side throttling (one write per second by default) is
+disabled unless --github-throttle is passed, so the numbers reflect the work
+each backend does rather than the throttle. With throttling on, the template
+repository backend pays for four writes per repository against one for the
+cookiecutter backend.
+
+The first repository per backend and size is reported separately: for the
+template repository backend it includes the one-off scan of the template for
+placeholders.
+
+Usage:
+    python examples/bench_template_backends.py --files 50 500 2000 -n 10
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+EXAMPLES_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(EXAMPLES_DIR))
+sys.path.insert(0, str(EXAMPLES_DIR.parent / "app"))
+
+from fake_github import USER_LOGIN, FakeGitHub  # noqa: E402
+
+TEMPLATE_OWNER = "bench-templates"
+
+
+def make_template_files(file_count: int, templated_percent: int) -> dict:
+    """Synthetic project files, some of which use template variables"""
+    templated_every = max(1, round(100 / templated_percent)) if templated_percent else None
+    files = {}
+    for i in range(file_count):
+        line = f"line {i} of a generated project file\n"
+        if templated_every and i % templated_every == 0:
+            line = "project: {{ cookiecutter.project_name }}\n"
+        files[f"src/module_{i // 50}/file_{i}.txt"] = (line * 40).encode()
+    return files
+
+
+def write_cookiecutter_template(root: Path, files: dict) -> str:
+    """Write files as a cookiecutter template and return its path"""
+    root.mkdir(parents=True, exist_ok=True)
+    (root / "cookiecutter.json").write_text('{"project_name": "bench", "project_slug": "bench"}')
+    project_dir = root / "{{cookiecutter.project_slug}}"
+    for path, content in files.items():
+        target = project_dir / path
+        target.parent.mkdir(parents=True, exist_ok=True)
+        target.write_bytes(content)
+    return str(root)
+
+
+def summarize(name: str, timings: list) -> str:
+    timings = sorted(timings)
+    p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+    return (
+        f"  {name:<16} mean {statistics.mean(timings) * 1000:8.1f} ms"
+        f"   p50 {statistics.median(timings) * 1000:8.1f} ms"
+        f"   p95 {p95 * 1000:8.1f} ms"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--files", type=int, nargs="+", default=[50, 500, 2000], help="Template sizes to test")
+    parser.add_argument("--templated-percent", type=int, default=5, help="Share of files with placeholders")
+    parser.add_argument("-n", "--iterations", type=int, default=10, help="Repositories to create per backend")
+    parser.add_argument("--github-throttle", action="store_true", help="Keep PyGithub's default request throttling")
+    args = parser.parse_args()
+
+    workdir = Path(tempfile.mkdtemp(prefix="bench-template-backends-"))
+    server = FakeGitHub(git_root=str(workdir / "remotes"))
+    server.start()
+
+    # Settings are read at import time, so point the clients at the fake server first
+    os.environ["GH_ACCESS_TOKEN"] = "bench-token"
+    os.environ["GH_API_URL"] = server.url
+    os.environ["GH_GIT_URL"] = f"file://{server.git_root}"
+    os.environ["COOKIECUTTER_OUTPUT_DIR"] = str(workdir / "output" / "{uuid}")
+    os.environ.pop("DX_API_KEY", None)
+    if not args.github_throttle:
+        os.environ["GH_SECONDS_BETWEEN_REQUESTS"] = "0"
+        os.environ["GH_SECONDS_BETWEEN_WRITES"] = "0"
+
+    from actions.create_custom_service import CreateCustomService
+    from actions.create_template_repo_service import CreateTemplateRepoService
+
+    try:
+        for file_count in args.files:
+            files = make_template_files(file_count, args.templated_percent)
+            template_dir = write_cookiecutter_template(workdir / f"template-{file_count}", files)
+            template_repo = f"{TEMPLATE_OWNER}/template-{file_count}"
+            server.add_template_repo(template_repo, files)
+
+            backends = {
+                "cookiecutter": CreateCustomService(template_dir),
+                "template-repo": CreateTemplateRepoService(template_repo),
+            }
+
+            print(f"Template with {file_count} files:")
+            for name, action in backends.items():
+                timings = []
+                for i in range(args.iterations + 1):
+                    repo_name = f"{name}-{file_count}-{i}"
+                    start = time.perf_counter()
+                    status = asyncio.run(action.create(USER_LOGIN, repo_name, {"project_name": repo_name}))
+                    timings.append(time.perf_counter() - start)
+                    if status != "SUCCESS":
+                        raise SystemExit(f"{name} failed to create {repo_name}")
+                first_run = f"   first {timings[0] * 1000:8.1f} ms"
+                print(summarize(name, timings[1:]) + first_run)
+    finally:
+        server.stop()
+
+    print(f"Fake GitHub handled {server.request_count} API requests. Work directory: {workdir}")
+
+
+if __name__ == "__main__":
+    main()
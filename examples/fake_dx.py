@@ -0,0 +1,90 @@
+"""
+Minimal stand-in for the DX workflow API, for benchmarks and local testing.
+
+Accepts workflowRuns.postMessage, workflowRuns.addLink and
+workflowRuns.changeStatus and records every call that got through, so
+duplicates caused by retries can be counted. `server.faults` injects
+latency, hangs, 5xx and throttling (see faults.py).
+
+Usage:
+    server = FakeDX()
+    server.start()
+    os.environ["DX_API_URL"] = server.url
+    os.environ["DX_API_KEY"] = "fake"
+"""
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List, Optional, Tuple
+from urllib.parse import urlparse
+
+from faults import Faults
+
+ENDPOINTS = ("workflowRuns.postMessage", "workflowRuns.addLink", "workflowRuns.changeStatus")
+
+
+class FakeDX:
+    """Records DX workflow API calls, served over HTTP on localhost"""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0):
+        self.lock = threading.Lock()
+        self.calls: List[Tuple[str, dict]] = []
+        self.faults = Faults()
+        self._server = ThreadingHTTPServer((host, port), _make_handler(self))
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def handle(self, endpoint: str, body: dict) -> Tuple[int, dict]:
+        if endpoint not in ENDPOINTS:
+            return 404, {"ok": False, "error": "unknown_method"}
+        if not body.get("workflow_run_id"):
+            return 400, {"ok": False, "error": "missing workflow_run_id"}
+        with self.lock:
+            self.calls.append((endpoint, body))
+        return 200, {"ok": True}
+
+
+def _make_handler(server: FakeDX):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length") or 0)
+            body = json.loads(self.rfile.read(length)) if length else {}
+            endpoint = urlparse(self.path).path.lstrip("/")
+            headers = {}
+            fault = server.faults.inject(endpoint)
+            if fault:
+                status, headers = fault
+                payload = {"ok": False, "error": "injected_fault"}
+            else:
+                status, payload = server.handle(endpoint, body)
+            data = json.dumps(payload).encode()
+            try:
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(data)
+            except (BrokenPipeError, ConnectionResetError):
+                # The client gave up (e.g. timed out during an injected hang)
+                self.close_connection = True
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
@@ -0,0 +1,375 @@
+"""
+Minimal in-memory stand-in for the GitHub REST API, for benchmarks and local testing.
+
+Implements just enough of the API for the service's GitHub calls:
+repository creation, generation from template repositories and the Git Data
+API (refs, commits, trees, blobs). Repositories created with POST .../repos
+also get a bare git repository under `git_root`, so pushes can go to
+`file://{git_root}/{owner}/{repo}` by setting GH_GIT_URL.
+
+Repository settings (options, topics, branch protection rules and team
+access) are recorded in `server.repos[full_name]["settings"]`. The GraphQL
+endpoint only understands the updateTopics and createBranchProtectionRule
+mutations.
+
+`server.faults` injects latency, hangs, 5xx and throttling (see faults.py).
+
+Usage:
+    server = FakeGitHub(git_root="/tmp/fake-github")
+    server.add_template_repo("templates/python", {"README.md": b"# {{ cookiecutter.project_name }}"})
+    server.start()
+    os.environ["GH_API_URL"] = server.url
+    os.environ["GH_GIT_URL"] = f"file://{server.git_root}"
+"""
+import base64
+import hashlib
+import json
+import os
+import re
+import subprocess
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional, Tuple
+from urllib.parse import urlparse
+
+from faults import Faults
+
+USER_LOGIN = "bench-user"
+
+
+class FakeGitHub:
+    """In-memory GitHub API served over HTTP on localhost"""
+
+    def __init__(self, git_root: str, host: str = "127.0.0.1", port: int = 0):
+        self.git_root = os.path.abspath(git_root)
+        self.lock = threading.Lock()
+        self.repos: Dict[str, dict] = {}
+        self.blobs: Dict[str, bytes] = {}
+        self.trees: Dict[str, Dict[str, Tuple[str, str]]] = {}
+        self.commits: Dict[str, dict] = {}
+        self.request_count = 0
+        self.faults = Faults()
+        self._server = ThreadingHTTPServer((host, port), _make_handler(self))
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    # --- Object store -------------------------------------------------------
+
+    def put_blob(self, content: bytes) -> str:
+        sha = hashlib.sha1(b"blob %d\0" % len(content) + content).hexdigest()
+        self.blobs[sha] = content
+        return sha
+
+    def put_tree(self, entries: Dict[str, Tuple[str, str]]) -> str:
+        sha = hashlib.sha1(json.dumps(sorted(entries.items())).encode()).hexdigest()
+        self.trees[sha] = dict(entries)
+        return sha
+
+    def put_commit(self, tree_sha: str, parents: list, message: str) -> str:
+        sha = hashlib.sha1(json.dumps([tree_sha, parents, message, len(self.commits)]).encode()).hexdigest()
+        self.commits[sha] = {"tree": tree_sha, "parents": parents, "message": message}
+        return sha
+
+    def add_repo(self, full_name: str, head: Optional[str] = None, is_template: bool = False) -> dict:
+        repo = {
+            "full_name": full_name,
+            "default_branch": "main",
+            "is_template": is_template,
+            "refs": {"heads/main": head} if head else {},
+            "settings": {"options": {}, "topics": [], "branch_protection": {}, "teams": {}},
+        }
+        self.repos[full_name] = repo
+        return repo
+
+    def add_template_repo(self, full_name: str, files: Dict[str, bytes]) -> None:
+        """Create a template repository with one commit containing files"""
+        with self.lock:
+            tree_sha = self.put_tree({path: ("100644", self.put_blob(content)) for path, content in files.items()})
+            self.add_repo(full_name, head=self.put_commit(tree_sha, [], "Template"), is_template=True)
+
+    # --- JSON representations ----------------------------------------------
+
+    def repo_json(self, full_name: str) -> dict:
+        owner, name = full_name.split("/", 1)
+        repo = self.repos[full_name]
+        repo_id = abs(hash(full_name)) % 10**8
+        return {
+            "id": repo_id,
+            "node_id": f"R_{repo_id}",
+            "name": name,
+            "full_name": full_name,
+            "owner": {"login": owner, "url": f"{self.url}/users/{owner}"},
+            "url": f"{self.url}/repos/{full_name}",
+            "html_url": f"https://github.com/{full_name}",
+            "default_branch": repo["default_branch"],
+            "is_template": repo["is_template"],
+            "private": True,
+            **repo["settings"]["options"],
+        }
+
+    def ref_json(self, full_name: str, ref: str) -> dict:
+        sha = self.repos[full_name]["refs"][ref]
+        base = f"{self.url}/repos/{full_name}/git"
+        return {
+            "ref": f"refs/{ref}",
+            "url": f"{base}/refs/{ref}",
+            "object": {"sha": sha, "type": "commit", "url": f"{base}/commits/{sha}"},
+        }
+
+    def commit_json(self, full_name: str, sha: str) -> dict:
+        commit = self.commits[sha]
+        base = f"{self.url}/repos/{full_name}/git"
+        return {
+            "sha": sha,
+            "url": f"{base}/commits/{sha}",
+            "message": commit["message"],
+            "tree": {"sha": commit["tree"], "url": f"{base}/trees/{commit['tree']}"},
+            "parents": [{"sha": parent, "url": f"{base}/commits/{parent}"} for parent in commit["parents"]],
+        }
+
+    def tree_json(self, full_name: str, sha: str) -> dict:
+        base = f"{self.url}/repos/{full_name}/git"
+        return {
+            "sha": sha,
+            "url": f"{base}/trees/{sha}",
+            "truncated": False,
+            "tree": [
+                {
+                    "path": path,
+                    "mode": mode,
+                    "type": "blob",
+                    "sha": blob_sha,
+                    "size": len(self.blobs[blob_sha]),
+                    "url": f"{base}/blobs/{blob_sha}",
+                }
+                for path, (mode, blob_sha) in sorted(self.trees[sha].items())
+            ],
+        }
+
+    # --- Request handling ---------------------------------------------------
+
+    def handle(self, method: str, path: str, body: dict) -> Tuple[int, Optional[dict]]:
+        with self.lock:
+            self.request_count += 1
+            for pattern, route_method, handler in _ROUTES:
+                match = pattern.fullmatch(path)
+                if match and route_method == method:
+                    return handler(self, body, *match.groups())
+        return 404, {"message": "Not Found"}
+
+    def _get_user(self, body):
+        return 200, {"login": USER_LOGIN, "url": f"{self.url}/user"}
+
+    def _get_rate_limit(self, body):
+        core = {"limit": 5000, "used": self.request_count, "remaining": max(0, 5000 - self.request_count), "reset": 0}
+        return 200, {"resources": {"core": core}, "rate": core}
+
+    def _get_org(self, body, org):
+        return 200, {"login": org, "url": f"{self.url}/orgs/{org}"}
+
+    def _create_repo(self, body, owner=USER_LOGIN):
+        full_name = f"{owner}/{body['name']}"
+        if full_name in self.repos:
+            return 422, {"message": "Repository creation failed.", "errors": [{"message": "name already exists"}]}
+        repo = self.add_repo(full_name)
+        repo["settings"]["options"] = {key: value for key, value in body.items() if key in _REPO_OPTIONS}
+        bare_path = os.path.join(self.git_root, owner, body["name"])
+        os.makedirs(bare_path, exist_ok=True)
+        subprocess.run(["git", "init", "--bare", "-q", bare_path], check=True)
+        return 201, self.repo_json(full_name)
+
+    def _get_repo(self, body, full_name):
+        if full_name not in self.repos:
+            return 404, {"message": "Not Found"}
+        return 200, self.repo_json(full_name)
+
+    def _edit_repo(self, body, full_name):
+        if full_name not in self.repos:
+            return 404, {"message": "Not Found"}
+        self.repos[full_name]["settings"]["options"].update(
+            {key: value for key, value in body.items() if key in _REPO_OPTIONS}
+        )
+        return 200, self.repo_json(full_name)
+
+    def _set_team_access(self, body, org, team, full_name):
+        if full_name not in self.repos or not full_name.startswith(f"{org}/"):
+            return 404, {"message": "Not Found"}
+        self.repos[full_name]["settings"]["teams"][team] = body.get("permission", "push")
+        return 204, None
+
+    def _graphql(self, body):
+        variables = body.get("variables", {})
+        query = body.get("query", "")
+        full_name = next(
+            (name for name in self.repos if self.repo_json(name)["node_id"] == variables.get("repositoryId")), None
+        )
+        if full_name is None:
+            return 200, {"data": None, "errors": [{"message": "Could not resolve to a node with the given ID"}]}
+        settings = self.repos[full_name]["settings"]
+        data = {}
+        topics = re.search(r"updateTopics\(input: \{.*?topicNames: (\[.*?\])", query)
+        if topics:
+            settings["topics"] = json.loads(topics.group(1))
+            data["topics"] = {"invalidTopicNames": []}
+        protection = re.search(r"createBranchProtectionRule\(input: \{(.*?)\}\)", query)
+        if protection:
+            rule = dict(re.findall(r"(\w+): (\[.*?\]|[^,]+)", protection.group(1)))
+            rule.pop("repositoryId", None)
+            rule["pattern"] = variables.get("pattern")
+            settings["branch_protection"] = rule
+            data["protection"] = {"branchProtectionRule": {"id": f"BPR_{len(self.commits)}"}}
+        return 200, {"data": data}
+
+    def _generate(self, body, template_name):
+        template = self.repos.get(template_name)
+        if template is None or not template["is_template"]:
+            return 404, {"message": "Not Found"}
+        full_name = f"{body['owner']}/{body['name']}"
+        if full_name in self.repos:
+            return 422, {"message": "Repository creation failed.", "errors": [{"message": "name already exists"}]}
+        # GitHub squashes the template into a fresh initial commit with the same tree
+        tree_sha = self.commits[template["refs"]["heads/main"]]["tree"]
+        self.add_repo(full_name, head=self.put_commit(tree_sha, [], "Initial commit"))
+        return 201, self.repo_json(full_name)
+
+    def _get_ref(self, body, full_name, ref):
+        repo = self.repos.get(full_name)
+        if repo is None:
+            return 404, {"message": "Not Found"}
+        if not repo["refs"]:
+            return 409, {"message": "Git Repository is empty."}
+        if ref not in repo["refs"]:
+            return 404, {"message": "Not Found"}
+        return 200, self.ref_json(full_name, ref)
+
+    def _update_ref(self, body, full_name, ref):
+        self.repos[full_name]["refs"][ref] = body["sha"]
+        return 200, self.ref_json(full_name, ref)
+
+    def _get_commit(self, body, full_name, sha):
+        if sha not in self.commits:
+            return 404, {"message": "Not Found"}
+        return 200, self.commit_json(full_name, sha)
+
+    def _create_commit(self, body, full_name):
+        sha = self.put_commit(body["tree"], body.get("parents", []), body["message"])
+        return 201, self.commit_json(full_name, sha)
+
+    def _get_tree(self, body, full_name, sha):
+        if sha not in self.trees:
+            return 404, {"message": "Not Found"}
+        return 200, self.tree_json(full_name, sha)
+
+    def _create_tree(self, body, full_name):
+        entries = dict(self.trees.get(body.get("base_tree"), {}))
+        for element in body["tree"]:
+            if "content" in element:
+                entries[element["path"]] = (element["mode"], self.put_blob(element["content"].encode()))
+            elif element.get("sha") is None:
+                entries.pop(element["path"], None)
+            else:
+                entries[element["path"]] = (element["mode"], element["sha"])
+        return 201, self.tree_json(full_name, self.put_tree(entries))
+
+    def _get_blob(self, body, full_name, sha):
+        if sha not in self.blobs:
+            return 404, {"message": "Not Found"}
+        content = self.blobs[sha]
+        return 200, {
+            "sha": sha,
+            "size": len(content),
+            "encoding": "base64",
+            "content": base64.b64encode(content).decode(),
+            "url": f"{self.url}/repos/{full_name}/git/blobs/{sha}",
+        }
+
+    def _create_blob(self, body, full_name):
+        content = body["content"]
+        data = base64.b64decode(content) if body.get("encoding") == "base64" else content.encode()
+        sha = self.put_blob(data)
+        return 201, {"sha": sha, "url": f"{self.url}/repos/{full_name}/git/blobs/{sha}"}
+
+
+_REPO = r"([^/]+/[^/]+)"
+_REPO_OPTIONS = (
+    "has_issues", "has_wiki", "has_projects",
+    "allow_squash_merge", "allow_merge_commit", "allow_rebase_merge", "delete_branch_on_merge",
+)
+_ROUTES = [
+    (re.compile(r"/user"), "GET", FakeGitHub._get_user),
+    (re.compile(r"/user/repos"), "POST", FakeGitHub._create_repo),
+    (re.compile(r"/rate_limit"), "GET", FakeGitHub._get_rate_limit),
+    (re.compile(r"/orgs/([^/]+)"), "GET", FakeGitHub._get_org),
+    (re.compile(r"/orgs/([^/]+)/repos"), "POST", lambda self, body, org: self._create_repo(body, org)),
+    (re.compile(rf"/repos/{_REPO}"), "GET", FakeGitHub._get_repo),
+    (re.compile(rf"/repos/{_REPO}"), "PATCH", FakeGitHub._edit_repo),
+    (re.compile(rf"/orgs/([^/]+)/teams/([^/]+)/repos/{_REPO}"), "PUT", FakeGitHub._set_team_access),
+    (re.compile(r"/graphql"), "POST", FakeGitHub._graphql),
+    (re.compile(rf"/repos/{_REPO}/generate"), "POST", FakeGitHub._generate),
+    (re.compile(rf"/repos/{_REPO}/git/refs?/(.+)"), "GET", FakeGitHub._get_ref),
+    (re.compile(rf"/repos/{_REPO}/git/refs/(.+)"), "PATCH", FakeGitHub._update_ref),
+    (re.compile(rf"/repos/{_REPO}/git/commits/(\w+)"), "GET", FakeGitHub._get_commit),
+    (re.compile(rf"/repos/{_REPO}/git/commits"), "POST", FakeGitHub._create_commit),
+    (re.compile(rf"/repos/{_REPO}/git/trees/(\w+)"), "GET", FakeGitHub._get_tree),
+    (re.compile(rf"/repos/{_REPO}/git/trees"), "POST", FakeGitHub._create_tree),
+    (re.compile(rf"/repos/{_REPO}/git/blobs/(\w+)"), "GET", FakeGitHub._get_blob),
+    (re.compile(rf"/repos/{_REPO}/git/blobs"), "POST", FakeGitHub._create_blob),
+]
+
+
+def _make_handler(server: FakeGitHub):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def _dispatch(self, method: str) -> None:
+            length = int(self.headers.get("Content-Length") or 0)
+            body = json.loads(self.rfile.read(length)) if length else {}
+            path = urlparse(self.path).path
+            headers = {}
+            fault = server.faults.inject(path)
+            if fault:
+                status, headers = fault
+                payload = {"message": "Injected fault"}
+            else:
+                status, payload = server.handle(method, path, body)
+            data = json.dumps(payload).encode() if payload is not None else b""
+            try:
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(data)
+            except (BrokenPipeError, ConnectionResetError):
+                # The client gave up (e.g. timed out during an injected hang)
+                self.close_connection = True
+
+        def do_GET(self):
+            self._dispatch("GET")
+
+        def do_POST(self):
+            self._dispatch("POST")
+
+        def do_PATCH(self):
+            self._dispatch("PATCH")
+
+        def do_PUT(self):
+            self._dispatch("PUT")
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
@@ -0,0 +1,136 @@
+"""
+Minimal stand-in for a git LFS server (Batch API with the basic transfer
+adapter), for benchmarks and local testing.
+
+Objects are stored in memory per repository. The batch endpoint only asks
+for objects the repository doesn't have, uploads are checked against their
+SHA-256 and size, and every batch and upload is counted.
+`server.faults` injects latency, hangs, 5xx and throttling (see faults.py).
+
+Usage:
+    server = FakeLFS()
+    server.start()
+    os.environ["LFS_ENABLED"] = "true"
+    os.environ["LFS_URL"] = server.url
+"""
+import hashlib
+import json
+import re
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional, Tuple
+from urllib.parse import urlparse
+
+from faults import Faults
+
+LFS_MEDIA_TYPE = "application/vnd.git-lfs+json"
+
+_LFS_PATH = re.compile(r"/([^/]+/[^/]+)\.git/info/lfs/(objects/batch|objects/([0-9a-f]{64})|verify)")
+
+
+class FakeLFS:
+    """In-memory git LFS server served over HTTP on localhost"""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0):
+        self.lock = threading.Lock()
+        self.objects: Dict[str, Dict[str, bytes]] = {}  # repository -> oid -> content
+        self.batch_requests = 0
+        self.uploads = 0
+        self.faults = Faults()
+        self._server = ThreadingHTTPServer((host, port), _make_handler(self))
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def batch(self, repo: str, body: dict) -> Tuple[int, dict]:
+        if body.get("operation") != "upload":
+            return 422, {"message": "Only uploads are supported"}
+        base = f"{self.url}/{repo}.git/info/lfs"
+        with self.lock:
+            self.batch_requests += 1
+            stored = self.objects.setdefault(repo, {})
+            objects = []
+            for obj in body.get("objects", []):
+                item = {"oid": obj["oid"], "size": obj["size"], "authenticated": True}
+                if obj["oid"] not in stored:
+                    item["actions"] = {
+                        "upload": {"href": f"{base}/objects/{obj['oid']}", "header": {"X-Fake-LFS": "1"}},
+                        "verify": {"href": f"{base}/verify"},
+                    }
+                objects.append(item)
+        return 200, {"transfer": "basic", "objects": objects, "hash_algo": "sha256"}
+
+    def upload(self, repo: str, oid: str, content: bytes) -> Tuple[int, dict]:
+        if hashlib.sha256(content).hexdigest() != oid:
+            return 422, {"message": "Content doesn't match the object ID"}
+        with self.lock:
+            self.uploads += 1
+            self.objects.setdefault(repo, {})[oid] = content
+        return 200, {}
+
+    def verify(self, repo: str, body: dict) -> Tuple[int, dict]:
+        content = self.objects.get(repo, {}).get(body.get("oid"))
+        if content is None or len(content) != body.get("size"):
+            return 404, {"message": "Object not found"}
+        return 200, {}
+
+
+def _make_handler(server: FakeLFS):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def _dispatch(self, method: str) -> None:
+            length = int(self.headers.get("Content-Length") or 0)
+            data = self.rfile.read(length) if length else b""
+            path = urlparse(self.path).path
+            match = _LFS_PATH.fullmatch(path)
+            headers = {}
+            fault = server.faults.inject(path)
+            if fault:
+                status, headers = fault
+                payload = {"message": "Injected fault"}
+            elif match is None:
+                status, payload = 404, {"message": "Not Found"}
+            else:
+                repo, action, oid = match.groups()
+                if method == "PUT" and oid:
+                    status, payload = server.upload(repo, oid, data)
+                elif method == "POST" and action == "objects/batch":
+                    status, payload = server.batch(repo, json.loads(data))
+                elif method == "POST" and action == "verify":
+                    status, payload = server.verify(repo, json.loads(data))
+                else:
+                    status, payload = 405, {"message": "Method Not Allowed"}
+            body = json.dumps(payload).encode()
+            try:
+                self.send_response(status)
+                self.send_header("Content-Type", LFS_MEDIA_TYPE)
+                self.send_header("Content-Length", str(len(body)))
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(body)
+            except (BrokenPipeError, ConnectionResetError):
+                self.close_connection = True
+
+        def do_POST(self):
+            self._dispatch("POST")
+
+        def do_PUT(self):
+            self._dispatch("PUT")
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
@@ -0,0 +1,64 @@
+"""
+Fault injection for the local stand-in servers (fake_github.py, fake_dx.py).
+
+Each request first asks the server's Faults whether to misbehave: add
+latency, hang, answer 5xx, or throttle with 429 and Retry-After. Settings
+can be changed while the server runs, which is how the resilience benchmark
+moves between healthy, degraded and outage phases.
+
+Usage:
+    server.faults.error_rate = 0.5      # half of the requests fail with 503
+    server.faults.latency = 0.2         # every request takes 200ms longer
+    server.faults.hang_rate = 1.0       # every request stalls for hang_seconds
+    server.faults.reset()
+"""
+import random
+import re
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Dict, Optional, Tuple
+
+
+@dataclass
+class Faults:
+    """Faults to inject into responses, as rates between 0 and 1"""
+    error_rate: float = 0.0  # Answer 503 without a Retry-After
+    throttle_rate: float = 0.0  # Answer 429 with Retry-After
+    retry_after: float = 1.0  # Seconds sent in Retry-After
+    hang_rate: float = 0.0  # Stall for hang_seconds before answering
+    hang_seconds: float = 30.0
+    latency: float = 0.0  # Added to every response
+    path_pattern: Optional[str] = None  # Only inject into paths matching this regex
+    injected: Dict[str, int] = field(default_factory=dict)
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def reset(self) -> None:
+        """Stop injecting faults"""
+        self.error_rate = self.throttle_rate = self.hang_rate = self.latency = 0.0
+
+    def _count(self, kind: str) -> None:
+        with self._lock:
+            self.injected[kind] = self.injected.get(kind, 0) + 1
+
+    def inject(self, path: str) -> Optional[Tuple[int, Dict[str, str]]]:
+        """
+        Apply faults to a request; sleeps for latency or a hang.
+
+        Returns:
+            (status, headers) to answer with instead of the real response, or None
+        """
+        if self.path_pattern and not re.search(self.path_pattern, path):
+            return None
+        if self.latency:
+            time.sleep(self.latency)
+        if random.random() < self.hang_rate:
+            self._count("hang")
+            time.sleep(self.hang_seconds)
+        if random.random() < self.throttle_rate:
+            self._count("throttle")
+            return 429, {"Retry-After": f"{self.retry_after:g}"}
+        if random.random() < self.error_rate:
+            self._count("error")
+            return 503, {}
+        return None